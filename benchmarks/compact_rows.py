@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Measures the memory used by a table imported as dict rows or compact rows,
+with and without interning.
+
+A synthetic CSV file with wide rows is written to a temporary directory, and
+imported as each kind of row, in a separate process. Half of the columns have
+a few distinct values, like categories. The growth of the peak resident
+memory is reported, which includes the values of the rows.
+"""
+
+import csv
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from os.path import join
+
+import typer
+
+from odm_validation.utils import import_csv_file
+
+COLUMNS = 20
+CATEGORIES = 100
+
+
+def write_csv(path: str, rows: int) -> None:
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([f'column{j}' for j in range(COLUMNS)])
+        for i in range(rows):
+            writer.writerow([f'{i}-{j}' if j % 2 else f'{i % CATEGORIES}-{j}'
+                             for j in range(COLUMNS)])
+
+
+def import_rows(path: str, compact: bool, intern: bool
+                ) -> tuple[int, float]:
+    """Returns (memory in KiB, seconds)."""
+    mem_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    time_start = time.perf_counter()
+    rows = import_csv_file(path, compact=compact, intern=intern)
+    seconds = time.perf_counter() - time_start
+    mem_end = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    assert len(rows) > 0
+    return (mem_end - mem_start, seconds)
+
+
+def main(rows: int = typer.Option(default=1_000_000,
+                                  help='Number of rows in the table.')
+         ) -> None:
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = join(tmpdir, 'data.csv')
+        write_csv(path, rows)
+        size_mib = os.path.getsize(path) / 1024**2
+        print(f'importing {rows} rows with {COLUMNS} columns '
+              f'({size_mib:.1f} MiB)')
+        with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+            for compact, intern in [(False, False), (True, False),
+                                    (True, True)]:
+                name = ('compact' if compact else 'dict') + \
+                    (' interned' if intern else '')
+                mem_kib, seconds = pool.apply(import_rows,
+                                              (path, compact, intern))
+                print(f'{name:16} {mem_kib / 1024:8.1f} MiB '
+                      f'{seconds:8.1f} s')
+
+
+if __name__ == '__main__':
+    typer.run(main)
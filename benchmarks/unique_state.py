@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Measures the memory used by the state of the 'unique' rule.
+
+The default and compact state are each filled with the primary keys of a
+synthetic table, in a separate process, and the growth of the peak resident
+memory is reported. Rows are generated from their index, as if they were
+fetched from the dataset being validated, so the table itself is not held in
+memory. Any rows kept alive by a state are counted as part of it.
+"""
+
+import multiprocessing
+import resource
+import time
+
+import typer
+
+from odm_validation.cerberusext import (
+    CompactUniqueRuleState,
+    UniqueRuleState,
+    get_primary_key,
+)
+
+TABLE_ID = 'samples'
+FIELD = 'sampleID'
+DUPLICATE_INTERVAL = 1000
+
+
+def gen_row(row_index: int) -> dict:
+    # every n-th row is a duplicate of the row before it
+    i = row_index - int(row_index % DUPLICATE_INTERVAL == 1)
+    return {FIELD: f'sample-{i:08}', 'lastUpdated': '2023-01-01'}
+
+
+def fill_state(compact: bool, rows: int) -> tuple[int, float, int]:
+    """Returns (memory in KiB, seconds, duplicates)."""
+    mem_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    time_start = time.perf_counter()
+    state = CompactUniqueRuleState(gen_row) if compact else UniqueRuleState()
+    duplicates = 0
+    for i in range(rows):
+        row = gen_row(i)
+        pk = get_primary_key(row, FIELD)
+        if state.add(TABLE_ID, FIELD, pk, i, row) is not None:
+            duplicates += 1
+    seconds = time.perf_counter() - time_start
+    mem_end = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return (mem_end - mem_start, seconds, duplicates)
+
+
+def main(rows: int = typer.Option(default=5_000_000,
+                                  help='Number of rows in the table.')
+         ) -> None:
+    print(f'filling unique-rule state with {rows} rows')
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+        for compact in [False, True]:
+            name = 'compact' if compact else 'default'
+            mem_kib, seconds, duplicates = pool.apply(fill_state,
+                                                      (compact, rows))
+            print(f'{name:8} {mem_kib / 1024:8.1f} MiB {seconds:8.1f} s '
+                  f'({duplicates} duplicates)')
+
+
+if __name__ == '__main__':
+    typer.run(main)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Compares the validation of a DataFrame with the validation of its rows.
+
+A synthetic samples table is generated with typed columns, where every n-th
+row has an invalid value. The table is validated both as a DataFrame and as a
+list of rows, with the bundled schema, and the time of each is reported
+together with the number of errors, which must be equal.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+import typer
+
+from odm_validation.schemas import import_schema
+from odm_validation.validation import _validate_data_ext
+from odm_validation.vectorized import to_rows
+from odm_validation.tools.validate import get_schema_path
+
+SCHEMA_VERSION = '2.2.3'
+INVALID_INTERVAL = 1000
+
+
+def gen_samples(rows: int) -> pd.DataFrame:
+    ix = np.arange(rows)
+    invalid = ix % INVALID_INTERVAL == 0
+    return pd.DataFrame({
+        'sampleID': [f'sample-{i:08}' for i in ix],
+        'siteID': 'site-1',
+        'collDT': np.datetime64('2023-01-01T10:00', 'us'),
+        'collNum': np.where(invalid, 0, 1),
+        'collPer': 24.0,
+        'collType': np.where(invalid, 'unknown', 'comp'),
+        'saMaterial': 'rawWW',
+        'notes': '',
+    })
+
+
+def main(rows: int = typer.Option(default=100_000,
+                                  help='Number of rows in the table.')
+         ) -> None:
+    schema = import_schema(get_schema_path(SCHEMA_VERSION))
+    df = gen_samples(rows)
+    print(f'validating {rows} samples')
+
+    time_start = time.perf_counter()
+    report = _validate_data_ext(schema, {'samples': df})
+    seconds = time.perf_counter() - time_start
+    print(f'{"columns":8} {seconds:8.2f} s ({len(report.errors)} errors)')
+
+    time_start = time.perf_counter()
+    report = _validate_data_ext(schema, {'samples': to_rows(df)})
+    seconds = time.perf_counter() - time_start
+    print(f'{"rows":8} {seconds:8.2f} s ({len(report.errors)} errors)')
+
+
+if __name__ == '__main__':
+    typer.run(main)
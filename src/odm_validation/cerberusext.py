@@ -1,17 +1,29 @@
 import logging
+from array import array
 from collections import defaultdict
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional, Union, cast
+from functools import lru_cache, partial
+from typing import (
+    Callable,
+    Collection,
+    Iterable,
+    Optional,
+    Sequence,
+    Union,
+    cast,
+)
 from copy import deepcopy
 from pprint import pformat
 
-from cerberus import Validator
+from cerberus import Validator, errors
 from cerberus.errors import ErrorDefinition
 
 import odm_validation.part_tables as pt
 import odm_validation.schemas as schemas
 import odm_validation.reports as reports
+from odm_validation.compact_rows import replace_value, set_value
+from odm_validation.datetimes import ColumnDatetimeParser
 from odm_validation.input_data import DataKind
 from odm_validation.part_tables import Dataset, Row, SomeValue
 from odm_validation.reports import get_row_num
@@ -27,8 +39,33 @@ from odm_validation.stdext import (
 EMPTY_TRIMMED_RULE = 0x101
 
 
-def _convert_value(val: SomeValue, type_class: type) -> SomeValue:
-    "Convert `val` to `type_class`."
+# the type classes of the coerce rule values
+COERCE_TYPES: dict[str, type] = {
+    'datetime': datetime,
+    'float': float,
+    'integer': int,
+}
+
+
+def needs_coercion(value: Optional[SomeValue], type_class: type) -> bool:
+    """Returns True if `value` must be converted to `type_class`."""
+    # ignore empty values, they can't be coerced anyway
+    if not value:
+        return False
+    if isinstance(value, type_class):
+        return False
+    if type_class is float and isinstance(value, int):
+        return False
+    return True
+
+
+def convert_value(val: SomeValue, type_class: type,
+                  parse_datetime_str: Callable[[str], datetime] = parse_datetime
+                  ) -> SomeValue:
+    """Convert `val` to `type_class`.
+
+    :param parse_datetime_str: the function used to parse datetime strings.
+    """
     # `parse_int` is explicitly called because floats without decimals
     # (ex: 1.0) also are valid integers.
     if isinstance(val, type_class):
@@ -37,14 +74,68 @@ def _convert_value(val: SomeValue, type_class: type) -> SomeValue:
         assert val is not datetime
         return parse_int(cast(Union[int, float, str], val))
     elif type_class is datetime and isinstance(val, str):
-        return parse_datetime(val)
+        return parse_datetime_str(val)
     else:
         return type_class(val)
 
 
+# returned by a cached conversion when it failed
+_CONVERSION_FAILED = object()
+
+
+def _try_convert_value(type_class: type, val: SomeValue,
+                       parse_datetime_str: Callable[[str], datetime]
+                       = parse_datetime) -> object:
+    try:
+        return convert_value(val, type_class, parse_datetime_str)
+    except (ArithmeticError, ValueError):
+        return _CONVERSION_FAILED
+
+
+class CoercionCache:
+    """Bounded LRU caches of coerced values (or failures), per column and
+    type. Values like dates and numeric codes repeat a lot, and are then only
+    converted once."""
+    MAX_SIZE = 4096
+
+    def __init__(self) -> None:
+        self._converters: dict[tuple[pt.TableId, str, type],
+                               Callable[[SomeValue], object]] = {}
+
+    def convert(self, table_id: pt.TableId, column_id: str, val: SomeValue,
+                type_class: type) -> SomeValue:
+        """Same as `convert_value`. A ValueError is raised if `val` can't be
+        converted."""
+        key = (table_id, column_id, type_class)
+        converter = self._converters.get(key)
+        if converter is None:
+            # - datetimes are parsed with the inferred format of the column
+            # - `typed` keeps values like 1 and 1.0 apart
+            parse_datetime_str = ColumnDatetimeParser().parse
+            converter = lru_cache(maxsize=self.MAX_SIZE, typed=True)(
+                partial(_try_convert_value, type_class,
+                        parse_datetime_str=parse_datetime_str))
+            self._converters[key] = converter
+        try:
+            result = converter(val)
+        except TypeError:  # unhashable value
+            result = _try_convert_value(type_class, val)
+        if result is _CONVERSION_FAILED:
+            raise ValueError(f'unable to convert {val!r} to '
+                             f'{type_name(type_class)}')
+        return cast(SomeValue, result)
+
+
+# CoercionGrouper(kind, ctx) -> is_grouped
+CoercionGrouper = Callable[[reports.ErrorKind, reports.ErrorCtx], bool]
+
+
 class ContextualCoercer(Validator):
     """Construct this with the `errors` and `warnings` parameters set to
-    existing lists, to retrieve coercion errors and warnings."""
+    existing lists, to retrieve coercion errors and warnings.
+
+    Construct it with `inplace=True` to write the coerced values into the
+    given rows and tables, instead of copies of them."""
     # This class performs coercion on data, to prepare it for the actual
     # validation. Cerberus' native coercion doesn't give contextual info about
     # where the coercions take place, which is why we need this custom extended
@@ -69,6 +160,9 @@ class ContextualCoercer(Validator):
     def __init__(self, *args, **kwargs) -> None:  # type: ignore
         super().__init__(*args, **kwargs)
         self.allow_unknown = True
+        # shared with the child validators, which get a copy of `_config`
+        self._config.setdefault('coercion_cache', CoercionCache())
+        self._config.setdefault('inplace', False)
 
     def _extract_coercion_schema(schema: CerberusSchema) -> dict:
         """Strips `schema` of all rules except 'meta' and 'coerce', and
@@ -88,8 +182,14 @@ class ContextualCoercer(Validator):
 
     def coerce(self, document: dict[pt.TableId, Dataset],
                schema: CerberusSchema, offset: int,
-               data_kind: DataKind = DataKind.python
+               data_kind: DataKind = DataKind.python,
+               group: Optional[CoercionGrouper] = None
                ) -> dict[pt.TableId, Dataset]:
+        """Returns the coerced `document`.
+
+        :param group: is called with each coercion error and warning, which
+            is only added to `errors` or `warnings` if it returns False.
+        """
         # Coercion is performed by validating using a coercion-only schema.
         # Native cerberus normalization can't be used because it doesn't
         # provide context. Coercions are kept track of using `_config`.
@@ -98,30 +198,42 @@ class ContextualCoercer(Validator):
         # we're not expecting any errors, and we're already handling errors in
         # the `_check_with_x` functions. We are, however, logging any errors to
         # file, just in case we miss something.
+        #
+        # Rows are copied on write, so only the coerced rows are copied, and
+        # rows can be read-only. In place, dict rows are modified instead,
+        # and compact rows are replaced in their table. The reports still get
+        # the original values, since Cerberus validates a copy of each row.
+        #
+        # Normalization is skipped, since the schema has no normalization
+        # rules, and it would copy every row.
         coercion_schema = ContextualCoercer._extract_coercion_schema(schema)
         self.schema = coercion_schema
-        self._config["coerced_document"] = deepcopy(document)
+        if self._config['inplace']:
+            self._config["coerced_document"] = document
+        else:
+            self._config["coerced_document"] = {
+                table_id: list(rows) for table_id, rows in document.items()}
         self._config["offset"] = offset
         self._config["data_kind"] = data_kind
-        if not super().validate(document):
+        self._config["group"] = group
+        if not super().validate(document, normalize=False):
             logging.error(__name__ + '.coerce:\n' + pformat(self.errors))
         return self._config["coerced_document"]
 
     def _log_coercion(self, kind: reports.ErrorKind, ctx: reports.ErrorCtx
                       ) -> None:
-        # set `errors` and `warnings`
+        # set `errors` and `warnings`, unless grouped
+        group = self._config.get('group')
+        if group and group(kind, ctx):
+            return
         entry = reports.gen_coercion_error(ctx, kind)
         self._config[kind.value + 's'].append(entry)
 
     def _set_value(self, field: str, value: Optional[SomeValue],
                    type_class: type) -> None:
-        # ignore empty values, they can't be coerced anyway
-        if not value:
-            return
-        if isinstance(value, type_class):
-            return
-        if type_class is float and isinstance(value, int):
+        if not needs_coercion(value, type_class):
             return
+        assert value is not None
         offset = self._config['offset']
         data_kind = self._config['data_kind']
         table = self.document_path[0]
@@ -139,8 +251,13 @@ class ContextualCoercer(Validator):
             value=value,
         )
         try:
-            new_value = _convert_value(value, type_class)
-            self._config["coerced_document"][table][row_ix][field] = new_value
+            new_value = self._config['coercion_cache'].convert(
+                table, field, value, type_class)
+            rows = self._config["coerced_document"][table]
+            if self._config['inplace']:
+                set_value(rows, row_ix, field, new_value)
+            else:
+                rows[row_ix] = replace_value(rows[row_ix], field, new_value)
             if data_kind != DataKind.spreadsheet:
                 self._log_coercion(reports.ErrorKind.WARNING, ctx)
         except (ArithmeticError, ValueError):
@@ -163,6 +280,10 @@ DateStr = str
 PrimaryKey = tuple[pt.PartId, DateStr]
 TableKey = tuple[pt.TableId, PrimaryKey]
 RowNum = int
+RowIndex = int
+
+# RowSource(row_index) -> row
+RowSource = Callable[[RowIndex], Row]
 
 
 @dataclass
@@ -174,15 +295,204 @@ class AggregatedError:
     rows: list[dict]
     column_meta: list[dict]
     value: SomeValue
+    constraint: Optional[str] = None
+    schema_column: Optional[dict] = None
+    data_kind: DataKind = DataKind.python
+
+
+def get_primary_key(row: Row, field: str) -> PrimaryKey:
+    """Returns the compound primary key of `row`, using `field` as the id
+    column."""
+    # the primary key (pk) is a compound key of partID and lastUpdated
+    lastUpdated = row.get(pt.LAST_UPDATED, '') or ''
+    assert isinstance(lastUpdated, str)
+    return (str(row.get(field)).strip(), lastUpdated.strip())
 
 
 class UniqueRuleState:
     """State for the 'unique' rule."""
     def __init__(self) -> None:
         self.table_keys: dict[pt.TableId, set[PrimaryKey]] = defaultdict(set)
-        self.tablekey_rows: dict[TableKey, tuple[RowNum, Row]] = {}
+        self.tablekey_rows: dict[TableKey, tuple[RowIndex, Row]] = {}
         self.tablekey_errors: dict[TableKey, AggregatedError] = {}
 
+    def add(self, table_id: pt.TableId, field: str, pk: PrimaryKey,
+            row_index: RowIndex, row: Row) -> Optional[RowIndex]:
+        """Adds `pk` to the set of keys in `table_id`. Returns the index of
+        the first row with the same key if it was already added, otherwise
+        None."""
+        primary_keys = self.table_keys[table_id]
+        tablekey = (table_id, pk)
+        if pk in primary_keys:
+            return self.tablekey_rows[tablekey][0]
+        self.tablekey_rows[tablekey] = (row_index, row)
+        primary_keys.add(pk)
+        return None
+
+    def get_row(self, table_id: pt.TableId, pk: PrimaryKey,
+                row_index: RowIndex) -> Row:
+        return self.tablekey_rows[(table_id, pk)][1]
+
+
+class KeyDigestTable:
+    """An open-addressing hash table of fixed-width key digests.
+
+    Each slot holds a 64-bit digest and the index of the row it was derived
+    from, in two parallel arrays. Digests may collide, so the caller decides
+    whether two keys are actually the same by comparing the rows behind
+    them."""
+    # A digest of zero marks an empty slot, which is why digests are never
+    # zero. Linear probing is used, and the table is kept at most two thirds
+    # full.
+
+    _MIN_CAPACITY = 1024
+
+    def __init__(self) -> None:
+        self._init_slots(self._MIN_CAPACITY)
+        self.size = 0
+
+    def _init_slots(self, capacity: int) -> None:
+        self._mask = capacity - 1
+        self._digests = array('Q', bytes(8 * capacity))
+        self._indexes = array('q', bytes(8 * capacity))
+
+    def _grow(self) -> None:
+        old_digests = self._digests
+        old_indexes = self._indexes
+        self._init_slots(2 * len(old_digests))
+        digests = self._digests
+        mask = self._mask
+        for digest, row_index in zip(old_digests, old_indexes):
+            if digest == 0:
+                continue
+            i = digest & mask
+            while digests[i] != 0:
+                i = (i + 1) & mask
+            digests[i] = digest
+            self._indexes[i] = row_index
+
+    def add(self, digest: int, row_index: RowIndex,
+            is_same: Callable[[RowIndex], bool]) -> Optional[RowIndex]:
+        """Inserts `digest` unless an equal key already exists, in which case
+        the row index of that key is returned instead.
+
+        :param is_same: is called with the row index of each entry having the
+            same digest, and should return True if its key is equal to the key
+            being inserted.
+        """
+        assert digest != 0
+        digests = self._digests
+        mask = self._mask
+        i = digest & mask
+        while True:
+            d = digests[i]
+            if d == 0:
+                break
+            if d == digest:
+                other_index = self._indexes[i]
+                if is_same(other_index):
+                    return other_index
+            i = (i + 1) & mask
+        digests[i] = digest
+        self._indexes[i] = row_index
+        self.size += 1
+        if 3 * self.size > 2 * len(digests):
+            self._grow()
+        return None
+
+    def nbytes(self) -> int:
+        """Returns the size of the slot arrays in bytes."""
+        return (self._digests.itemsize * len(self._digests) +
+                self._indexes.itemsize * len(self._indexes))
+
+
+def _key_digest(pk: PrimaryKey) -> int:
+    """Returns a non-zero 64-bit digest of `pk`."""
+    return (hash(pk) & 0xFFFFFFFFFFFFFFFF) or 1
+
+
+class CompactUniqueRuleState(UniqueRuleState):
+    """A memory efficient state for the 'unique' rule.
+
+    Only a digest and a row index is kept for each key. The first row of a key
+    is fetched from `row_source` when a possible duplicate is found, both to
+    rule out digest collisions and to report the error."""
+    def __init__(self, row_source: RowSource) -> None:
+        super().__init__()
+        self.row_source = row_source
+        self.table_digests: dict[pt.TableId, KeyDigestTable] = \
+            defaultdict(KeyDigestTable)
+
+    def add(self, table_id: pt.TableId, field: str, pk: PrimaryKey,
+            row_index: RowIndex, row: Row) -> Optional[RowIndex]:
+        def is_same(other_index: RowIndex) -> bool:
+            other_row = self.row_source(other_index)
+            return get_primary_key(other_row, field) == pk
+
+        table = self.table_digests[table_id]
+        return table.add(_key_digest(pk), row_index, is_same)
+
+    def get_row(self, table_id: pt.TableId, pk: PrimaryKey,
+                row_index: RowIndex) -> Row:
+        return self.row_source(row_index)
+
+
+# (schema path, field)
+RuleLocation = tuple[tuple, str]
+
+
+class ValueCheckCache:
+    """Results of value checks, which only depend on the rule constraint and
+    the value, not the rest of the row. Each check is computed once per
+    distinct value of a column, and reused for every row with that value.
+
+    Only low-cardinality columns are cached. A rule location with more than
+    `MAX_VALUES` distinct values stops being cached, to not keep every value
+    of columns like IDs in memory."""
+    MAX_VALUES = 4096
+
+    def __init__(self) -> None:
+        self.rules: dict[str, dict[RuleLocation, Optional[dict]]] = \
+            defaultdict(dict)
+        self.constraint_sets: dict[tuple[str, RuleLocation],
+                                   Collection] = {}
+
+    def constraint_set(self, rule: str, location: RuleLocation,
+                       constraint: Collection) -> Collection:
+        """Returns the list `constraint` of `rule` as a frozenset, which is
+        compiled once per location. Membership is then O(1) regardless of
+        the number of values. `constraint` is returned as is if it has
+        unhashable values."""
+        key = (rule, location)
+        result = self.constraint_sets.get(key)
+        if result is None:
+            try:
+                result = frozenset(constraint)
+            except TypeError:
+                result = constraint
+            self.constraint_sets[key] = result
+        return result
+
+    def check(self, rule: str, location: RuleLocation,
+              value: Optional[SomeValue], check: Callable[[], bool]
+              ) -> bool:
+        """Returns the cached result of `check` for `value`, or calls it."""
+        locations = self.rules[rule]
+        results = locations.get(location, {})
+        if results is None:
+            return check()
+        # the type is part of the key, since `1 == 1.0 == True`
+        key = (type(value), value)
+        result = results.get(key)
+        if result is None:
+            result = check()
+            if len(results) < self.MAX_VALUES:
+                results[key] = result
+                locations[location] = results
+            else:
+                locations[location] = None
+        return result
+
 
 class ErrorState:
     def __init__(self) -> None:
@@ -195,15 +505,22 @@ class OdmValidator(Validator):
     # This is the main class used for validation.
 
     @staticmethod
-    def new():  # type: ignore
-        """Constructs this class with initialized state."""
+    def new(row_source: Optional[RowSource] = None):  # type: ignore
+        """Constructs this class with initialized state.
+
+        :param row_source: enables the compact state of the 'unique' rule,
+            which fetches rows by their index in the validated table.
+        """
         # `__init__` can't be used to init state because Cerberus creates
         # multiple instances of the validator, so the same instance/state won't
         # be passed to our custom validation methods. The arguments passed in
         # here are automatically assigned to `Validator._config` by Cerberus.
+        unique_state = (CompactUniqueRuleState(row_source) if row_source
+                        else UniqueRuleState())
         return OdmValidator(
-            unique_state=UniqueRuleState(),
+            unique_state=unique_state,
             error_state=ErrorState(),
+            value_checks=ValueCheckCache(),
         )
 
     def __init__(self, *args, **kwargs) -> None:  # type: ignore
@@ -213,61 +530,113 @@ class OdmValidator(Validator):
         self.allow_unknown = True
         self.unique_state = self._config['unique_state']
         self.error_state = self._config['error_state']
+        self.value_checks = self._config.get('value_checks')
+
+    def _check_value(self, rule: str, field: str,
+                     value: Optional[SomeValue], check: Callable[[], bool]
+                     ) -> bool:
+        """Returns the result of `check`, which must only depend on `value`
+        and the constraint of `rule`."""
+        if self.value_checks is None:
+            return check()
+        try:
+            return self.value_checks.check(
+                rule, (self.schema_path, field), value, check)
+        except TypeError:  # unhashable value
+            return check()
+
+    def _constraint_set(self, rule: str, field: str, constraint: Collection
+                        ) -> Collection:
+        if self.value_checks is None:
+            return constraint
+        return self.value_checks.constraint_set(
+            rule, (self.schema_path, field), constraint)
+
+    def _is_member(self, rule: str, field: str, value: Optional[SomeValue],
+                   constraint: Collection) -> bool:
+        values = self._constraint_set(rule, field, constraint)
+        try:
+            return value in values
+        except TypeError:  # unhashable value
+            return value in constraint
+
+    def _validate_allowed(self, allowed_values: list, field: str,
+                          value: Optional[SomeValue]) -> None:
+        """{'type': 'container'}"""
+        if isinstance(value, Iterable) and not isinstance(value, str):
+            super()._validate_allowed(allowed_values, field, value)
+        elif not self._check_value(
+                'allowed', field, value,
+                lambda: self._is_member('allowed', field, value,
+                                        allowed_values)):
+            self._error(field, errors.UNALLOWED_VALUE, value)
+
+    def _validate_forbidden(self, forbidden_values: list, field: str,
+                            value: Optional[SomeValue]) -> None:
+        """{'type': 'list'}"""
+        if isinstance(value, Sequence) and not isinstance(value, str):
+            super()._validate_forbidden(forbidden_values, field, value)
+        elif not self._check_value(
+                'forbidden', field, value,
+                lambda: not self._is_member('forbidden', field, value,
+                                            forbidden_values)):
+            self._error(field, errors.FORBIDDEN_VALUE, value)
 
     def _validate_emptyTrimmed(self, constraint: bool, field: str,
                                raw_value: Optional[SomeValue]) -> None:
         """{'type': 'boolean'}"""
-        expect_empty = constraint
-        is_str = isinstance(raw_value, str)
-        value = str(raw_value).strip() if is_str else raw_value
-        is_empty = not value
-        if is_empty != expect_empty:
+        def is_valid() -> bool:
+            expect_empty = constraint
+            is_str = isinstance(raw_value, str)
+            value = str(raw_value).strip() if is_str else raw_value
+            is_empty = not value
+            return is_empty == expect_empty
+
+        if not self._check_value(f'emptyTrimmed={constraint}', field,
+                                 raw_value, is_valid):
             err = ErrorDefinition(EMPTY_TRIMMED_RULE, 'emptyTrimmed')
             self._error(field, err)
 
     def _validate_unique(self, constraint: bool, field: str,
                          value: Optional[SomeValue]) -> None:
         """{'type': 'boolean'}"""
-        # the primary key (pk) is a compound key of partID and lastUpdated
         if not constraint:
             return
         offset = self.error_state.offset
         data_kind = self.error_state.data_kind
         table_id = self.document_path[0]
         row = self.document
-        row_ix = self.document_path[1]
-        row_num = get_row_num(row_ix, offset, data_kind)
-        lastUpdated = row.get('lastUpdated', '') or ''
-        assert isinstance(lastUpdated, str)
-        pk = (str(value).strip(), lastUpdated.strip())
+        row_ix = offset + self.document_path[1]
+        pk = get_primary_key(row, field)
         state = self.unique_state
-        primary_keys = state.table_keys[table_id]
+        first_row_ix = state.add(table_id, field, pk, row_ix, row)
+        if first_row_ix is None:
+            return
         tablekey = (table_id, pk)
-        if pk in primary_keys:
-            err = state.tablekey_errors.get(tablekey)
-            if not err:
-                (first_row_num, first_row) = state.tablekey_rows[tablekey]
-                err = AggregatedError(
-                    cerb_rule='unique',
-                    table_id=table_id,
-                    column_id=field,
-                    row_numbers=[first_row_num],
-                    rows=[first_row],
-                    column_meta=self.schema[field].get('meta', []),
-                    value=pk[0]
-                )
-                state.tablekey_errors[tablekey] = err
-            err.row_numbers.append(row_num)
-            err.rows.append(row)
-        else:
-            state.tablekey_rows[tablekey] = (row_num, row)
-            primary_keys.add(pk)
+        err = state.tablekey_errors.get(tablekey)
+        if not err:
+            first_row = state.get_row(table_id, pk, first_row_ix)
+            err = AggregatedError(
+                cerb_rule='unique',
+                table_id=table_id,
+                column_id=field,
+                row_numbers=[get_row_num(first_row_ix, 0, data_kind)],
+                rows=[first_row],
+                column_meta=self.schema[field].get('meta', []),
+                value=pk[0]
+            )
+            state.tablekey_errors[tablekey] = err
+        err.row_numbers.append(get_row_num(row_ix, 0, data_kind))
+        err.rows.append(row)
 
     def validate(self, offset: int, data_kind: DataKind,
                  *args: dict, **kwargs: dict) -> bool:
         self.error_state.offset = offset
         self.error_state.data_kind = data_kind
         self.error_state.aggregated_errors.clear()
+        # the schema has no normalization rules, and normalizing copies every
+        # row
+        kwargs.setdefault('normalize', False)  # type: ignore
         result = super().validate(*args, **kwargs)
         self.error_state.aggregated_errors += \
             self.unique_state.tablekey_errors.values()
@@ -0,0 +1,119 @@
+"""Compact row storage.
+
+Rows imported as dicts repeat every column name, and have a hash table each.
+Compact rows store their values in a tuple instead, and share a header with
+the column indexes of the dataset. They are read-only mappings, so they can
+be validated and reported the same way as dict rows.
+"""
+
+from typing import (
+    Iterable,
+    Iterator,
+    Mapping,
+    MutableSequence,
+    Optional,
+    Sequence,
+)
+
+from odm_validation.part_tables import SomeValue
+
+# column name -> value index
+Header = dict[str, int]
+
+CellValue = Optional[SomeValue]
+
+
+def make_header(columns: Iterable[str]) -> Header:
+    """Returns a header with the index of each column in `columns`. Later
+    duplicates replace earlier ones, like in `csv.DictReader`."""
+    return {column: i for i, column in enumerate(columns)}
+
+
+class CompactRow(Mapping[str, CellValue]):
+    """A read-only row with a shared header."""
+    __slots__ = ('_header', '_values')
+
+    def __init__(self, header: Header, values: Sequence[CellValue]) -> None:
+        self._header = header
+        self._values = tuple(values)
+
+    @property
+    def header(self) -> Header:
+        return self._header
+
+    def __getitem__(self, key: str) -> CellValue:
+        return self._values[self._header[key]]
+
+    def get(self, key: str,  # type: ignore[override]
+            default: CellValue = None) -> CellValue:
+        i = self._header.get(key)
+        return default if i is None else self._values[i]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._header
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._header)
+
+    def __len__(self) -> int:
+        return len(self._header)
+
+    def __repr__(self) -> str:
+        return repr(dict(self))
+
+    # rows are immutable, which makes copying unnecessary
+    def __copy__(self) -> 'CompactRow':
+        return self
+
+    def __deepcopy__(self, memo: dict) -> 'CompactRow':
+        return self
+
+    def __reduce__(self) -> tuple:
+        return (CompactRow, (self._header, self._values))
+
+    def replace(self, key: str, value: CellValue) -> 'CompactRow':
+        """Returns a copy of this row with the value of `key` replaced."""
+        values = list(self._values)
+        values[self._header[key]] = value
+        return CompactRow(self._header, values)
+
+
+def replace_value(row: Mapping[str, CellValue], key: str,
+                  value: CellValue) -> Mapping[str, CellValue]:
+    """Returns a copy of `row` with the value of `key` replaced. `row` itself
+    is never modified."""
+    if isinstance(row, CompactRow):
+        return row.replace(key, value)
+    result = dict(row)
+    result[key] = value
+    return result
+
+
+def set_value(rows: MutableSequence, index: int, key: str,
+              value: CellValue) -> None:
+    """Sets the value of `key` in `rows[index]`. Dict rows are modified in
+    place, while compact rows are read-only and replaced instead."""
+    row = rows[index]
+    if isinstance(row, CompactRow):
+        rows[index] = row.replace(key, value)
+    else:
+        row[key] = value
+
+
+def compact_rows(rows: Iterable[Mapping[str, CellValue]]
+                 ) -> list[CompactRow]:
+    """Converts `rows` to compact rows. Rows with the same columns share a
+    header."""
+    headers: dict[tuple[str, ...], Header] = {}
+    result = []
+    for row in rows:
+        if isinstance(row, CompactRow):
+            result.append(row)
+            continue
+        columns = tuple(row.keys())
+        header = headers.get(columns)
+        if header is None:
+            header = make_header(columns)
+            headers[columns] = header
+        result.append(CompactRow(header, tuple(row.values())))
+    return result
@@ -0,0 +1,136 @@
+"""Compressed file I/O.
+
+Input CSV files and reports are mostly repetitive text, which compresses
+well. Files with a compression extension (like ".csv.gz") are read and
+written through their codec here, as a stream, and other files are opened
+as usual.
+
+Compressed files are written by a background thread, which compresses the
+data while the next data is produced. The codecs release the GIL while
+compressing, so this overlaps with validation.
+"""
+
+import gzip
+import io
+import lzma
+import os
+import queue
+import threading
+from enum import Enum
+from typing import IO, Optional, Union, cast
+
+
+class Compression(Enum):
+    """File compression, by file extension."""
+    GZIP = 'gz'
+    XZ = 'xz'
+    ZSTD = 'zst'
+
+
+# the size of the chunks that are passed to the compression thread
+CHUNK_SIZE = 1 << 20
+
+# the max number of chunks waiting to be compressed, which blocks the writer
+# when the compression can't keep up
+_QUEUE_SIZE = 4
+
+# gzip defaults to the slowest level, while zlib defaults to this
+_GZIP_LEVEL = 6
+
+
+def split_compression(path: str) -> tuple[str, Optional[Compression]]:
+    """Returns `path` without its compression extension, and its
+    compression, if any."""
+    root, ext = os.path.splitext(path)
+    try:
+        return (root, Compression(ext[1:].lower()))
+    except ValueError:
+        return (path, None)
+
+
+def get_compression(path: str) -> Optional[Compression]:
+    return split_compression(path)[1]
+
+
+def _open_codec(path: str, compression: Compression, mode: str) -> IO[bytes]:
+    """Opens `path` in the binary `mode` ('rb' or 'wb') with the codec of
+    `compression`."""
+    if compression == Compression.GZIP:
+        return cast(IO[bytes], gzip.GzipFile(path, mode,
+                                             compresslevel=_GZIP_LEVEL))
+    elif compression == Compression.XZ:
+        return lzma.LZMAFile(path, mode)
+    else:
+        # imported here since zstandard is an optional dependency
+        import zstandard
+        return cast(IO[bytes], zstandard.open(path, mode))
+
+
+class _ThreadedWriter(io.RawIOBase):
+    """Writes chunks of data to `file` in a background thread. Errors of
+    the thread are raised by the next write, or by `close`."""
+
+    def __init__(self, file: IO[bytes]) -> None:
+        self.file = file
+        self.chunks: queue.Queue[Optional[bytes]] = queue.Queue(_QUEUE_SIZE)
+        self.error: Optional[Exception] = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self) -> None:
+        while True:
+            chunk = self.chunks.get()
+            if chunk is None:
+                break
+            if self.error:
+                continue  # the rest is dropped, but still consumed
+            try:
+                self.file.write(chunk)
+            except Exception as e:
+                self.error = e
+
+    def _check_error(self) -> None:
+        if self.error:
+            raise self.error
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b: Union[bytes, bytearray, memoryview]  # type: ignore
+              ) -> int:
+        self._check_error()
+        # the buffer is reused by the caller, so it's copied
+        self.chunks.put(bytes(b))
+        return len(b)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            self.chunks.put(None)
+            self.thread.join()
+            self.file.close()
+            self._check_error()
+        finally:
+            super().close()
+
+
+def open_file(path: str, mode: str = 'r') -> IO:
+    """Opens the file at `path`, like `open`, but decompresses or
+    compresses it if it has a compression extension.
+
+    :param mode: one of 'r', 'w', 'rb' or 'wb'. Compressed text is utf-8.
+    """
+    assert mode in ['r', 'w', 'rb', 'wb'], f'unsupported mode "{mode}"'
+    compression = get_compression(path)
+    is_binary = mode.endswith('b')
+    if not compression:
+        return open(path, mode)
+    is_writing = mode.startswith('w')
+    file: IO[bytes] = _open_codec(path, compression,
+                                  'wb' if is_writing else 'rb')
+    if is_writing:
+        file = io.BufferedWriter(_ThreadedWriter(file), CHUNK_SIZE)
+    if is_binary:
+        return file
+    return io.TextIOWrapper(file, encoding='utf-8')
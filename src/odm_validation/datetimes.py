@@ -0,0 +1,149 @@
+"""Fast datetime parsing.
+
+Parsing with dateutil is flexible but slow. Most datetime values are in one
+of a few fixed formats though, which are parsed directly here instead, with
+the same result as dateutil. Values that don't match any of the formats are
+parsed with dateutil.
+
+A `ColumnDatetimeParser` also infers the dominant format of a column, and
+tries it first.
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Optional
+
+import dateutil.parser as dateutil_parser
+
+# The shortest string accepted as a datetime. Shorter strings (like "2023")
+# are accepted by dateutil, by filling in the missing parts with the current
+# date, which isn't what we want.
+MIN_LENGTH = len('yyyymmdd')
+
+
+def _iso_format(m: re.Match) -> datetime:
+    # all the accepted strings are valid `fromisoformat` strings
+    return datetime.fromisoformat(m.string)
+
+
+def _time_args(m: re.Match, first_group: int) -> tuple[int, int, int, int]:
+    """Returns (hour, minute, second, microsecond) from the groups starting
+    at `first_group`."""
+    hour, minute, second, fraction = m.group(first_group, first_group + 1,
+                                             first_group + 2, first_group + 3)
+    if hour is None:
+        return (0, 0, 0, 0)
+    # fractions are zero-padded the same way as dateutil does it
+    return (int(hour), int(minute), int(second or 0),
+            int(fraction.ljust(6, '0')) if fraction else 0)
+
+
+def _date_format(m: re.Match) -> datetime:
+    return datetime(int(m[1]), int(m[2]), int(m[3]))
+
+
+def _ymd_format(m: re.Match) -> datetime:
+    return datetime(int(m[1]), int(m[2]), int(m[3]), *_time_args(m, 4))
+
+
+def _mdy_format(m: re.Match) -> Optional[datetime]:
+    # dateutil swaps the day and month when the month is out of range, which
+    # is left to dateutil
+    month = int(m[1])
+    if month > 12:
+        return None
+    return datetime(int(m[3]), month, int(m[2]), *_time_args(m, 4))
+
+
+def _compile(pattern: str) -> re.Pattern:
+    # `\d` would match any unicode digit otherwise
+    return re.compile(pattern, re.ASCII)
+
+
+_TIME = r'(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6}))?)?)?'
+_SPACE_TIME = _TIME.replace('[T ]', ' ')
+
+
+@dataclass(frozen=True)
+class DatetimeFormat:
+    name: str
+    pattern: re.Pattern
+    build: Callable[[re.Match], Optional[datetime]]
+
+
+FORMATS = [
+    # - fractions must be 3 or 6 digits long for `fromisoformat` in
+    #   Python 3.9, the others are handled by the 'y-m-d' format
+    # - time zones are left to dateutil, since it uses its own tzinfo types
+    DatetimeFormat(
+        'iso',
+        _compile(r'\d{4}-\d{2}-\d{2}'
+                 r'(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{3}|\.\d{6})?)?)?'),
+        _iso_format),
+    DatetimeFormat('y-m-d', _compile(r'(\d{4})-(\d{2})-(\d{2})' + _TIME),
+                   _ymd_format),
+    DatetimeFormat('ymd', _compile(r'(\d{4})(\d{2})(\d{2})'),
+                   _date_format),
+    DatetimeFormat('y/m/d',
+                   _compile(r'(\d{4})/(\d{2})/(\d{2})' + _SPACE_TIME),
+                   _ymd_format),
+    DatetimeFormat('m/d/y',
+                   _compile(r'(\d{1,2})/(\d{1,2})/(\d{4})' + _SPACE_TIME),
+                   _mdy_format),
+]
+
+
+def _try_format(fmt: DatetimeFormat, s: str) -> Optional[datetime]:
+    m = fmt.pattern.fullmatch(s)
+    if not m:
+        return None
+    try:
+        return fmt.build(m)
+    except ValueError:
+        # out of range values are left to dateutil
+        return None
+
+
+def _parse_slow(s: str) -> datetime:
+    if len(s) < MIN_LENGTH:
+        raise ValueError('datetime string is too short')
+    return dateutil_parser.parse(s)
+
+
+def parse_datetime(s: str) -> datetime:
+    """Parses `s` the same way as `dateutil.parser.parse`, except that
+    strings shorter than `MIN_LENGTH` are rejected. A ValueError is raised
+    on failure."""
+    for fmt in FORMATS:
+        result = _try_format(fmt, s)
+        if result is not None:
+            return result
+    return _parse_slow(s)
+
+
+class ColumnDatetimeParser:
+    """Parses the datetime values of a column, like `parse_datetime`.
+
+    The formats are ordered by how often they matched the first
+    `SAMPLE_SIZE` values, which puts the dominant format of the column first.
+    """
+    SAMPLE_SIZE = 100
+
+    def __init__(self) -> None:
+        self.formats = list(FORMATS)
+        self.counts = {fmt.name: 0 for fmt in FORMATS}
+        self.sampled = 0
+
+    def parse(self, s: str) -> datetime:
+        if self.sampled < self.SAMPLE_SIZE:
+            self.sampled += 1
+            if self.sampled == self.SAMPLE_SIZE:
+                self.formats.sort(key=lambda f: -self.counts[f.name])
+        for fmt in self.formats:
+            result = _try_format(fmt, s)
+            if result is not None:
+                if self.sampled < self.SAMPLE_SIZE:
+                    self.counts[fmt.name] += 1
+                return result
+        return _parse_slow(s)
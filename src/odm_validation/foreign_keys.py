@@ -0,0 +1,236 @@
+"""Validation of foreign keys across tables.
+
+Cerberus only sees one table at a time, so foreign keys are checked in a
+separate stage. A primary-key index is built once for each referenced table,
+and every foreign-key column is then probed against it in bulk.
+"""
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Collection, Iterable, Mapping, Optional
+# from pprint import pprint
+
+import odm_validation.part_tables as pt
+from odm_validation.cerberusext import AggregatedError, RowSource
+from odm_validation.input_data import DataKind
+from odm_validation.part_tables import SomeValue
+from odm_validation.reports import get_row_num
+from odm_validation.schemas import CerberusSchema
+
+
+FOREIGN_KEY_RULE = 'foreignKey'
+
+ColumnKey = tuple[pt.TableId, str]
+
+# the row number and value of a foreign key that can't be checked yet
+PendingKey = tuple[int, SomeValue]
+
+
+@dataclass(frozen=True)
+class ForeignKey:
+    table_id: pt.TableId
+    column_id: str
+    ref_table_ids: tuple[pt.TableId, ...]
+    """The tables where `column_id` is the primary key. A value only has to
+    exist in one of them."""
+    column_meta: pt.ColMeta = field(compare=False)
+
+
+def get_foreign_keys(cerb_schema: CerberusSchema) -> list[ForeignKey]:
+    """Returns all the foreign keys of `cerb_schema`."""
+    result = []
+    for table_id, table_schema in cerb_schema.items():
+        for column_id, rules in table_schema['schema']['schema'].items():
+            ref_table_ids = rules.get(FOREIGN_KEY_RULE)
+            if not ref_table_ids:
+                continue
+            result.append(ForeignKey(
+                table_id=table_id,
+                column_id=column_id,
+                ref_table_ids=tuple(ref_table_ids),
+                column_meta=rules.get('meta', []),
+            ))
+    return result
+
+
+def get_key_value(value: Optional[SomeValue]) -> str:
+    """Returns `value` normalized for key comparison."""
+    # keys are compared the same way as for the 'unique' rule
+    return '' if value is None else str(value).strip()
+
+
+class ForeignKeyIndex:
+    """Primary-key index of referenced tables.
+
+    Tables can be added all at once (batch mode) or one at a time across
+    multiple validation calls (streaming mode). Values referencing tables
+    that haven't been indexed yet are kept as pending, with only their row
+    number, and are resolved with `resolve_pending` once the referenced
+    tables are added. Each table must be added in its entirety before it can
+    be referenced.
+    """
+    def __init__(self, foreign_keys: list[ForeignKey]) -> None:
+        self.foreign_keys = foreign_keys
+        self.keys: dict[ColumnKey, set[str]] = {}
+        self.pending: dict[ForeignKey, list[PendingKey]] = defaultdict(list)
+
+        # the columns to index, per referenced table
+        self._ref_columns: dict[pt.TableId, set[str]] = defaultdict(set)
+        for fk in foreign_keys:
+            for ref_table_id in fk.ref_table_ids:
+                self._ref_columns[ref_table_id].add(fk.column_id)
+
+    def referenced_columns(self, table_id: pt.TableId) -> set[str]:
+        """Returns the columns of `table_id` that are referenced by foreign
+        keys."""
+        return self._ref_columns.get(table_id, set())
+
+    def table_foreign_keys(self, table_id: pt.TableId) -> list[ForeignKey]:
+        return [fk for fk in self.foreign_keys if fk.table_id == table_id]
+
+    def order_tables(self, table_ids: Iterable[pt.TableId]
+                     ) -> list[pt.TableId]:
+        """Returns `table_ids` with the referenced tables before the tables
+        referencing them, which avoids pending values when the tables are
+        validated one at a time in that order. Tables referencing each other
+        are kept in the given order."""
+        table_ids = list(table_ids)
+        given = set(table_ids)
+        refs: dict[pt.TableId, list[pt.TableId]] = defaultdict(list)
+        for fk in self.foreign_keys:
+            refs[fk.table_id] += fk.ref_table_ids
+        result: list[pt.TableId] = []
+        visited: set[pt.TableId] = set()
+
+        def visit(table_id: pt.TableId) -> None:
+            if table_id in visited:
+                return
+            visited.add(table_id)
+            for ref_table_id in refs[table_id]:
+                if ref_table_id in given:
+                    visit(ref_table_id)
+            result.append(table_id)
+
+        for table_id in table_ids:
+            visit(table_id)
+        return result
+
+    def add_keys(self, table_id: pt.TableId, column_id: str,
+                 keys: Iterable[str]) -> None:
+        """Indexes the primary keys of `column_id` in `table_id`. `keys` must
+        be normalized with `get_key_value`."""
+        key_set = set(keys)
+        key_set.discard('')
+        self.keys[(table_id, column_id)] = key_set
+
+    def add_table(self, table_id: pt.TableId, rows: pt.Dataset) -> None:
+        """Indexes the primary keys of `table_id` that are referenced by any
+        foreign key."""
+        for column_id in self.referenced_columns(table_id):
+            self.add_keys(table_id, column_id,
+                          (get_key_value(row.get(column_id)) for row in rows))
+
+    def _find_missing(self, fk: ForeignKey, values: set[str]
+                      ) -> tuple[set[str], bool]:
+        """Returns the subset of `values` missing from the indexed referenced
+        tables, and whether all the referenced tables are indexed."""
+        missing = values
+        complete = True
+        for ref_table_id in fk.ref_table_ids:
+            keys = self.keys.get((ref_table_id, fk.column_id))
+            if keys is None:
+                complete = False
+            else:
+                missing = missing - keys
+        return (missing, complete)
+
+    def _gen_error(self, fk: ForeignKey, row_num: int, value: SomeValue,
+                   rows: list[dict]) -> AggregatedError:
+        return AggregatedError(
+            cerb_rule=FOREIGN_KEY_RULE,
+            table_id=fk.table_id,
+            column_id=fk.column_id,
+            row_numbers=[row_num],
+            rows=rows,
+            column_meta=fk.column_meta,
+            value=value,
+            constraint='/'.join(fk.ref_table_ids),
+        )
+
+    def check_keys(self, table_id: pt.TableId,
+                   column_keys: Mapping[str, Collection[str]],
+                   row_source: RowSource, data_kind: DataKind
+                   ) -> list[AggregatedError]:
+        """Same as `check_table`, but for the normalized foreign key values
+        of each column. Rows are only fetched from `row_source` for the
+        invalid values."""
+        errors: list[AggregatedError] = []
+        for fk in self.table_foreign_keys(table_id):
+            values = column_keys.get(fk.column_id)
+            if values is None:
+                continue
+            distinct_values = set(values)
+            distinct_values.discard('')
+            missing, complete = self._find_missing(fk, distinct_values)
+            if not missing:
+                continue
+            for row_ix, value in enumerate(values):
+                if value not in missing:
+                    continue
+                row = row_source(row_ix)
+                row_num = get_row_num(row_ix, 0, data_kind)
+                if complete:
+                    errors.append(self._gen_error(fk, row_num,
+                                                  row[fk.column_id], [row]))
+                else:
+                    self.pending[fk].append((row_num, row[fk.column_id]))
+        return errors
+
+    def check_table(self, table_id: pt.TableId, rows: pt.Dataset,
+                    data_kind: DataKind) -> list[AggregatedError]:
+        """Returns an error for each foreign key value of `table_id` that
+        doesn't exist in its referenced table. Values referencing tables that
+        aren't indexed yet are kept as pending."""
+        column_keys = {}
+        for fk in self.table_foreign_keys(table_id):
+            column_keys[fk.column_id] = [get_key_value(row.get(fk.column_id))
+                                         for row in rows]
+        return self.check_keys(table_id, column_keys, rows.__getitem__,
+                               data_kind)
+
+    def pending_tables(self) -> list[pt.TableId]:
+        """Returns the tables with pending foreign key values."""
+        return list(dict.fromkeys(fk.table_id for fk in self.pending))
+
+    def resolve_pending(self, table_id: pt.TableId
+                        ) -> list[AggregatedError]:
+        """Returns the errors of the pending values of `table_id` that can
+        be confirmed with the currently indexed tables, and drops the ones
+        that turned out to be valid. The errors have no rows, since only the
+        row numbers are kept."""
+        errors: list[AggregatedError] = []
+        for fk in self.table_foreign_keys(table_id):
+            pending = self.pending.get(fk)
+            if pending is None:
+                continue
+            values = set(get_key_value(value) for _, value in pending)
+            missing, complete = self._find_missing(fk, values)
+            remaining = [(row_num, value) for row_num, value in pending
+                         if get_key_value(value) in missing]
+            if complete:
+                errors += [self._gen_error(fk, row_num, value, [])
+                           for row_num, value in remaining]
+                del self.pending[fk]
+            elif remaining:
+                self.pending[fk] = remaining
+            else:
+                del self.pending[fk]
+        return errors
+
+    def drop_pending(self) -> dict[ForeignKey, int]:
+        """Drops the pending values, which can't be checked since their
+        referenced tables were never added, and returns how many there were
+        of each foreign key."""
+        result = {fk: len(pending) for fk, pending in self.pending.items()}
+        self.pending.clear()
+        return result
@@ -4,3 +4,18 @@ from enum import Enum
 class DataKind(Enum):
     python = 1
     spreadsheet = 2
+
+
+class Coercion(Enum):
+    """Which columns are coerced to their schema types before validation.
+
+    - all: every column with a type.
+    - untyped: the columns that aren't already typed in a sample of rows.
+    - none: no columns, the data is trusted to be typed already.
+
+    Values that aren't coerced, but have the wrong type, are reported by the
+    validation instead.
+    """
+    all = 1
+    untyped = 2
+    none = 3
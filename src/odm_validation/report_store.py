@@ -0,0 +1,341 @@
+"""Indexed SQLite report storage.
+
+Big reports are slow to load as json, just to look at some of their errors.
+A report store keeps the errors and warnings of a report in an SQLite
+database instead, with normalized tables for the rules, tables, columns and
+row numbers of the errors, which are indexed for filtering. The errors can
+be added as they are found, and summaries are computed with SQL aggregates.
+"""
+
+import json
+import os
+import sqlite3
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Iterator, Optional
+
+from odm_validation.reports import (
+    ErrorKind,
+    ValidationReport,
+    get_error_kind,
+    get_error_type_field_name,
+)
+from odm_validation.rules import RuleId
+from odm_validation.summarization import (
+    Count,
+    Counts,
+    ErrorCounts,
+    SummarizedReport,
+    SummaryKey,
+    TableCounts,
+    get_error_row_ids,
+    get_fields,
+    summarize_counts,
+)
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rules (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS tables (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS columns (
+    id INTEGER PRIMARY KEY,
+    table_id INTEGER NOT NULL REFERENCES tables (id),
+    name TEXT NOT NULL,
+    UNIQUE (table_id, name)
+);
+-- The fields of the entries that vary by rule are kept as json in `data`,
+-- without the fields of the normalized columns. The row numbers are kept in
+-- `data` too, as row numbers or ranges, while `entry_rows` only indexes them.
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    rule_id INTEGER NOT NULL REFERENCES rules (id),
+    column_id INTEGER NOT NULL REFERENCES columns (id),
+    first_row INTEGER NOT NULL,
+    row_count INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entry_rows (
+    entry_id INTEGER NOT NULL REFERENCES entries (id),
+    row INTEGER NOT NULL
+);
+'''
+
+# the indexes are created after the entries are added, which is faster
+_INDEXES = '''
+CREATE INDEX IF NOT EXISTS entries_by_column
+    ON entries (kind, column_id, rule_id);
+CREATE INDEX IF NOT EXISTS entries_by_rule ON entries (kind, rule_id);
+CREATE INDEX IF NOT EXISTS entry_rows_by_entry ON entry_rows (entry_id);
+CREATE INDEX IF NOT EXISTS entry_rows_by_row ON entry_rows (row);
+'''
+
+_ENTRY_JOINS = '''
+    JOIN columns c ON c.id = e.column_id
+    JOIN tables t ON t.id = c.table_id
+    JOIN rules r ON r.id = e.rule_id
+'''
+
+# Errors are sorted by table, column and first row in reports, while
+# warnings are kept in the order they were found.
+_ENTRY_ORDER = f'''
+    e.kind = '{ErrorKind.WARNING.value}',
+    CASE e.kind WHEN '{ErrorKind.ERROR.value}' THEN t.name END,
+    CASE e.kind WHEN '{ErrorKind.ERROR.value}' THEN c.name END,
+    CASE e.kind WHEN '{ErrorKind.ERROR.value}' THEN e.first_row END,
+    e.id
+'''
+
+# (entity, count) expressions of each summary key
+_KEY_EXPRS = {
+    SummaryKey.TABLE: ('t.name', 'SUM(p.row_count)'),
+    SummaryKey.COLUMN: ('c.name', 'SUM(p.row_count)'),
+    SummaryKey.ROW: ('er.row', 'COUNT(*)'),
+}
+
+_BATCH_SIZE = 1000
+
+
+class ReportStore:
+    """A report in an SQLite database at `path`. The database must exist,
+    unless `create` is True, which replaces any existing one. An existing
+    database is only written to when something is added to it, and never
+    when `readonly` is True.
+
+    Errors and warnings are added one at a time with `add`, like the
+    `on_error` callback of `_validate_data_ext`, and are only written
+    completely by `commit` or `close`.
+    """
+
+    def __init__(self, path: str, create: bool = False,
+                 readonly: bool = False) -> None:
+        assert not (create and readonly)
+        if create:
+            if os.path.exists(path):
+                os.remove(path)
+        elif not os.path.exists(path):
+            raise FileNotFoundError(f'report store "{path}" doesn\'t exist')
+        if readonly:
+            uri = Path(os.path.abspath(path)).as_uri()
+            self.db = sqlite3.connect(f'{uri}?mode=ro', uri=True)
+        else:
+            self.db = sqlite3.connect(path)
+        if create:
+            self.db.executescript(_SCHEMA)
+        self._is_modified = create
+        self._ids: dict[str, dict[tuple, int]] = {
+            'rules': {}, 'tables': {}, 'columns': {}}
+        self._next_entry_id = self.db.execute(
+            'SELECT COALESCE(MAX(id), 0) + 1 FROM entries').fetchone()[0]
+        self._entries: list[tuple] = []
+        self._entry_rows: list[tuple[int, int]] = []
+
+    def _get_id(self, table: str, key: tuple) -> int:
+        """Returns the id of `key` in the rules/tables/columns `table`,
+        which is added if missing."""
+        ids = self._ids[table]
+        result = ids.get(key)
+        if result is not None:
+            return result
+        names = ['name'] if table != 'columns' else ['table_id', 'name']
+        where = ' AND '.join(f'{name} = ?' for name in names)
+        row = self.db.execute(f'SELECT id FROM {table} WHERE {where}',
+                              key).fetchone()
+        if row:
+            result = row[0]
+        else:
+            values = ', '.join('?' * len(names))
+            result = self.db.execute(
+                f'INSERT INTO {table} ({", ".join(names)}) '
+                f'VALUES ({values})', key).lastrowid
+        assert result is not None
+        ids[key] = result
+        return result
+
+    def set_header(self, report: ValidationReport) -> None:
+        """Stores the versions and table info of `report`. Its errors and
+        warnings must be added separately."""
+        assert report.error_counts is None and report.warning_counts is None, \
+            'sampled reports can\'t be stored'
+        header = {key: value for key, value in vars(report).items()
+                  if key not in ['errors', 'warnings', 'error_counts',
+                                 'warning_counts']}
+        self.db.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                        ('header', json.dumps(header, default=get_fields)))
+        self._is_modified = True
+
+    def get_header(self) -> ValidationReport:
+        """Returns the stored report without its errors and warnings."""
+        row = self.db.execute(
+            "SELECT value FROM meta WHERE key = 'header'").fetchone()
+        assert row, 'the report store has no header'
+        return ValidationReport(**json.loads(row[0]), errors=[],
+                                warnings=[])
+
+    def add(self, e: dict) -> None:
+        """Adds the error or warning `e`."""
+        kind = get_error_kind(e)
+        type_field = get_error_type_field_name(kind)
+        rule_id = self._get_id('rules', (e[type_field],))
+        table_id = self._get_id('tables', (e['tableName'],))
+        column_id = self._get_id('columns', (table_id, e['columnName']))
+        row_nums = get_error_row_ids(e)
+        data = {key: value for key, value in e.items()
+                if key not in [type_field, 'tableName', 'columnName']}
+        entry_id = self._next_entry_id
+        self._next_entry_id += 1
+        # column errors count once
+        self._entries.append((entry_id, kind.value, rule_id, column_id,
+                              row_nums[0] if row_nums else 0,
+                              len(row_nums) or 1, json.dumps(data)))
+        self._is_modified = True
+        self._entry_rows += [(entry_id, row_num) for row_num in row_nums]
+        if len(self._entries) >= _BATCH_SIZE:
+            self._flush()
+
+    def add_report(self, report: ValidationReport) -> None:
+        """Stores all of `report`."""
+        self.set_header(report)
+        for e in report.errors:
+            self.add(e)
+        for w in report.warnings:
+            self.add(w)
+
+    def _flush(self) -> None:
+        if not self._entries:
+            return
+        self.db.executemany('INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            self._entries)
+        self.db.executemany('INSERT INTO entry_rows VALUES (?, ?)',
+                            self._entry_rows)
+        self._entries.clear()
+        self._entry_rows.clear()
+
+    def commit(self) -> None:
+        """Writes the errors added so far, and indexes them."""
+        if not self._is_modified:
+            return
+        self._flush()
+        self.db.executescript(_INDEXES)
+        self.db.commit()
+        self._is_modified = False
+
+    def close(self) -> None:
+        self.commit()
+        self.db.close()
+
+    def query(self, kind: Optional[ErrorKind] = None,
+              table: Optional[str] = None, column: Optional[str] = None,
+              rule: Optional[RuleId] = None,
+              rows: Optional[tuple[int, int]] = None) -> Iterator[dict]:
+        """Generates the errors and warnings matching all the filters given,
+        with errors first, in the same order as in a report.
+
+        :param rows: an inclusive range of row numbers. Errors with any row
+            in the range are included.
+        """
+        self._flush()
+        conditions = []
+        params: list[object] = []
+        for expr, value in [('e.kind', kind.value if kind else None),
+                            ('t.name', table), ('c.name', column),
+                            ('r.name', rule.name if rule else None)]:
+            if value is not None:
+                conditions.append(f'{expr} = ?')
+                params.append(value)
+        if rows is not None:
+            conditions.append('e.id IN (SELECT entry_id FROM entry_rows '
+                              'WHERE row BETWEEN ? AND ?)')
+            params += rows
+        where = ('WHERE ' + ' AND '.join(conditions)) if conditions else ''
+        cursor = self.db.execute(
+            f'SELECT e.kind, r.name, t.name, c.name, e.data '
+            f'FROM entries e {_ENTRY_JOINS} {where} '
+            f'ORDER BY {_ENTRY_ORDER}', params)
+        for entry_kind, rule_name, table_name, column_name, data in cursor:
+            type_field = get_error_type_field_name(ErrorKind(entry_kind))
+            yield {type_field: rule_name, 'tableName': table_name,
+                   'columnName': column_name, **json.loads(data)}
+
+    def read_report(self) -> ValidationReport:
+        """Returns the whole stored report."""
+        header = self.get_header()
+        header.errors.extend(self.query(ErrorKind.ERROR))
+        header.warnings.extend(self.query(ErrorKind.WARNING))
+        return header
+
+    def _count_kind(self, kind: ErrorKind, keys: set[SummaryKey]) -> Counts:
+        # The position of each entry in the report orders the counts like an
+        # `OnlineSummarizer` does, by the position of their first error.
+        # Errors are sorted by table and column name, which are ranked first,
+        # since sorting by integers is faster.
+        order = ('r.rank, e.first_row, e.id' if kind == ErrorKind.ERROR
+                 else 'e.id')
+        self.db.execute('DROP TABLE IF EXISTS temp.positions')
+        self.db.execute(f'''
+            CREATE TEMP TABLE positions AS
+            WITH r AS (
+                SELECT c.id, c.table_id,
+                       ROW_NUMBER() OVER (ORDER BY t.name, c.name) AS rank
+                FROM columns c JOIN tables t ON t.id = c.table_id
+            )
+            SELECT e.id, e.rule_id, e.column_id, r.table_id, e.row_count,
+                   ROW_NUMBER() OVER (ORDER BY {order}) AS pos
+            FROM entries e JOIN r ON r.id = e.column_id
+            WHERE e.kind = ?
+        ''', (kind.value,))
+
+        total_counts: ErrorCounts = defaultdict(Count)
+        cursor = self.db.execute('''
+            SELECT r.name, SUM(p.row_count)
+            FROM positions p JOIN rules r ON r.id = p.rule_id
+            GROUP BY p.rule_id
+            ORDER BY MIN(p.pos)
+        ''')
+        for rule_name, count in cursor:
+            total_counts[RuleId[rule_name]] = count
+
+        key_counts: dict[SummaryKey, TableCounts] = defaultdict(dict)
+        for key in keys:
+            entity, count = _KEY_EXPRS[key]
+            row_join = ('JOIN entry_rows er ON er.entry_id = p.id'
+                        if key == SummaryKey.ROW else '')
+            cursor = self.db.execute(f'''
+                SELECT t.name, {entity}, r.name, {count}
+                FROM positions p
+                    JOIN tables t ON t.id = p.table_id
+                    JOIN columns c ON c.id = p.column_id
+                    JOIN rules r ON r.id = p.rule_id
+                    {row_join}
+                GROUP BY p.table_id, {entity}, p.rule_id
+                ORDER BY MIN(p.pos)
+            ''')
+            table_counts = key_counts[key]
+            for table_id, entity_id, rule_name, n in cursor:
+                entity_counts = table_counts.get(table_id)
+                if entity_counts is None:
+                    entity_counts = Counter()
+                    table_counts[table_id] = entity_counts
+                entity_counts[(entity_id, RuleId[rule_name])] = n
+        self.db.execute('DROP TABLE temp.positions')
+        return Counts(total_counts=total_counts, key_counts=key_counts)
+
+    def count(self, keys: set[SummaryKey]) -> dict[ErrorKind, Counts]:
+        """Counts the errors and warnings by `keys`, with SQL aggregates.
+        The counts are the same as counted by an `OnlineSummarizer`."""
+        self._flush()
+        return {kind: self._count_kind(kind, keys) for kind in ErrorKind}
+
+    def summarize(self, by: set[SummaryKey] = {SummaryKey.TABLE}
+                  ) -> SummarizedReport:
+        """Summarizes the stored report, the same as `summarize_report`."""
+        return summarize_counts(self.get_header(), by, self.count(by))
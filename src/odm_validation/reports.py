@@ -1,12 +1,24 @@
 import datetime
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Optional, TypedDict, Union, cast
+from functools import lru_cache
+from typing import (
+    Callable,
+    ItemsView,
+    Iterator,
+    Optional,
+    TypedDict,
+    Union,
+    ValuesView,
+    cast,
+)
+
+import yaml
 
 import odm_validation.part_tables as pt
 from odm_validation.part_tables import SomeValue
 from odm_validation.input_data import DataKind
-from odm_validation.rules import get_anyof_constraint, RuleId
+from odm_validation.rules import Rule, RuleId, get_anyof_constraint
 from odm_validation.stdext import (
     get_len,
     quote,
@@ -26,10 +38,33 @@ class ErrorVerbosity(int, Enum):
     LONG_METADATA_MESSAGE = 3
 
 
+@dataclass(frozen=True)
+class ColumnErrorCtx:
+    """The error context that is the same for all the errors of a column and
+    Cerberus rule."""
+    rule: Rule
+    datatype: Optional[str]
+    allowed_values: frozenset[str]
+    meta_rule_ids: list[str]
+    rule_fields: pt.Meta
+
+
+# (table_id, column_id, cerberus rule, has schema column)
+ColumnErrorKey = tuple[pt.TableId, str, str, bool]
+
+
 @dataclass(frozen=True)
 class ValidationCtx:
     verbosity: ErrorVerbosity
 
+    # computed once per validation, by `rule_errors`
+    column_ctxs: dict[ColumnErrorKey, Optional[ColumnErrorCtx]] = field(
+        default_factory=dict, compare=False, repr=False)
+
+
+# an inclusive range of row numbers, as [start, end]
+RowRange = list[int]
+
 
 @dataclass(frozen=True)
 class ErrorCtx:
@@ -41,7 +76,7 @@ class ErrorCtx:
     table_id: str
     value: SomeValue
 
-    allowed_values: set[str] = field(default_factory=set)
+    allowed_values: frozenset[str] = frozenset()
     cerb_type_name: str = ''
     constraint: Optional[SomeValue] = None
     data_kind: DataKind = DataKind.python
@@ -49,12 +84,151 @@ class ErrorCtx:
     is_column: bool = False
     verbosity: ErrorVerbosity = ErrorVerbosity.LONG_METADATA_MESSAGE
 
+    # the row numbers as ranges, which replace `row_numbers` when given, for
+    # errors with many rows
+    row_ranges: Optional[list[RowRange]] = None
+
+    # computed from `column_meta` if not given
+    meta_rule_ids: Optional[list[str]] = None
+    rule_fields: Optional[pt.Meta] = None
+
+
+class _Pending:
+    """A report entry field that hasn't been rendered yet."""
+    __slots__ = ('render',)
+
+    def __init__(self, render: Callable[[], object]) -> None:
+        self.render = render
+
+
+class ReportEntry(dict[str, object]):
+    """An error or warning of a report.
+
+    The costly fields (like the message and the row) are only rendered when
+    they're first accessed, which is never for fields that are deleted
+    before that. The entry otherwise behaves like a plain dict, and is
+    rendered completely when compared, copied or serialized.
+    """
+    # Pending fields are stored as `_Pending` values, which keeps the order
+    # and membership of the keys. Every method that reads values is
+    # overridden to render them first. `__iter__` is overridden as well,
+    # since `dict(entry)` would copy the pending values directly otherwise.
+
+    def set_pending(self, key: str, render: Callable[[], object]) -> None:
+        """Sets the field `key` to be rendered by `render` when it's first
+        accessed."""
+        super().__setitem__(key, _Pending(render))
+
+    def _render(self, key: str) -> object:
+        value = super().__getitem__(key)
+        if isinstance(value, _Pending):
+            value = value.render()
+            super().__setitem__(key, value)
+        return value
+
+    def _render_all(self) -> None:
+        for key in super().keys():
+            self._render(key)
+
+    def __getitem__(self, key: str) -> object:
+        return self._render(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return super().__iter__()
+
+    def __eq__(self, other: object) -> bool:
+        self._render_all()
+        if isinstance(other, ReportEntry):
+            other._render_all()
+        return super().__eq__(other)
+
+    def __ne__(self, other: object) -> bool:
+        return not self == other
+
+    def __or__(self, other: dict) -> dict:  # type: ignore[override]
+        self._render_all()
+        return super().__or__(other)
+
+    def __repr__(self) -> str:
+        self._render_all()
+        return super().__repr__()
+
+    def __reduce__(self) -> tuple:
+        # copied and pickled as a plain dict
+        return (dict, (dict(self.items()),))
+
+    def get(self, key: str,  # type: ignore[override]
+            default: object = None) -> object:
+        return self._render(key) if key in self else default
+
+    def items(self) -> ItemsView[str, object]:  # type: ignore[override]
+        self._render_all()
+        return super().items()
+
+    def values(self) -> ValuesView[object]:  # type: ignore[override]
+        self._render_all()
+        return super().values()
+
+    def copy(self) -> dict:
+        self._render_all()
+        return super().copy()
+
+    def pop(self, key: str, *default: object) -> object:  # type: ignore
+        if key in self:
+            value = self._render(key)
+            super().__delitem__(key)
+            return value
+        return super().pop(key, *default)
+
+    def popitem(self) -> tuple[str, object]:
+        self._render_all()
+        return super().popitem()
+
+    def setdefault(self, key: str,  # type: ignore[override]
+                   default: object = None) -> object:
+        if key in self:
+            return self._render(key)
+        return super().setdefault(key, default)
+
+
+# report entries are dumped as plain dicts, without yaml-tags
+for _dumper in (yaml.Dumper, yaml.SafeDumper):
+    yaml.add_representer(ReportEntry, _dumper.represent_dict, Dumper=_dumper)
+
 
 class TableInfo(TypedDict):
     columns: int
     rows: int
 
 
+# table -> column -> rule -> count
+ErrorCountTree = dict[pt.TableId, dict[str, dict[str, int]]]
+
+
+def add_error_count(counts: ErrorCountTree, table_id: pt.TableId,
+                    column_id: str, rule_name: str, count: int) -> None:
+    column_counts = counts.setdefault(table_id, {}).setdefault(column_id, {})
+    column_counts[rule_name] = column_counts.get(rule_name, 0) + count
+
+
+def _add_counts(result: ErrorCountTree, counts: ErrorCountTree) -> None:
+    for table_id, table_counts in counts.items():
+        for column_id, column_counts in table_counts.items():
+            for rule_name, count in column_counts.items():
+                add_error_count(result, table_id, column_id, rule_name,
+                                count)
+
+
+def _join_counts(a: Optional[ErrorCountTree], b: Optional[ErrorCountTree]
+                 ) -> Optional[ErrorCountTree]:
+    if a is None or b is None:
+        return a if b is None else b
+    result: ErrorCountTree = {}
+    _add_counts(result, a)
+    _add_counts(result, b)
+    return result
+
+
 @dataclass(frozen=True)
 class ValidationReport:
     data_version: str
@@ -64,10 +238,23 @@ class ValidationReport:
     errors: list[dict]
     warnings: list[dict]
 
+    # the number of rows with each error/warning, when `errors` and
+    # `warnings` are only a sample of them
+    error_counts: Optional[ErrorCountTree] = None
+    warning_counts: Optional[ErrorCountTree] = None
+
     def valid(self) -> bool:
         return len(self.errors) == 0
 
 
+def get_report_fields(report: ValidationReport) -> dict:
+    """Returns the fields of `report`, for serialization. The counts are
+    omitted unless the report is sampled, like before they existed."""
+    return {key: value for key, value in vars(report).items()
+            if value is not None or
+            key not in ['error_counts', 'warning_counts']}
+
+
 def join_reports(a: Optional[ValidationReport], b: ValidationReport
                  ) -> ValidationReport:
     """Joins two reports together into a new report."""
@@ -83,9 +270,71 @@ def join_reports(a: Optional[ValidationReport], b: ValidationReport
         table_info=(a.table_info | b.table_info),
         errors=(a.errors + b.errors),
         warnings=(a.warnings + b.warnings),
+        error_counts=_join_counts(a.error_counts, b.error_counts),
+        warning_counts=_join_counts(a.warning_counts, b.warning_counts),
     )
 
 
+class ReportBuilder:
+    """Builds one report from many, like the reports of each table or
+    shard. The reports are kept as segments until `build` joins them, once.
+    `join_reports` copies the errors of both reports every time instead,
+    which is quadratic when joining many reports.
+
+    Reports from parallel workers can be added in the order they finish,
+    with the index of their task. The report is built in the order of the
+    indexes, which is the same as adding the reports in task order.
+    """
+
+    def __init__(self) -> None:
+        # (index, number added before, report)
+        self._segments: list[tuple[int, int, ValidationReport]] = []
+
+    def add(self, report: ValidationReport, index: Optional[int] = None
+            ) -> None:
+        """Adds `report` at `index`, which defaults to the number of reports
+        added so far. Reports with the same index are kept in the order
+        they were added."""
+        n = len(self._segments)
+        self._segments.append((n if index is None else index, n, report))
+
+    def build(self) -> ValidationReport:
+        """Joins the reports added, like `join_reports`."""
+        assert len(self._segments) > 0, 'no reports to build'
+        segments = sorted(self._segments, key=lambda s: s[:2])
+        first = segments[0][2]
+        table_info: dict[pt.TableId, TableInfo] = {}
+        errors: list[dict] = []
+        warnings: list[dict] = []
+        error_counts: Optional[ErrorCountTree] = None
+        warning_counts: Optional[ErrorCountTree] = None
+        for _, _, report in segments:
+            assert report.data_version == first.data_version
+            assert report.schema_version == first.schema_version
+            assert report.package_version == first.package_version
+            table_info.update(report.table_info)
+            errors += report.errors
+            warnings += report.warnings
+            if report.error_counts is not None:
+                if error_counts is None:
+                    error_counts = {}
+                _add_counts(error_counts, report.error_counts)
+            if report.warning_counts is not None:
+                if warning_counts is None:
+                    warning_counts = {}
+                _add_counts(warning_counts, report.warning_counts)
+        return ValidationReport(
+            data_version=first.data_version,
+            schema_version=first.schema_version,
+            package_version=first.package_version,
+            table_info=table_info,
+            errors=errors,
+            warnings=warnings,
+            error_counts=error_counts,
+            warning_counts=warning_counts,
+        )
+
+
 def _fmt_list(items: list) -> str:
     if len(items) > 1:
         return ','.join(map(str, items))
@@ -93,6 +342,26 @@ def _fmt_list(items: list) -> str:
         return str(items[0])
 
 
+def add_row_number(ranges: list[RowRange], row_num: int) -> None:
+    """Adds `row_num` to `ranges`, by extending the last range when it's the
+    next row."""
+    if ranges and ranges[-1][1] + 1 == row_num:
+        ranges[-1][1] = row_num
+    else:
+        ranges.append([row_num, row_num])
+
+
+def expand_row_ranges(ranges: list[RowRange]) -> list[int]:
+    """Returns the row numbers of `ranges`."""
+    return [n for start, end in ranges for n in range(start, end + 1)]
+
+
+def _fmt_ranges(ranges: list[RowRange]) -> str:
+    """Formats `ranges` like "1-3,5"."""
+    return ','.join(str(start) if start == end else f'{start}-{end}'
+                    for start, end in ranges)
+
+
 def get_row_num(row_index: int, offset: int, data_kind: DataKind) -> int:
     "Returns the dataset row number, starting from 1."
     # spreadsheets have a header row, which increases the number by one
@@ -117,7 +386,9 @@ def _fmt_dataset_values(rows: list[pt.Row]) -> list[pt.Row]:
     return list(map(_fmt_row, rows))
 
 
-def _fmt_allowed_values(values: set[str]) -> str:
+@lru_cache(maxsize=32)
+def _fmt_allowed_values(values: frozenset[str]) -> str:
+    # cached, since the same values are formatted for every error of a column
     # XXX: The order of set-elements isn't deterministic, so we need to sort.
     return '/'.join(sorted(values))
 
@@ -202,7 +473,8 @@ def _gen_error_msg(ctx: ErrorCtx, template: Optional[str] = None,
         allowed_values=_fmt_allowed_values(ctx.allowed_values),
         column_id=ctx.column_id,
         constraint=_fmt_msg_value(constraint_val, relaxed=True),
-        row_num=_fmt_list(ctx.row_numbers),
+        row_num=(_fmt_ranges(ctx.row_ranges) if ctx.row_ranges is not None
+                 else _fmt_list(ctx.row_numbers)),
         rule_id=ctx.rule_id.name,
         table_id=ctx.table_id,
         value=_fmt_msg_value(ctx.value),
@@ -234,32 +506,51 @@ def gen_rule_error(ctx: ErrorCtx,
     """
     :param err_template: overrides rule error-template
     """
-    rule_ids = _get_meta_rule_ids(ctx.column_meta)
-    rule_fields = pt.get_validation_rule_fields(ctx.column_meta, rule_ids)
-    error: dict[str, Union[int, float, str, list, dict]] = {
-        (get_error_type_field_name(kind)): ctx.rule_id.name,
-        'tableName': ctx.table_id,
-        'columnName': ctx.column_id,
-        'validationRuleFields': _fmt_dataset_values(rule_fields),
-        'message': _gen_error_msg(ctx, err_template, kind),
-    }
+    rule_ids = ctx.meta_rule_ids
+    if rule_ids is None:
+        rule_ids = get_meta_rule_ids(ctx.column_meta)
+
+    def gen_rule_fields() -> list[pt.Row]:
+        rule_fields = ctx.rule_fields
+        if rule_fields is None:
+            rule_fields = pt.get_validation_rule_fields(ctx.column_meta,
+                                                        rule_ids)
+        return _fmt_dataset_values(rule_fields)
+
+    def gen_rows() -> list[pt.Row]:
+        return _fmt_dataset_values(ctx.rows)
+
+    error = ReportEntry()
+    error[get_error_type_field_name(kind)] = ctx.rule_id.name
+    error['tableName'] = ctx.table_id
+    error['columnName'] = ctx.column_id
+    error.set_pending('validationRuleFields', gen_rule_fields)
+    error.set_pending('message',
+                      lambda: _gen_error_msg(ctx, err_template, kind))
 
     # skip row info for spreadsheet-column errors
     if ctx.data_kind == DataKind.spreadsheet and ctx.is_column:
         return error
 
-    # row numbers
-    if len(ctx.row_numbers) > 1:
+    # row numbers, as ranges if given as such
+    ranges = ctx.row_ranges
+    if ranges is not None and (len(ranges) > 1 or ranges[0][0] < ranges[0][1]):
+        error['rowRanges'] = ranges
+    elif ranges is not None:
+        error['rowNumber'] = ranges[0][0]
+    elif len(ctx.row_numbers) > 1:
         error['rowNumbers'] = ctx.row_numbers
     else:
         error['rowNumber'] = ctx.row_numbers[0]
 
-    # rows
-    rows = _fmt_dataset_values(ctx.rows)
-    if len(ctx.rows) > 1:
-        error['rows'] = rows
+    # rows, which may be limited to the first few of the row numbers, or
+    # missing when only the row numbers were kept
+    if not ctx.rows:
+        pass
+    elif 'rowNumber' not in error:
+        error.set_pending('rows', gen_rows)
     else:
-        error['row'] = rows[0]
+        error.set_pending('row', lambda: gen_rows()[0])
 
     # value
     if ctx.value is not None:
@@ -279,7 +570,7 @@ def _generalize_cerb_type_name(name: str) -> str:
         return name
 
 
-def _get_meta_rule_ids(column_meta: pt.ColMeta) -> list[str]:
+def get_meta_rule_ids(column_meta: pt.ColMeta) -> list[str]:
     if not column_meta:
         return []
     return [cast(str, m['ruleID']) for m in column_meta]
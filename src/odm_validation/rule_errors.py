@@ -1,6 +1,6 @@
 import logging
-from itertools import groupby
-from typing import Optional, Union, cast
+from dataclasses import replace
+from typing import Callable, Iterable, Optional, Union, cast
 # from pprint import pprint
 
 from cerberus.errors import ValidationError
@@ -10,14 +10,16 @@ import odm_validation.reports as reports
 from odm_validation.part_tables import ColMeta, Meta, MetaEntry, SomeValue
 from odm_validation.cerberusext import AggregatedError
 from odm_validation.input_data import DataKind
-from odm_validation.reports import ErrorKind, ValidationCtx, get_row_num
+from odm_validation.reports import (
+    ColumnErrorCtx,
+    ErrorKind,
+    ValidationCtx,
+    get_row_num,
+)
 from odm_validation.rule_filters import RuleFilter
 from odm_validation.rules import Rule, RuleId, get_anyof_constraint, ruleset
 from odm_validation.schemas import CerberusSchema, Schema, init_table_schema
-from odm_validation.stdext import (
-    countdown,
-    deep_update,
-)
+from odm_validation.stdext import deep_update
 
 RuleError = tuple[RuleId, dict]
 
@@ -78,8 +80,8 @@ def _transform_rule(rule: Rule, column_meta: pt.ColMeta) -> Rule:
     return rule
 
 
-def _get_allowed_values(cerb_rules: dict[str, str]) -> set[str]:
-    return set(map(str, cerb_rules.get('allowed', [])))
+def _get_allowed_values(cerb_rules: dict[str, str]) -> frozenset[str]:
+    return frozenset(map(str, cerb_rules.get('allowed', [])))
 
 
 def _get_column_rule_metas(column_meta: ColMeta) -> Meta:
@@ -113,6 +115,41 @@ def _cerb_to_odm_type(cerb_type: Optional[str]) -> Optional[str]:
     return None
 
 
+def _gen_column_ctx(cerb_rule: str, column_meta: pt.ColMeta,
+                    schema_column: Optional[dict[str, str]]
+                    ) -> Optional[ColumnErrorCtx]:
+    rule = _get_rule_for_cerb_key(cerb_rule, column_meta)
+    if not rule:
+        return None
+    cerb_type = schema_column.get('type', None) if schema_column else None
+    odm_type = _extract_datatype(column_meta)
+    meta_rule_ids = reports.get_meta_rule_ids(column_meta)
+    return ColumnErrorCtx(
+        rule=rule,
+        datatype=odm_type or _cerb_to_odm_type(cerb_type),
+        allowed_values=(_get_allowed_values(schema_column) if schema_column
+                        else frozenset()),
+        meta_rule_ids=meta_rule_ids,
+        rule_fields=pt.get_validation_rule_fields(column_meta,
+                                                  meta_rule_ids),
+    )
+
+
+def _get_column_ctx(vctx: ValidationCtx, cerb_rule: str,
+                    table_id: pt.TableId, column_id: str,
+                    column_meta: pt.ColMeta,
+                    schema_column: Optional[dict[str, str]]
+                    ) -> Optional[ColumnErrorCtx]:
+    """Returns the error context of `column_id` and `cerb_rule`, which is
+    only generated once per validation."""
+    key = (table_id, column_id, cerb_rule, schema_column is not None)
+    if key in vctx.column_ctxs:
+        return vctx.column_ctxs[key]
+    result = _gen_column_ctx(cerb_rule, column_meta, schema_column)
+    vctx.column_ctxs[key] = result
+    return result
+
+
 def _gen_error_entry(
     vctx: ValidationCtx,
     cerb_rule: str,
@@ -126,13 +163,18 @@ def _gen_error_entry(
     constraint: Optional[Union[str, int, float]] = None,
     schema_column: Optional[dict[str, str]] = None,
     data_kind: DataKind = DataKind.python,
+    row_ranges: Optional[list[reports.RowRange]] = None,
 ) -> Optional[RuleError]:
     "Generates a single validation error from input params."
     if not value and cerb_rule == 'type':
         return None
 
-    rule = _get_rule_for_cerb_key(cerb_rule, column_meta)
-    if not (rule and rule_filter.enabled(rule)):
+    column_ctx = _get_column_ctx(vctx, cerb_rule, table_id, column_id,
+                                 column_meta, schema_column)
+    if not column_ctx:
+        return None
+    rule = column_ctx.rule
+    if not rule_filter.enabled(rule):
         return None
 
     # Only report column errors for the first line in spreadsheets.
@@ -144,18 +186,14 @@ def _gen_error_entry(
         if row_numbers[0] > first_row_num:
             return None
 
-    cerb_type = schema_column.get('type', None) if schema_column else None
-    odm_type = _extract_datatype(column_meta)
-    datatype = odm_type or _cerb_to_odm_type(cerb_type)
-
-    allowed = _get_allowed_values(schema_column) if schema_column else set()
     kind = ErrorKind.WARNING if rule.is_warning else ErrorKind.ERROR
     error_ctx = reports.ErrorCtx(
-        allowed_values=allowed,
+        allowed_values=column_ctx.allowed_values,
         column_id=column_id,
         column_meta=column_meta,
         constraint=constraint,
-        err_template=rule.get_error_template(value, datatype, data_kind),
+        err_template=rule.get_error_template(value, column_ctx.datatype,
+                                             data_kind),
         row_numbers=row_numbers,
         rows=rows, value=value,
         rule_id=rule.id,
@@ -163,6 +201,9 @@ def _gen_error_entry(
         data_kind=data_kind,
         is_column=rule.is_column,
         verbosity=vctx.verbosity,
+        row_ranges=row_ranges,
+        meta_rule_ids=column_ctx.meta_rule_ids,
+        rule_fields=column_ctx.rule_fields,
     )
     entry = reports.gen_rule_error(error_ctx, kind)
     return (rule.id, entry)
@@ -207,10 +248,86 @@ def _gen_cerb_error_entry(vctx: ValidationCtx, e: ValidationError, row: dict,
     )
 
 
+def _to_aggregated_error(e: ValidationError, row: dict,
+                         schema: CerberusSchema, offset: int,
+                         data_kind: DataKind) -> AggregatedError:
+    (table_id, row_index, column_id) = e.document_path
+    schema_column = schema[table_id]['schema']['schema'][column_id]
+    return AggregatedError(
+        cerb_rule=_get_cerb_rule(e),
+        table_id=table_id,
+        column_id=column_id,
+        row_numbers=[get_row_num(row_index, offset, data_kind)],
+        rows=[row],
+        column_meta=schema_column.get('meta', []),
+        value=e.value,
+        constraint=e.constraint,
+        schema_column=schema_column,
+        data_kind=data_kind,
+    )
+
+
+class ErrorGroups:
+    """Groups the errors with the same table, column, rule and value, into
+    one error each, including coercion errors. The row numbers of all the
+    errors are kept as ranges, but only the first `MAX_ROWS` rows."""
+    MAX_ROWS = 10
+
+    def __init__(self) -> None:
+        self.groups: dict[tuple, AggregatedError] = {}
+        self.coercion_groups: dict[tuple,
+                                   tuple[ErrorKind, reports.ErrorCtx]] = {}
+        self.row_ranges: dict[tuple, list[reports.RowRange]] = {}
+
+    def _add_rows(self, key: tuple, row_numbers: list[int], rows: list[dict],
+                  group_rows: list[dict]) -> None:
+        ranges = self.row_ranges.setdefault(key, [])
+        for row_num in row_numbers:
+            reports.add_row_number(ranges, row_num)
+        if len(group_rows) < self.MAX_ROWS:
+            group_rows += rows
+
+    def add(self, vctx: ValidationCtx, e: AggregatedError) -> bool:
+        """Adds the single-row error `e` to its group. Returns False if it
+        can't be grouped, which is the case for column errors and
+        unhashable values."""
+        column_ctx = _get_column_ctx(vctx, e.cerb_rule, e.table_id,
+                                     e.column_id, e.column_meta,
+                                     e.schema_column)
+        if not column_ctx or column_ctx.rule.is_column:
+            return False
+        # the type keeps values like 1 and True apart
+        key = (e.table_id, e.column_id, e.cerb_rule, type(e.value), e.value)
+        try:
+            group = self.groups.get(key)
+        except TypeError:  # unhashable value
+            return False
+        if group is None:
+            group = replace(e, row_numbers=[], rows=[])
+            self.groups[key] = group
+        self._add_rows(key, e.row_numbers, e.rows, group.rows)
+        return True
+
+    def add_coercion(self, kind: ErrorKind, ctx: reports.ErrorCtx) -> bool:
+        """Adds the single-row coercion error or warning `ctx` to its group.
+        Returns False if it can't be grouped, due to an unhashable value."""
+        key = (ctx.table_id, ctx.column_id, kind, type(ctx.value), ctx.value)
+        try:
+            group = self.coercion_groups.get(key)
+        except TypeError:  # unhashable value
+            return False
+        if group is None:
+            group = (kind, replace(ctx, row_numbers=[], rows=[]))
+            self.coercion_groups[key] = group
+        self._add_rows(key, ctx.row_numbers, ctx.rows, group[1].rows)
+        return True
+
+
 def _gen_aggregated_error_entry(vctx: ValidationCtx,
                                 agg_error: AggregatedError,
-                                rule_filter: RuleFilter
-                                ) -> Optional[RuleError]:
+                                rule_filter: RuleFilter,
+                                row_ranges: Optional[list[reports.RowRange]]
+                                = None) -> Optional[RuleError]:
     """Transforms a single aggregated error (from OdmValidator) to a validation
     error."""
     return _gen_error_entry(
@@ -223,6 +340,10 @@ def _gen_aggregated_error_entry(vctx: ValidationCtx,
         agg_error.rows,
         agg_error.column_meta,
         rule_filter,
+        agg_error.constraint,
+        agg_error.schema_column,
+        agg_error.data_kind,
+        row_ranges,
     )
 
 
@@ -231,9 +352,23 @@ def _get_table_name(x: dict) -> str:
 
 
 def _get_row_num(x: dict) -> Union[int, list[int]]:
+    row_ranges = x.get('rowRanges')
+    if row_ranges is not None:
+        return reports.expand_row_ranges(row_ranges)
     return x.get('rowNumber') or x.get('rowNumbers', [])
 
 
+def _get_first_row_num(x: dict) -> int:
+    """Returns the first row number of `x`, or 0 if it has none."""
+    row_ranges = x.get('rowRanges')
+    if row_ranges is not None:
+        return row_ranges[0][0]
+    row_num = _get_row_num(x)
+    if isinstance(row_num, list):
+        return row_num[0] if row_num else 0
+    return row_num
+
+
 def _get_column_name(x: dict) -> str:
     return x['columnName']
 
@@ -245,14 +380,7 @@ def _get_error_rule_id(x: dict) -> RuleId:
 
 
 def _get_table_rownum_column(x: dict) -> tuple[str, str, int]:
-    row_num = _get_row_num(x)
-    if isinstance(row_num, list):
-        if len(row_num) > 0:
-            row_num = row_num[0]
-        else:
-            row_num = 0
-    assert isinstance(row_num, int)
-    return (_get_table_name(x), _get_column_name(x), row_num)
+    return (_get_table_name(x), _get_column_name(x), _get_first_row_num(x))
 
 
 def _sort_errors(errors: list[dict]) -> list[dict]:
@@ -260,34 +388,144 @@ def _sort_errors(errors: list[dict]) -> list[dict]:
     return sorted(errors, key=_get_table_rownum_column)
 
 
+def _get_row_nums(x: dict) -> list[int]:
+    row_num = _get_row_num(x)
+    return row_num if isinstance(row_num, list) else [row_num]
+
+
+def _get_cells(x: dict) -> list[tuple[str, str, int]]:
+    """Returns the (table, column, row number) of each cell of `x`."""
+    table_id = _get_table_name(x)
+    column_id = _get_column_name(x)
+    return [(table_id, column_id, row_num) for row_num in _get_row_nums(x)]
+
+
+def _is_redundant_coercion(e: dict,
+                           invalid_type_cells: set[tuple[str, str, int]]
+                           ) -> bool:
+    """Returns True if all the cells of the `_coercion` error `e` also have
+    an `invalid_type` error."""
+    return all(cell in invalid_type_cells for cell in _get_cells(e))
+
+
 def filter_errors(errors: list[dict]) -> list[dict]:
-    """Removes redundant errors."""
+    """Removes redundant errors, and sorts the rest."""
     # This function currently only removes redundant _coercion errors produced
-    # by `invalid_type`.
-    #
-    # Errors are deleted in reverse order to keep the two lists in sync.
-    result = []
-    sorted_errors = _sort_errors(errors)
-    for tableName, table_errors in groupby(sorted_errors, _get_table_name):
-        for rowNum, row_errors in groupby(table_errors, _get_row_num):
-            for columnName, col_errors in groupby(row_errors,
-                                                  _get_column_name):
-                value_errors = list(col_errors)
-                rule_ids = list(map(_get_error_rule_id, value_errors))
-                if RuleId.invalid_type in rule_ids:
-                    for i in countdown(len(value_errors)):
-                        if rule_ids[i] == RuleId._coercion:
-                            del value_errors[i]
-                result += value_errors
-    return result
+    # by `invalid_type`. Row numbers are compared one by one, since grouped
+    # errors have the row numbers of all their rows.
+    invalid_type_cells = set()
+    for e in errors:
+        if _get_error_rule_id(e) == RuleId.invalid_type:
+            invalid_type_cells.update(_get_cells(e))
+
+    def is_redundant(e: dict) -> bool:
+        return (_get_error_rule_id(e) == RuleId._coercion and
+                _is_redundant_coercion(e, invalid_type_cells))
+
+    return [e for e in _sort_errors(errors) if not is_redundant(e)]
+
+
+class ErrorSampler:
+    """Keeps the first `max_examples` errors and warnings of each table,
+    column and rule, or all of them if None, and counts the rows of all of
+    them. `on_error` is called with every error and warning, including the
+    ones that aren't kept.
+
+    `_coercion` errors are kept back until `finish`, since they are
+    redundant when their cell has an `invalid_type` error, which is only
+    found after coercion.
+    """
+
+    def __init__(self, max_examples: Optional[int],
+                 on_error: Optional[Callable[[dict], None]] = None) -> None:
+        assert max_examples is None or max_examples >= 0
+        self.max_examples = max_examples
+        self.on_error = on_error
+        self.errors: list[dict] = []
+        self.warnings: list[dict] = []
+        self.error_counts: reports.ErrorCountTree = {}
+        self.warning_counts: reports.ErrorCountTree = {}
+        self._example_counts: dict[tuple, int] = {}
+        self._first_rows: dict[tuple[str, str, str], int] = {}
+        self._coercion_errors: list[dict] = []
+        self._invalid_type_cells: set[tuple[str, str, int]] = set()
+
+    def _add(self, kind: ErrorKind, e: dict) -> None:
+        if self.on_error:
+            self.on_error(e)
+        table_id = _get_table_name(e)
+        column_id = _get_column_name(e)
+        rule_name = e[reports.get_error_type_field_name(kind)]
+        # column errors have no row numbers, and count once
+        count = len(_get_row_nums(e)) or 1
+        counts = (self.error_counts if kind == ErrorKind.ERROR
+                  else self.warning_counts)
+        reports.add_error_count(counts, table_id, column_id, rule_name,
+                                count)
+        if kind == ErrorKind.ERROR:
+            row_num = _get_table_rownum_column(e)[2]
+            count_key = (table_id, column_id, rule_name)
+            first_row = self._first_rows.get(count_key)
+            if first_row is None or row_num < first_row:
+                self._first_rows[count_key] = row_num
+        examples = (self.errors if kind == ErrorKind.ERROR
+                    else self.warnings)
+        if self.max_examples is None:
+            examples.append(e)
+            return
+        key = (kind, table_id, column_id, rule_name)
+        n = self._example_counts.get(key, 0)
+        if n < self.max_examples:
+            self._example_counts[key] = n + 1
+            examples.append(e)
+
+    def drain(self, errors: list[dict], warnings: list[dict]) -> None:
+        """Moves `errors` and `warnings` into the sample, which leaves them
+        empty."""
+        for e in errors:
+            rule_id = _get_error_rule_id(e)
+            if rule_id == RuleId._coercion:
+                self._coercion_errors.append(e)
+                continue
+            if rule_id == RuleId.invalid_type:
+                self._invalid_type_cells.update(_get_cells(e))
+            self._add(ErrorKind.ERROR, e)
+        for w in warnings:
+            self._add(ErrorKind.WARNING, w)
+        errors.clear()
+        warnings.clear()
+
+    def finish(self) -> tuple[list[dict], list[dict]]:
+        """Returns the sampled (errors, warnings), with the errors filtered
+        and sorted like `filter_errors`."""
+        for e in self._coercion_errors:
+            if not _is_redundant_coercion(e, self._invalid_type_cells):
+                self._add(ErrorKind.ERROR, e)
+        self._coercion_errors.clear()
+        self._sort_error_counts()
+        return (_sort_errors(self.errors), self.warnings)
+
+    def _sort_error_counts(self) -> None:
+        """Sorts `error_counts` in the same order as the sorted errors, which
+        keeps the summaries the same as for unsampled reports."""
+        counts: reports.ErrorCountTree = {}
+        for key in sorted(self._first_rows,
+                          key=lambda k: (k[0], k[1], self._first_rows[k])):
+            table_id, column_id, rule_name = key
+            counts.setdefault(table_id, {}).setdefault(column_id, {})[
+                rule_name] = self.error_counts[table_id][column_id][rule_name]
+        self.error_counts = counts
 
 
 def map_cerb_errors(vctx: ValidationCtx, table_id: pt.TableId,
                     cerb_errors: list[ValidationError], schema: Schema,
-                    rule_filter: RuleFilter, offset: int, data_kind: DataKind
+                    rule_filter: RuleFilter, offset: int, data_kind: DataKind,
+                    groups: Optional[ErrorGroups] = None
                     ) -> tuple[list[dict], list[dict]]:
     """Transforms Cerberus errors to validation errors (and warnings).
 
+    :param groups: groups the errors with the same value instead, to be
+        mapped by `map_error_groups`.
     :return: a pair of lists (errors, warnings).
     """
     errors: list[dict] = []
@@ -298,6 +536,10 @@ def map_cerb_errors(vctx: ValidationCtx, table_id: pt.TableId,
                 row = e.value
                 for attr_errors in e.info:
                     for e in attr_errors:
+                        if (groups is not None and
+                                groups.add(vctx, _to_aggregated_error(
+                                    e, row, schema, offset, data_kind))):
+                            continue
                         rule_error = _gen_cerb_error_entry(vctx, e, row,
                                                            schema, rule_filter,
                                                            offset, data_kind)
@@ -311,6 +553,44 @@ def map_cerb_errors(vctx: ValidationCtx, table_id: pt.TableId,
     return errors, warnings
 
 
+def map_missing_columns(vctx: ValidationCtx, table_id: pt.TableId,
+                        column_ids: Iterable[str],
+                        get_row: Callable[[int], pt.Row], row_count: int,
+                        schema: Schema, rule_filter: RuleFilter,
+                        data_kind: DataKind
+                        ) -> tuple[list[dict], list[dict]]:
+    """Generates the errors (and warnings) of the mandatory `column_ids`
+    missing from a table, the same way as `map_cerb_errors` does for the
+    Cerberus `required` rule. `get_row` returns the row at a table index.
+
+    :return: a pair of lists (errors, warnings).
+    """
+    errors: list[dict] = []
+    warnings: list[dict] = []
+    # Cerberus gives missing values as None
+    value = cast(SomeValue, None)
+    table_schema = schema[table_id]['schema']['schema']
+    # column errors are only reported for the first row of spreadsheets
+    if data_kind == DataKind.spreadsheet:
+        row_count = min(row_count, 1)
+    for column_id in column_ids:
+        schema_column = table_schema[column_id]
+        column_meta: pt.ColMeta = schema_column.get('meta', [])
+        for row_ix in range(row_count):
+            rule_error = _gen_error_entry(
+                vctx, 'required', table_id, column_id, value,
+                [get_row_num(row_ix, 0, data_kind)], [get_row(row_ix)],
+                column_meta, rule_filter, True, schema_column, data_kind)
+            if not rule_error:
+                break
+            (rule_id, entry) = rule_error
+            if 'warningType' in entry:
+                warnings.append(entry)
+            else:
+                errors.append(entry)
+    return errors, warnings
+
+
 def map_aggregated_errors(vctx: ValidationCtx, table_id: pt.TableId,
                           agg_errors: list[AggregatedError],
                           rule_filter: RuleFilter) -> list[dict]:
@@ -326,6 +606,36 @@ def map_aggregated_errors(vctx: ValidationCtx, table_id: pt.TableId,
     return errors
 
 
+def map_error_groups(vctx: ValidationCtx, groups: ErrorGroups,
+                     rule_filter: RuleFilter
+                     ) -> tuple[list[dict], list[dict]]:
+    """Transforms the error `groups` to validation errors (and warnings),
+    with their row numbers as ranges.
+
+    :return: a pair of lists (errors, warnings).
+    """
+    errors: list[dict] = []
+    warnings: list[dict] = []
+    for key, group in groups.groups.items():
+        rule_error = _gen_aggregated_error_entry(vctx, group, rule_filter,
+                                                 groups.row_ranges[key])
+        if not rule_error:
+            continue
+        (rule_id, entry) = rule_error
+        if 'warningType' in entry:
+            warnings.append(entry)
+        else:
+            errors.append(entry)
+    for key, (kind, ctx) in groups.coercion_groups.items():
+        entry = reports.gen_coercion_error(
+            replace(ctx, row_ranges=groups.row_ranges[key]), kind)
+        if kind == ErrorKind.WARNING:
+            warnings.append(entry)
+        else:
+            errors.append(entry)
+    return errors, warnings
+
+
 def gen_additions_schema(additions: dict) -> CerberusSchema:
     # This may work for all rules, but 'allowed' is the only officially
     # supported one.
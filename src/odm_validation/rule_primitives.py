@@ -213,6 +213,23 @@ def is_primary_key(table_id: pt.TableId, attr: Part) -> bool:
     return attr.get(table_id) == pt.ColumnKind.PK.value
 
 
+def is_foreign_key(table_id: pt.TableId, attr: Part) -> bool:
+    return attr.get(table_id) == pt.ColumnKind.FK.value
+
+
+def get_referenced_table_ids(data: OdmData, table_id0: pt.TableId,
+                             attr: Part, version: Version) -> list[PartId]:
+    """Returns the (mapped) ids of the tables where `attr` is the primary key,
+    excluding `table_id0`."""
+    result = []
+    for ref_table_id0 in data.table_data:
+        if ref_table_id0 == table_id0 or not is_primary_key(ref_table_id0,
+                                                            attr):
+            continue
+        result += _get_mapped_part_ids(data, ref_table_id0, version)
+    return result
+
+
 def gen_conditional_schema(data: pt.OdmData, ver: Version, rule_id: str,
                            gen_cerb_rules: GenCerbRulesFunc,
                            pred: AttrPredicate) -> dict:
@@ -22,9 +22,12 @@ from odm_validation.rule_primitives import (
     attr_items,
     gen_cerb_rules_for_type,
     gen_conditional_schema,
+    add_attr_schemas,
     gen_value_schema,
     get_catset_meta,
+    get_referenced_table_ids,
     get_table_meta,
+    is_foreign_key,
     is_mandatory,
     is_primary_key,
     parse_odm_val,
@@ -47,6 +50,7 @@ RuleId = Enum('RuleId', type=int, names=[
     'less_than_min_value',
     'invalid_category',
     'invalid_type',
+    'invalid_foreign_key',
 ])
 
 
@@ -312,6 +316,39 @@ def invalid_category() -> Rule:
     return init_rule(rule_id, err, gen_cerb_rules, gen_schema)
 
 
+def invalid_foreign_key() -> Rule:
+    rule_id = RuleId.invalid_foreign_key
+    cerb_rule_key = 'foreignKey'
+    err = ('Value {value} does not match a primary key in the referenced '
+           'table {constraint}')
+
+    def gen_schema(data: pt.OdmData, ver: Version) -> dict:
+        # The referenced table is the one where the foreign key column is the
+        # primary key. Foreign keys without such a table (like categories) are
+        # skipped.
+        schema: dict = {}
+        for table_id0, table_id1, table in table_items(data, ver):
+            table_meta = get_table_meta(table, ver)
+            table_schema = init_table_schema(table_id1, table_meta, {})
+            for attr in data.table_data[table_id0].attributes.values():
+                if not is_foreign_key(table_id0, attr):
+                    continue
+                ref_table_ids = get_referenced_table_ids(data, table_id0, attr,
+                                                         ver)
+                if not ref_table_ids:
+                    continue
+                cerb_rules = {cerb_rule_key: ref_table_ids}
+                add_attr_schemas(table_schema, data, table_id0, table_id1,
+                                 attr, rule_id.name, None, cerb_rules, ver)
+            deep_update(schema, table_schema)
+        return schema
+
+    def gen_cerb_rules(val_ctx: OdmValueCtx) -> dict:
+        return {cerb_rule_key: None}
+
+    return init_rule(rule_id, err, gen_cerb_rules, gen_schema)
+
+
 def invalid_type() -> Rule:
     rule_id = RuleId.invalid_type
     odm_key = 'dataType'
@@ -350,6 +387,7 @@ ruleset: tuple = (
     greater_than_max_length(),
     greater_than_max_value(),
     invalid_category(),
+    invalid_foreign_key(),
     invalid_type(),
     less_than_min_length(),
     less_than_min_value(),
@@ -1,7 +1,7 @@
 from copy import deepcopy
 
 import odm_validation.utils as utils
-from odm_validation.part_tables import Meta, TableId
+from odm_validation.part_tables import LAST_UPDATED, Meta, TableId
 
 CerberusSchema = dict
 Schema = dict  # {'schemaVersion': str, 'schema': CerberusSchema}
@@ -38,6 +38,14 @@ def init_attr_schema(attr_id: str, rule_id: str, cerb_rules: dict,
     return {attr_id: inner}
 
 
+def get_table_columns(schema: Schema, table_id: TableId) -> set[str]:
+    """Returns the columns of `table_id` that are needed to validate it,
+    which are the columns of its schema, and `lastUpdated` for primary keys.
+    """
+    table_schema = schema['schema'][table_id]['schema']['schema']
+    return set(table_schema.keys()) | {LAST_UPDATED}
+
+
 def import_schema(path: str) -> Schema:
     return utils.import_yaml_file(path)
 
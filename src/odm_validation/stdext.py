@@ -1,10 +1,11 @@
-import dateutil.parser as dateutil_parser
 import json
 import operator
 from datetime import datetime
 from functools import reduce
 from typing import Iterator, Optional, Union
 
+import odm_validation.datetimes as datetimes
+
 
 def get_len(x: Union[int, float, str, list, dict, datetime]) -> int:
     """Returns len if possible, otherwise zero."""
@@ -82,9 +83,7 @@ def flatten(x: list[list]) -> list:
 
 
 def parse_datetime(s: str) -> datetime:
-    if len(s) < len('yyyymmdd'):
-        raise ValueError('datetime string is too short')
-    return dateutil_parser.parse(s)
+    return datetimes.parse_datetime(s)
 
 
 def parse_int(val: Union[int, float, str]) -> int:
@@ -1,13 +1,19 @@
 import json
-from collections import defaultdict
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
-from itertools import groupby
+from itertools import repeat
+from typing import Iterable, Iterator, Optional, Union
 # from pprint import pprint
 
 import odm_validation.reports as reports
 from odm_validation.part_tables import TableId
-from odm_validation.reports import ErrorKind, ValidationReport
+from odm_validation.reports import (
+    ErrorKind,
+    ValidationReport,
+    get_report_fields,
+)
 from odm_validation.rules import RuleId
 from odm_validation.versions import __version__
 
@@ -41,9 +47,15 @@ class SummaryKey(int, Enum):
 # this is the core error/rule-to-count data structure
 ErrorCounts = dict[RuleId, Count]
 
-# table -> entity -> error/rule -> count
-# ex: SummaryKey.COLUMN -> 'addresses' -> 'addID' -> 'invalid_type' -> 3
-EntityCounts = dict[EntityId, ErrorCounts]
+# row entities are kept as row numbers until the summary is generated
+EntityKey = Union[EntityId, int]
+
+# table -> (entity, error/rule) -> count
+# ex: SummaryKey.COLUMN -> 'addresses' -> ('addID', 'invalid_type') -> 3
+#
+# The counts of a table are kept in one counter, instead of a dict per
+# entity, which keeps the counts by row small.
+EntityCounts = Counter[tuple[EntityKey, RuleId]]
 TableCounts = dict[TableId, EntityCounts]
 
 # simplified data structures for total counts
@@ -59,6 +71,9 @@ class Counts:
 
 @dataclass(frozen=True)
 class SummaryEntry:
+    # there's an entry per row when summarizing by row
+    __slots__ = ('rule_id', 'count', 'key', 'value')
+
     rule_id: RuleId
     count: int
 
@@ -70,10 +85,31 @@ class SummaryEntry:
     corresponds to the table-id when grouping by `table`, the column-id when
     grouping by `column`, etc."""
 
+    # frozen dataclasses can't be unpickled with slots otherwise, and the
+    # state is also what's dumped as yaml
+    def __getstate__(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state: dict) -> None:
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+
+def get_fields(x: object) -> dict:
+    """Returns the fields of a summary/report object, for serialization."""
+    if isinstance(x, SummaryEntry):
+        return x.__getstate__()
+    if isinstance(x, ValidationReport):
+        return get_report_fields(x)
+    return vars(x)
+
 
 SummaryEntryList = list[SummaryEntry]
 ErrorSummary = dict[TableId, SummaryEntryList]
 
+# (error kind, table, summary entry)
+SummaryRow = tuple[ErrorKind, TableId, SummaryEntry]
+
 
 @dataclass(frozen=True)
 class SummarizedReport:
@@ -85,7 +121,7 @@ class SummarizedReport:
     warnings: ErrorSummary
 
     def toJson(self) -> str:
-        return json.dumps(self, default=lambda x: x.__dict__)
+        return json.dumps(self, default=get_fields)
 
 
 # error counting
@@ -99,47 +135,169 @@ def _get_error_table_rule(e: dict) -> tuple[TableId, RuleId]:
     return (table_id, rule_id)
 
 
-def _get_error_row_ids(e: dict) -> list[int]:
+def get_error_row_ids(e: dict) -> list[int]:
+    """Returns the row numbers of the error/warning `e`."""
     row_id0 = e.get('rowNumber')
     if row_id0 is not None:
         return [row_id0]
-    else:
-        return e['rowNumbers']
+    row_ranges = e.get('rowRanges')
+    if row_ranges is not None:
+        # grouped errors
+        return reports.expand_row_ranges(row_ranges)
+    # column errors of spreadsheets have no row numbers
+    return e.get('rowNumbers', [])
+
+
+def _update_entity(key_counts: dict[SummaryKey, TableCounts],
+                   key: SummaryKey, table_id: TableId, entity_id: EntityKey,
+                   rule_id: RuleId, count: int) -> None:
+    table_counts: TableCounts = key_counts[key]
+    entity_counts = table_counts.get(table_id)
+    if entity_counts is None:
+        entity_counts = Counter()
+        table_counts[table_id] = entity_counts
+    entity_counts[(entity_id, rule_id)] += count
+
+
+def _init_counts() -> Counts:
+    return Counts(
+        total_counts=defaultdict(Count),
+        key_counts=defaultdict(dict),
+    )
+
+
+# (table, column, first row) of an error, which is the order of the sorted
+# errors of a report
+ErrorPos = tuple[TableId, str, int]
+
+# (key, table, entity, rule) -> position of the first error counted
+CountPositions = dict[tuple[SummaryKey, TableId, EntityKey, RuleId], ErrorPos]
+
+# the position of a table in a report, as (report, table), where the tables
+# of a report are sorted by id
+TableRank = tuple[int, str]
+
+
+def _update_position(positions: CountPositions,
+                     pos_key: tuple[SummaryKey, TableId, EntityKey, RuleId],
+                     pos: ErrorPos) -> None:
+    first_pos = positions.get(pos_key)
+    if first_pos is None or pos < first_pos:
+        positions[pos_key] = pos
+
+
+def _count_error(keys: set[SummaryKey], counts: Counts, e: dict,
+                 positions: Optional[CountPositions] = None) -> None:
+    """Counts the error `e` into `counts`. The position of the first error
+    of each count is added to `positions`, if given."""
+    table_id, rule_id = _get_error_table_rule(e)
+    row_ids = get_error_row_ids(e)
+    # column errors count once, like in the error counts of sampled reports
+    count = len(row_ids) or 1
+    counts.total_counts[rule_id] += count
+    column_id = e['columnName']
+    pos = (table_id, column_id, row_ids[0] if row_ids else 0)
+    for key in keys:
+        if key == SummaryKey.ROW:
+            for row_id in row_ids:
+                _update_entity(counts.key_counts, key, table_id, row_id,
+                               rule_id, 1)
+                if positions is not None:
+                    _update_position(positions,
+                                     (key, table_id, row_id, rule_id), pos)
+        else:
+            entity_id = table_id if key == SummaryKey.TABLE else column_id
+            _update_entity(counts.key_counts, key, table_id, entity_id,
+                           rule_id, count)
+            if positions is not None:
+                _update_position(positions,
+                                 (key, table_id, entity_id, rule_id), pos)
 
 
 def _count_errors(keys: set[SummaryKey], errors: list) -> Counts:
     """Counts errors. Should be called once for every error kind, with its list
     of errors."""
-
-    def _update_entity(key: SummaryKey, table_id: TableId, entity_id: str,
-                       rule_id: RuleId, count: int) -> None:
-        table_counts: TableCounts = key_counts[key]
-        if table_id not in table_counts:
-            table_counts[table_id] = defaultdict(dict)
-        entity_counts: EntityCounts = table_counts[table_id]
-        if entity_id not in entity_counts:
-            entity_counts[entity_id] = defaultdict(Count)
-        entity_counts[entity_id][rule_id] += count
-
     # XXX: errors are only iterated once, to avoid counting the same error
     # multiple times
-    total_counts: ErrorCounts = defaultdict(Count)
-    key_counts: dict[SummaryKey, TableCounts] = defaultdict(dict)
+    counts = _init_counts()
     for e in errors:
-        table_id, rule_id = _get_error_table_rule(e)
-        row_ids = _get_error_row_ids(e)
-        count = len(row_ids)
-        total_counts[rule_id] += count
-        for key in keys:
-            if key == SummaryKey.ROW:
-                for row_id in row_ids:
-                    entity_id = str(row_id)
-                    _update_entity(key, table_id, entity_id, rule_id, 1)
+        _count_error(keys, counts, e)
+    return counts
+
+
+def _add_counts(counts: Counts, other: Counts) -> None:
+    """Adds the `other` counts to `counts`. The counts that are new to
+    `counts` are put last, like when counting the errors of one report after
+    the other."""
+    for rule_id, count in other.total_counts.items():
+        counts.total_counts[rule_id] += count
+    for key, table_counts in other.key_counts.items():
+        for table_id, entity_counts in table_counts.items():
+            total_entity_counts = counts.key_counts[key].get(table_id)
+            if total_entity_counts is None:
+                counts.key_counts[key][table_id] = Counter(entity_counts)
             else:
-                column_id = e['columnName']
-                entity_id = table_id if key == SummaryKey.TABLE else column_id
-                _update_entity(key, table_id, entity_id, rule_id, count)
+                total_entity_counts.update(entity_counts)
+
+
+def _sort_counts(counts: Counts, positions: CountPositions,
+                 table_ranks: dict[TableId, TableRank]) -> Counts:
+    """Returns `counts` in the order they would have been counted from the
+    sorted errors, using the `positions` from `_count_error`, with the
+    tables in the order of their `table_ranks`."""
+    def rank(pos: ErrorPos) -> tuple[TableRank, str, int]:
+        table_id, column_id, row_id = pos
+        return (table_ranks[table_id], column_id, row_id)
+
+    rule_positions: dict[RuleId, tuple[TableRank, str, int]] = {}
+    for (_, _, _, rule_id), pos in positions.items():
+        rule_positions[rule_id] = min(rule_positions.get(rule_id, rank(pos)),
+                                      rank(pos))
+
+    # `sorted` is stable, which keeps equal positions in the order counted.
+    # The entities are grouped in the order they first appear when the
+    # summary is generated, which is the position of their first error.
+    key_counts: dict[SummaryKey, TableCounts] = defaultdict(dict)
+    for key, table_counts in counts.key_counts.items():
+        for table_id in sorted(table_counts, key=table_ranks.__getitem__):
+            entity_counts = table_counts[table_id]
+            key_counts[key][table_id] = Counter(dict(sorted(
+                entity_counts.items(),
+                key=lambda x: positions[(key, table_id, *x[0])])))
+    total_counts: ErrorCounts = defaultdict(Count, sorted(
+        counts.total_counts.items(),
+        key=lambda x: (x[0] not in rule_positions,
+                       rule_positions.get(x[0], ((0, ''), '', 0)))))
+    return Counts(
+        total_counts=total_counts,
+        key_counts=key_counts,
+    )
+
+
+def _check_sampled_keys(keys: set[SummaryKey]) -> None:
+    """Checks that a sampled report can be summarized by `keys`. Its error
+    counts don't have row numbers, so only the rows of its examples would be
+    counted."""
+    if SummaryKey.ROW in keys:
+        raise ValueError('sampled reports can\'t be summarized by row')
+
 
+def _count_sampled_errors(keys: set[SummaryKey],
+                          error_counts: reports.ErrorCountTree) -> Counts:
+    """Counts errors from the `error_counts` of a sampled report."""
+    _check_sampled_keys(keys)
+    total_counts: ErrorCounts = defaultdict(Count)
+    key_counts: dict[SummaryKey, TableCounts] = defaultdict(dict)
+    for table_id, table_counts in error_counts.items():
+        for column_id, column_counts in table_counts.items():
+            for rule_name, count in column_counts.items():
+                rule_id = RuleId[rule_name]
+                total_counts[rule_id] += count
+                for key in keys:
+                    entity_id = (table_id if key == SummaryKey.TABLE
+                                 else column_id)
+                    _update_entity(key_counts, key, table_id, entity_id,
+                                   rule_id, count)
     return Counts(
         total_counts=total_counts,
         key_counts=key_counts,
@@ -150,62 +308,91 @@ def _count_errors(keys: set[SummaryKey], errors: list) -> Counts:
 # -----------------------------------------------------------------------------
 
 
-def _gen_summary_list(key: SummaryKey, entity_counts: EntityCounts
-                      ) -> SummaryEntryList:
-    """Generates a list of SummaryEntry objects from `entity_counts` that
-    correspond to `key`."""
-    summary_list = []
-    for entity_id, error_count in entity_counts.items():
-        for rule_id, count in error_count.items():
-            entry = SummaryEntry(
-                rule_id=rule_id,
-                count=count,
-                key=key,
-                value=entity_id,
-            )
-            summary_list.append(entry)
-    return summary_list
+def _iter_summary_list(key: SummaryKey, entity_counts: EntityCounts
+                       ) -> Iterator[SummaryEntry]:
+    """Generates the SummaryEntry objects from `entity_counts` that
+    correspond to `key`, grouped by entity."""
+    # the counts of an entity are spread out when its errors are in
+    # different columns, and are only sorted then
+    first_seen: dict[EntityKey, int] = {}
+    is_grouped = True
+    prev_id = None
+    for entity_id, _ in entity_counts:
+        if entity_id != prev_id:
+            if entity_id in first_seen:
+                is_grouped = False
+            else:
+                first_seen[entity_id] = len(first_seen)
+            prev_id = entity_id
+    items: Iterable[tuple[tuple[EntityKey, RuleId], Count]] = (
+        entity_counts.items() if is_grouped else
+        sorted(entity_counts.items(), key=lambda x: first_seen[x[0][0]]))
+    for (entity_id, rule_id), count in items:
+        yield SummaryEntry(
+            rule_id=rule_id,
+            count=count,
+            key=key,
+            value=str(entity_id),
+        )
 
 
-def _gen_summary(keys: set[SummaryKey], counts: Counts) -> ErrorSummary:
-    """generates summary lists per table, for all `keys`
+def _iter_summary(keys: set[SummaryKey], counts: Counts
+                  ) -> Iterator[tuple[TableId, SummaryEntry]]:
+    """Generates the summary entries of each table, for all `keys`, followed
+    by the totals of the table.
 
     :param keys: the set of keys to summarize by.
-    :param errors: the list of validation errors to count.
+    :param counts: the counted errors.
     """
     # keys must be sorted to make equality work in tests
-    summary: ErrorSummary = defaultdict(list)
-    for key in sorted(keys):
-        table_counts: TableCounts = counts.key_counts[key]
-        for table_id, entity_counts in table_counts.items():
-            summary[table_id] += _gen_summary_list(key, entity_counts)
-    return summary
+    sorted_keys = sorted(keys)
+    table_ids = dict.fromkeys(table_id
+                              for key in sorted_keys
+                              for table_id in counts.key_counts[key])
+    for table_id in table_ids:
+        key_totals: dict[SummaryKey, dict[EntityKey, Count]] = {}
+        for key in sorted_keys:
+            entity_counts = counts.key_counts[key].get(table_id)
+            if not entity_counts:
+                continue
+            for entry in _iter_summary_list(key, entity_counts):
+                yield (table_id, entry)
+            totals: dict[EntityKey, Count] = defaultdict(Count)
+            for (entity_id, _), count in entity_counts.items():
+                totals[entity_id] += count
+            key_totals[key] = totals
+        for key, totals in key_totals.items():
+            for entry in _iter_total_entries(key, totals):
+                yield (table_id, entry)
 
 
 # post-processing
 # -----------------------------------------------------------------------------
 
 
-def _get_keyval(e: SummaryEntry) -> tuple[int, str]:
-    """Returns tuple for sorting/grouping summary entries"""
-    return (e.key, e.value)
+def _iter_total_entries(key: SummaryKey, totals: dict[EntityKey, Count]
+                        ) -> Iterator[SummaryEntry]:
+    """Generates entries with the `totals` per entity of `key`, sorted by
+    entity id."""
+    for entity_id in sorted(totals, key=str):
+        yield SummaryEntry(
+            rule_id=RuleId._all,
+            count=totals[entity_id],
+            key=key,
+            value=str(entity_id),
+        )
 
 
-def _calc_summary_entry_totals(entries: SummaryEntryList) -> SummaryEntryList:
+def _calc_summary_entry_totals(entries: Iterable[SummaryEntry]
+                               ) -> SummaryEntryList:
     """Returns new entries with total counts per unique (key, value) pair."""
-    result = []
-    sorted_entries = sorted(entries, key=_get_keyval)
-    for keyval, kv_entries in groupby(sorted_entries, key=_get_keyval):
-        key, val = keyval
-        total = sum(map(lambda e: e.count, kv_entries))
-        entry = SummaryEntry(
-            rule_id=RuleId._all,
-            count=total,
-            key=SummaryKey(key),
-            value=val,
-        )
-        result.append(entry)
-    return result
+    key_totals: dict[SummaryKey, dict[EntityKey, Count]] = defaultdict(
+        lambda: defaultdict(Count))
+    for e in entries:
+        key_totals[e.key][e.value] += e.count
+    return [entry
+            for key in sorted(key_totals)
+            for entry in _iter_total_entries(key, key_totals[key])]
 
 
 def _gen_overview(report: ValidationReport,
@@ -232,10 +419,167 @@ def _remove_summary_entries(summary: ErrorSummary, key: SummaryKey) -> None:
     assert key not in map(lambda e: e.key, summary[table_id])
 
 
+def summarize_counts(report: ValidationReport, keys: set[SummaryKey],
+                     errorkind_counts: dict[ErrorKind, Counts]
+                     ) -> SummarizedReport:
+    """Summarizes the counted errors of `report`."""
+    # generate summaries, one per error kind
+    errorkind_summaries: dict[ErrorKind, ErrorSummary] = {}
+    errorkind_totals: dict[ErrorKind, ErrorCounts] = {}
+    for error_kind in ErrorKind:
+        counts = errorkind_counts[error_kind]
+        summary: ErrorSummary = defaultdict(list)
+        for table_id, entry in _iter_summary(keys, counts):
+            summary[table_id].append(entry)
+        errorkind_summaries[error_kind] = summary
+        errorkind_totals[error_kind] = counts.total_counts
+
+    # generate the overview
+    overview = _gen_overview(report, errorkind_totals)
+
+    return SummarizedReport(
+        data_version=report.data_version,
+        schema_version=report.schema_version,
+        package_version=__version__,
+        overview=overview,
+        errors=dict(errorkind_summaries[ErrorKind.ERROR]),
+        warnings=dict(errorkind_summaries[ErrorKind.WARNING]),
+    )
+
+
+def _iter_summary_rows(keys: set[SummaryKey],
+                       errorkind_counts: dict[ErrorKind, Counts]
+                       ) -> Iterator[SummaryRow]:
+    for error_kind in ErrorKind:
+        for table_id, entry in _iter_summary(keys,
+                                             errorkind_counts[error_kind]):
+            yield (error_kind, table_id, entry)
+
+
+def _count_report(report: ValidationReport, keys: set[SummaryKey]
+                  ) -> dict[ErrorKind, Counts]:
+    """Counts the errors and warnings of `report`, one per error kind."""
+    errorkind_errors = {
+        ErrorKind.ERROR: report.errors,
+        ErrorKind.WARNING: report.warnings,
+    }
+    errorkind_counts = {
+        ErrorKind.ERROR: report.error_counts,
+        ErrorKind.WARNING: report.warning_counts,
+    }
+    counts: dict[ErrorKind, Counts] = {}
+    for error_kind in ErrorKind:
+        errors: list = errorkind_errors[error_kind]
+        error_counts = errorkind_counts[error_kind]
+        if error_counts is not None:
+            counts[error_kind] = _count_sampled_errors(keys, error_counts)
+        else:
+            counts[error_kind] = _count_errors(keys, errors)
+    return counts
+
+
 # API
 # -----------------------------------------------------------------------------
 
 
+class OnlineSummarizer:
+    """Summarizes errors and warnings one at a time, as they are found,
+    instead of from the lists of a report. Pass it to `_validate_data_ext`
+    to summarize the validation without keeping the errors.
+
+    The summary is the same as from `summarize_report`, including its
+    order. Errors are counted in the order they are found, but the order of
+    the summary comes from the position of the first error of each count,
+    like in the sorted errors of a report.
+
+    The tables are summarized in the order their errors are first added,
+    like when reading a report, unless `start_report` is called, which the
+    validation does, since it sorts the errors of its report by table.
+
+    :param table_ids: the order of the tables in the report, like the
+        order of the reports joined by `ReportBuilder`. Other tables come
+        after them.
+    """
+
+    def __init__(self, by: set[SummaryKey] = {SummaryKey.TABLE},
+                 table_ids: Iterable[TableId] = ()) -> None:
+        assert isinstance(by, set), "invalid type for param `by`"
+        self.keys = by
+        self.counts = {kind: _init_counts() for kind in ErrorKind}
+        self._positions: CountPositions = {}
+        self._table_ranks: dict[TableId, TableRank] = {
+            table_id: (i, '') for i, table_id in enumerate(table_ids)}
+        self._next_rank = len(self._table_ranks)
+        self._report_rank: Optional[int] = None
+        self._sampled_kinds: set[ErrorKind] = set()
+
+    def start_report(self) -> None:
+        """Starts the errors of a new report, which are sorted by table, and
+        come after the errors added before."""
+        self._report_rank = self._next_rank
+        self._next_rank += 1
+
+    def add(self, e: dict) -> None:
+        """Counts the error or warning `e`."""
+        kind = reports.get_error_kind(e)
+        # warnings aren't sorted in reports
+        positions = None
+        if kind == ErrorKind.ERROR:
+            positions = self._positions
+            self._add_table(_get_error_table_rule(e)[0])
+        _count_error(self.keys, self.counts[kind], e, positions)
+
+    def _add_table(self, table_id: TableId) -> None:
+        if table_id in self._table_ranks:
+            return
+        if self._report_rank is None:
+            self._table_ranks[table_id] = (self._next_rank, '')
+            self._next_rank += 1
+        else:
+            self._table_ranks[table_id] = (self._report_rank, table_id)
+
+    def add_counts(self, report: ValidationReport) -> None:
+        """Counts the `error_counts` and `warning_counts` of the sampled
+        `report`, after its errors and warnings have been added. They
+        replace the counts of the errors added, like in `summarize_report`.
+
+        :raises ValueError: if summarizing by row, since the rows are only
+            known for the errors added.
+        """
+        errorkind_counts = {
+            ErrorKind.ERROR: report.error_counts,
+            ErrorKind.WARNING: report.warning_counts,
+        }
+        for error_kind, error_counts in errorkind_counts.items():
+            if error_counts is None:
+                continue
+            self.counts[error_kind] = _count_sampled_errors(self.keys,
+                                                            error_counts)
+            self._sampled_kinds.add(error_kind)
+
+    def get_counts(self) -> dict[ErrorKind, Counts]:
+        """Returns the counts of the errors and warnings added so far, in
+        the order of the summary. They can be merged with the counts of
+        other reports, like in `summarize_report_files`."""
+        result = dict(self.counts)
+        # sampled counts are already sorted
+        if ErrorKind.ERROR not in self._sampled_kinds:
+            result[ErrorKind.ERROR] = _sort_counts(
+                self.counts[ErrorKind.ERROR], self._positions,
+                self._table_ranks)
+        return result
+
+    def summarize(self, report: ValidationReport) -> SummarizedReport:
+        """Returns the summary of the errors and warnings added so far. Only
+        the versions and table info of `report` are used."""
+        return summarize_counts(report, self.keys, self.get_counts())
+
+    def iter_summary(self) -> Iterator[SummaryRow]:
+        """Generates the entries of `summarize` one at a time, without
+        keeping them."""
+        return _iter_summary_rows(self.keys, self.get_counts())
+
+
 def summarize_report(report: ValidationReport,
                      by: set[SummaryKey] = {SummaryKey.TABLE}
                      ) -> SummarizedReport:
@@ -244,41 +588,71 @@ def summarize_report(report: ValidationReport,
     :param report: the validation report to be summarized
     :param by: what to summarize by. An error/warning summarization will be
     performed for each group/key specified. Defaults to `table`.
+
+    The error counts of sampled reports are used instead of their errors.
+    Sampled reports can't be summarized by row, since the rows are only
+    known for their examples, which raises a ValueError.
     """
     assert isinstance(report, ValidationReport), \
            "invalid type for param `report`"
     assert isinstance(by, set), "invalid type for param `by`"
     keys = by
+    return summarize_counts(report, keys, _count_report(report, keys))
+
+
+def _count_report_files(paths: Iterable[str], keys: set[SummaryKey],
+                        workers: Optional[int]
+                        ) -> tuple[ValidationReport, dict[ErrorKind, Counts]]:
+    """Counts the report files in `paths` in parallel, and merges their
+    counts in order."""
+    # imported here since reportutils imports this module
+    from odm_validation.tools.reportutils import (
+        count_report_file,
+        expand_paths,
+    )
+    files = expand_paths(paths)
+    assert len(files) > 0, 'no report files to summarize'
+    headers = reports.ReportBuilder()
+    counts = {kind: _init_counts() for kind in ErrorKind}
+
+    def merge(results: Iterable[tuple[ValidationReport,
+                                      dict[ErrorKind, Counts]]]) -> None:
+        for file_header, file_counts in results:
+            headers.add(file_header)
+            for kind in ErrorKind:
+                _add_counts(counts[kind], file_counts[kind])
+
+    if len(files) == 1 or workers == 1:
+        merge(map(count_report_file, files, repeat(keys)))
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            merge(executor.map(count_report_file, files, repeat(keys)))
+    return (headers.build(), counts)
 
-    # count errors and generate summaries, one per error kind
-    errorkind_summaries: dict[ErrorKind, ErrorSummary] = {}
-    errorkind_totals: dict[ErrorKind, ErrorCounts] = {}
-    errorkind_errors = {
-        ErrorKind.ERROR: report.errors,
-        ErrorKind.WARNING: report.warnings,
-    }
-    for error_kind in ErrorKind:
-        errors: list = errorkind_errors[error_kind]
-        counts = _count_errors(keys, errors)
-        summary = _gen_summary(keys, counts)
-        errorkind_summaries[error_kind] = summary
-        errorkind_totals[error_kind] = counts.total_counts
 
-    # add totals to the summary lists
-    # for error_kind in ErrorKind:
-    for summary in errorkind_summaries.values():
-        for entries in summary.values():
-            new_entries = _calc_summary_entry_totals(entries)
-            entries += new_entries
+def summarize_report_files(paths: Iterable[str],
+                           by: set[SummaryKey] = {SummaryKey.TABLE},
+                           workers: Optional[int] = None
+                           ) -> SummarizedReport:
+    """Summarizes the report files in `paths` as one report, the same as
+    summarizing the joined report. The paths can be globs.
 
-    # generate the overview
-    overview = _gen_overview(report, errorkind_totals)
+    The reports are counted in parallel, by `workers` processes, which
+    defaults to the number of CPUs. Json and ndjson reports are read one
+    error at a time, without keeping them.
+    """
+    assert isinstance(by, set), "invalid type for param `by`"
+    header, counts = _count_report_files(paths, by, workers)
+    return summarize_counts(header, by, counts)
 
-    return SummarizedReport(
-        data_version=report.data_version,
-        schema_version=report.schema_version,
-        package_version=__version__,
-        overview=overview,
-        errors=dict(errorkind_summaries[ErrorKind.ERROR]),
-        warnings=dict(errorkind_summaries[ErrorKind.WARNING]),
-    )
+
+def iter_summary(report: ValidationReport,
+                 by: set[SummaryKey] = {SummaryKey.TABLE}
+                 ) -> Iterator[SummaryRow]:
+    """Generates the entries of `summarize_report(report, by)` one at a time,
+    as (error kind, table, entry), without keeping them. This is for
+    writing big summaries, like summaries by row."""
+    assert isinstance(report, ValidationReport), \
+           "invalid type for param `report`"
+    assert isinstance(by, set), "invalid type for param `by`"
+    return _iter_summary_rows(by, _count_report(report, by))
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+
+import sys
+
+import typer
+
+from odm_validation.compression import open_file
+from odm_validation.tools.reportutils import expand_paths, merge_reports
+
+
+REPORT_FILES_DESC = ('The json/ndjson/sqlite report files to merge, which can '
+                     'be globs, and compressed.')
+OUT_DESC = ('The path to write the merged ndjson report to, which is '
+            'compressed if it has a compression extension (like ".gz").')
+
+
+# XXX: locals are too noisy
+app = typer.Typer(pretty_exceptions_show_locals=False)
+
+
+@app.command()
+def main(
+    report_files: list[str] = typer.Argument(default=...,
+                                             help=REPORT_FILES_DESC),
+    out: str = typer.Option(default='', help=OUT_DESC),
+) -> None:
+    in_paths = expand_paths(report_files)
+    output = open_file(out, 'w') if out else sys.stdout
+    try:
+        merge_reports(output, in_paths)
+    finally:
+        if output != sys.stdout:
+            output.close()
+
+
+if __name__ == '__main__':
+    app()
@@ -1,12 +1,29 @@
+import glob
 import json
+import logging
 import os
+import re
+from dataclasses import replace
 from enum import Enum
-from typing import IO, Optional, Union
+from typing import IO, Iterable, Iterator, Optional, Union, cast
 
 import yaml
 
-from odm_validation.reports import ErrorKind, ValidationReport
-from odm_validation.summarization import SummarizedReport
+from odm_validation.compression import open_file, split_compression
+from odm_validation.report_store import ReportStore
+from odm_validation.reports import (
+    ErrorKind,
+    ReportBuilder,
+    ValidationReport,
+    get_error_kind,
+)
+from odm_validation.summarization import (
+    Counts,
+    OnlineSummarizer,
+    SummarizedReport,
+    SummaryKey,
+    get_fields,
+)
 
 
 SomeReport = Union[SummarizedReport, ValidationReport]
@@ -17,6 +34,8 @@ class ReportFormat(Enum):
     TXT = 'txt'
     JSON = 'json'
     YAML = 'yaml'
+    NDJSON = 'ndjson'
+    SQLITE = 'sqlite'
 
 
 def get_ext(path: Optional[str]) -> str:
@@ -30,13 +49,37 @@ def get_ext(path: Optional[str]) -> str:
 
 def detect_report_format_from_path(path: Optional[str]
                                    ) -> Optional[ReportFormat]:
+    """Detects the report format from the extension of `path`, which can be
+    followed by a compression extension (like ".json.gz"). Sqlite reports
+    can't be compressed."""
+    compression = None
+    if path:
+        path, compression = split_compression(path)
     ext = get_ext(path)
+    result: Optional[ReportFormat]
     try:
-        return ReportFormat[ext.upper()]
+        result = ReportFormat[ext.upper()]
     except KeyError:
-        if ext.lower() == 'yml':
-            return ReportFormat.YAML
-    return None
+        result = {
+            'yml': ReportFormat.YAML,
+            'jsonl': ReportFormat.NDJSON,
+            'db': ReportFormat.SQLITE,
+            'sqlite3': ReportFormat.SQLITE,
+        }.get(ext.lower())
+    if compression and result == ReportFormat.SQLITE:
+        return None
+    return result
+
+
+def _is_ndjson_header(line: str) -> bool:
+    """Returns True if `line` is the header of an ndjson report, which is a
+    report object without the errors and warnings."""
+    try:
+        header = json.loads(line)
+    except ValueError:
+        return False
+    return (isinstance(header, dict) and 'data_version' in header and
+            'errors' not in header)
 
 
 def detect_report_format_from_content(data: str) -> Optional[ReportFormat]:
@@ -47,6 +90,10 @@ def detect_report_format_from_content(data: str) -> Optional[ReportFormat]:
     elif line[0] == '#':
         return ReportFormat.TXT
     elif line[0] == '{':
+        # ndjson reports start with a header object on the first line, while
+        # json reports are indented or have all of the report on it
+        if _is_ndjson_header(line):
+            return ReportFormat.NDJSON
         return ReportFormat.JSON
     elif line.startswith('---') or ':' in line:
         return ReportFormat.YAML
@@ -75,9 +122,313 @@ def write_txt_report(output: IO, report: ValidationReport) -> None:
 
 
 def write_json_report(output: IO, report: SomeReport) -> None:
-    json.dump(report, output, default=vars, indent=4)
+    json.dump(report, output, default=get_fields, indent=4)
+
+
+def write_ndjson_header(output: IO, report: ValidationReport) -> None:
+    """Writes the ndjson header line of `report`, which is all of it except
+    for the errors and warnings."""
+    header = {key: value for key, value in get_fields(report).items()
+              if key not in ['errors', 'warnings']}
+    output.write(json.dumps(header, default=get_fields) + '\n')
+
+
+def write_ndjson_entry(output: IO, e: dict) -> None:
+    """Writes the error or warning `e` as an ndjson line. The lines can be
+    written as the errors are found, after the header."""
+    output.write(json.dumps(e, default=get_fields) + '\n')
+
+
+def write_ndjson_report(output: IO, report: ValidationReport) -> None:
+    write_ndjson_header(output, report)
+    for e in report.errors:
+        write_ndjson_entry(output, e)
+    for w in report.warnings:
+        write_ndjson_entry(output, w)
+
+
+def read_ndjson_header(line: str) -> ValidationReport:
+    """Returns the report of the ndjson header `line`, without the errors
+    and warnings of the following lines."""
+    header = json.loads(line)
+    header.setdefault('errors', [])
+    header.setdefault('warnings', [])
+    return ValidationReport(**header)
+
+
+def iter_ndjson_entries(file: IO) -> Iterator[dict]:
+    """Reads the errors and warnings of an ndjson report one at a time,
+    from the lines after the header."""
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_ndjson_report(header_line: str, file: IO) -> ValidationReport:
+    """Reads a whole ndjson report, from its `header_line` and the rest of
+    `file`."""
+    header = read_ndjson_header(header_line)
+    errors = list(header.errors)
+    warnings = list(header.warnings)
+    for e in iter_ndjson_entries(file):
+        if get_error_kind(e) == ErrorKind.ERROR:
+            errors.append(e)
+        else:
+            warnings.append(e)
+    return replace(header, errors=errors, warnings=warnings)
+
+
+_JSON_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class _JsonReader:
+    """Reads json values one at a time, starting with `text` and then the
+    rest of `file`, with only a chunk of it in memory."""
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, text: str, file: IO) -> None:
+        self.buf = text
+        self.pos = 0
+        self.file = file
+        self.eof = False
+
+    def _read_more(self) -> None:
+        chunk = self.file.read(self.CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self) -> str:
+        """Returns the next non-whitespace char, or '' at the end."""
+        while True:
+            match = _WHITESPACE.match(self.buf, self.pos)
+            assert match
+            self.pos = match.end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ''
+            self._read_more()
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f'invalid json report: expected "{char}"')
+        self.pos += 1
+
+    def value(self) -> object:
+        self.peek()
+        while True:
+            try:
+                value, end = _JSON_DECODER.raw_decode(self.buf, self.pos)
+                # numbers can continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._read_more()
+
+
+def iter_json_entries(text: str, file: IO, header: dict) -> Iterator[dict]:
+    """Reads the errors and warnings of a json report one at a time,
+    starting with `text` and then the rest of `file`. The other fields are
+    added to `header` as they are read, which means that `header` is only
+    complete at the end, since the counts come after the errors."""
+    reader = _JsonReader(text, file)
+    reader.expect('{')
+    has_next = reader.peek() != '}'
+    while has_next:
+        key = cast(str, reader.value())
+        reader.expect(':')
+        if key in ['errors', 'warnings'] and reader.peek() == '[':
+            reader.expect('[')
+            has_next_entry = reader.peek() != ']'
+            while has_next_entry:
+                yield cast(dict, reader.value())
+                has_next_entry = reader.peek() == ','
+                if has_next_entry:
+                    reader.expect(',')
+            reader.expect(']')
+        else:
+            header[key] = reader.value()
+        has_next = reader.peek() == ','
+        if has_next:
+            reader.expect(',')
+    reader.expect('}')
+
+
+class ReportStream:
+    """A json or ndjson report that is read one error or warning at a time,
+    which takes constant memory. The rest of the report is read into
+    `header`."""
+
+    def __init__(self, file: IO) -> None:
+        self.file = file
+        self.first_line = file.readline()  # for format detection
+        self.format = detect_report_format_from_content(self.first_line)
+        self.header: dict = {}
+
+    def entries(self) -> Iterator[dict]:
+        """Reads the errors and warnings of the report, in the order they
+        are in the file."""
+        if self.format == ReportFormat.NDJSON:
+            self.header = json.loads(self.first_line)
+            yield from iter_ndjson_entries(self.file)
+        elif self.format == ReportFormat.JSON:
+            yield from iter_json_entries(self.first_line, self.file,
+                                         self.header)
+        else:
+            raise ValueError(f'report format {self.format} can\'t be '
+                             'streamed')
+
+    def get_report(self) -> ValidationReport:
+        """Returns the report without its errors and warnings. It's only
+        complete once all the entries have been read."""
+        return ValidationReport(**{**self.header, 'errors': [],
+                                   'warnings': []})
+
+
+def _read_report_after(first_line: str, file: IO
+                       ) -> Optional[ValidationReport]:
+    # XXX: must use yaml.safe_load to avoid running arbitrary python code on
+    # the user's machine, however, it's extremely slow
+    fmt = detect_report_format_from_content(first_line)
+    if fmt == ReportFormat.NDJSON:
+        return read_ndjson_report(first_line, file)
+    raw_data: str = first_line + file.read()
+    report_obj: Optional[dict] = None
+    if fmt == ReportFormat.JSON:
+        report_obj = json.loads(raw_data)
+    elif fmt == ReportFormat.YAML:
+        logging.warn('you should use json-reports instead of yaml when ' +
+                     'summarizing, since yaml parsing is extremely slow')
+        report_obj = yaml.safe_load(raw_data)
+    elif fmt is not None:
+        logging.error(f'report format {fmt} can\'t be summarized')
+    else:
+        logging.error('unable to detect report format')
+    if report_obj is None:
+        return None
+    report = ValidationReport(**report_obj)
+    return report
+
+
+def read_report_from_file(file: IO) -> Optional[ValidationReport]:
+    return _read_report_after(file.readline(), file)
+
+
+def read_report(path: str) -> Optional[ValidationReport]:
+    with open_file(path, 'r') as f:
+        return read_report_from_file(f)
+
+
+def read_report_to_summarize(file: IO, by: set[SummaryKey]
+                             ) -> Optional[tuple[ValidationReport,
+                                                 OnlineSummarizer]]:
+    """Reads the report in `file` into a summarizer by `by`, as (report,
+    summarizer). Json and ndjson reports are summarized as they are read,
+    one error at a time, in which case the report has no errors. Other
+    reports are read whole first."""
+    stream = ReportStream(file)
+    summarizer = OnlineSummarizer(by)
+    if stream.format in [ReportFormat.JSON, ReportFormat.NDJSON]:
+        for e in stream.entries():
+            summarizer.add(e)
+        report = stream.get_report()
+    else:
+        whole_report = _read_report_after(stream.first_line, file)
+        if whole_report is None:
+            return None
+        report = whole_report
+        for e in report.errors + report.warnings:
+            summarizer.add(e)
+    summarizer.add_counts(report)
+    return (report, summarizer)
+
+
+def expand_paths(patterns: Iterable[str]) -> list[str]:
+    """Returns the paths matching the glob `patterns`, in order. Patterns
+    without matches are kept as they are, to fail when opened."""
+    result = []
+    for pattern in patterns:
+        result += sorted(glob.glob(pattern)) or [pattern]
+    return result
+
+
+def is_report_store(path: str) -> bool:
+    return detect_report_format_from_path(path) == ReportFormat.SQLITE
+
+
+def count_report_file(path: str, by: set[SummaryKey]
+                      ) -> tuple[ValidationReport, dict[ErrorKind, Counts]]:
+    """Counts the errors of the report file at `path` by `by`, to be
+    merged with the counts of other reports. The report is returned
+    without its errors."""
+    if is_report_store(path):
+        store = ReportStore(path, readonly=True)
+        try:
+            return (store.get_header(), store.count(by))
+        finally:
+            store.close()
+    with open_file(path, 'r') as f:
+        result = read_report_to_summarize(f, by)
+    if result is None:
+        raise ValueError(f'failed to read report "{path}"')
+    report, summarizer = result
+    return (replace(report, errors=[], warnings=[]), summarizer.get_counts())
+
+
+def read_report_header(path: str) -> ValidationReport:
+    """Reads the report file at `path` without its errors and warnings.
+    Only the first line of ndjson reports is read, while json reports are
+    read through, since their counts come after the errors."""
+    if is_report_store(path):
+        store = ReportStore(path, readonly=True)
+        try:
+            return store.get_header()
+        finally:
+            store.close()
+    with open_file(path, 'r') as f:
+        stream = ReportStream(f)
+        if stream.format == ReportFormat.NDJSON:
+            return replace(read_ndjson_header(stream.first_line), errors=[],
+                           warnings=[])
+        for _ in stream.entries():
+            pass
+        return stream.get_report()
+
+
+def merge_reports(output: IO, paths: Iterable[str]) -> None:
+    """Writes the json, ndjson or sqlite reports at `paths` as one ndjson
+    report, one error at a time. The reports are read twice, first for their
+    headers, since the header is written first."""
+    paths = list(paths)
+    headers = [read_report_header(path) for path in paths]
+    is_sampled = [header.error_counts is not None or
+                  header.warning_counts is not None for header in headers]
+    if any(is_sampled) and not all(is_sampled):
+        raise ValueError('sampled and unsampled reports can\'t be merged')
+    builder = ReportBuilder()
+    for header in headers:
+        builder.add(header)
+    write_ndjson_header(output, builder.build())
+    for path in paths:
+        if is_report_store(path):
+            store = ReportStore(path, readonly=True)
+            try:
+                for e in store.query():
+                    write_ndjson_entry(output, e)
+            finally:
+                store.close()
+            continue
+        with open_file(path, 'r') as f:
+            for e in ReportStream(f).entries():
+                write_ndjson_entry(output, e)
 
 
 def write_yaml_report(output: IO, report: SomeReport) -> None:
     # XXX: dump dict to avoid yaml-tags from class types
-    yaml.dump(report.__dict__, output)
+    yaml.dump(get_fields(report), output)
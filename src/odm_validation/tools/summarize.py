@@ -1,26 +1,28 @@
 #!/usr/bin/env python3
 
 import csv
-import json
 import sys
-import logging
-import yaml
 from enum import Enum
-from typing import IO, Optional
+from typing import IO, Iterable, Optional
 
 import typer
 
-from odm_validation.reports import ErrorKind, ValidationReport
+from odm_validation.compression import open_file
+from odm_validation.report_store import ReportStore
+from odm_validation.reports import ErrorKind
 from odm_validation.summarization import (
     SummarizedReport,
     SummaryEntry,
     SummaryKey,
-    summarize_report
+    SummaryRow,
+    summarize_report_files,
 )
 
 from odm_validation.tools.reportutils import (
     ReportFormat,
-    detect_report_format_from_content,
+    expand_paths,
+    is_report_store,
+    read_report_to_summarize,
     write_json_report,
     write_yaml_report,
 )
@@ -34,33 +36,41 @@ class SummaryFormat(Enum):
 
 
 # constants
-REPORT_FILE_DESC = 'The report file to summarize.'
+REPORT_FILES_DESC = ('The report file(s) to summarize, which can be globs. '
+                     'Multiple reports are summarized as one, in parallel. '
+                     'Sqlite reports are summarized in the database. '
+                     'Defaults to stdin.')
 BY_DESC = ('The key(s) to summarize by. This can be specified multiple times, '
-           'for instance: `--by=table --by=column`.')
+           'for instance: `--by=table --by=column`. Sampled reports can\'t '
+           'be summarized by row.')
 ERRLVL_DESC = ('The level of detail for errors. '
                'Selecting `warning` will also include `error`.')
 OUT_DESC = 'The path to write the summary file to.'
 FMT_DESC = 'The output format.'
+WORKERS_DESC = ('The number of processes to summarize multiple reports with. '
+                'Defaults to the number of CPUs.')
 
 
-def write_csv_summary(sum_report: SummarizedReport, output: IO) -> None:
+def write_csv_rows(output: IO, rows: Iterable[SummaryRow]) -> None:
+    """Writes the summary `rows` as csv, one at a time."""
     headers = ['errorLevel'] + list(SummaryEntry.__dataclass_fields__)
+    writer = csv.writer(output)
+    writer.writerow(headers)
+    for error_kind, _, e in rows:
+        writer.writerow([error_kind.value, e.rule_id.name, e.count,
+                         e.key.value, e.value])
+
+
+def write_csv_summary(sum_report: SummarizedReport, output: IO) -> None:
     errorkind_summaries = {
         ErrorKind.ERROR: sum_report.errors,
         ErrorKind.WARNING: sum_report.warnings,
     }
-    writer = csv.DictWriter(output, headers)
-    writer.writeheader()
-    for error_kind in ErrorKind:
-        summary = errorkind_summaries[error_kind]
-        row_ext = {'errorLevel': error_kind.value}
-        for table_id, entries in summary.items():
-            for e in entries:
-                data = e.__dict__
-                data['rule_id'] = data['rule_id'].name
-                data['key'] = data['key'].value
-                row = (row_ext | data)
-                writer.writerow(row)
+    write_csv_rows(output, (
+        (error_kind, table_id, e)
+        for error_kind in ErrorKind
+        for table_id, entries in errorkind_summaries[error_kind].items()
+        for e in entries))
 
 
 def write_summary(output: IO, sum_report: SummarizedReport,
@@ -73,49 +83,24 @@ def write_summary(output: IO, sum_report: SummarizedReport,
         write_yaml_report(output, sum_report)
 
 
-def read_report_from_file(file: IO) -> Optional[ValidationReport]:
-    # XXX: must use yaml.safe_load to avoid running arbitrary python code on
-    # the user's machine, however, it's extremely slow
-    raw_data: str = file.read()
-    fmt = detect_report_format_from_content(raw_data)  # only peeks
-    report_obj: Optional[dict] = None
-    if fmt == ReportFormat.JSON:
-        report_obj = json.loads(raw_data)
-    elif fmt == ReportFormat.YAML:
-        logging.warn('you should use json-reports instead of yaml when ' +
-                     'summarizing, since yaml parsing is extremely slow')
-        report_obj = yaml.safe_load(raw_data)
-    elif fmt is not None:
-        logging.error(f'report format {fmt} can\'t be summarized')
-    else:
-        logging.error('unable to detect report format')
-    if report_obj is None:
-        return None
-    report = ValidationReport(**report_obj)
-    return report
-
-
-def read_report(path: str) -> Optional[ValidationReport]:
-    with open(path, 'r') as f:
-        return read_report_from_file(f)
-
-
 # XXX: locals are too noisy
 app = typer.Typer(pretty_exceptions_show_locals=False)
 
 
 @app.command()
 def main(
-    report_file: str = typer.Argument(default='', help=REPORT_FILE_DESC),
+    report_files: Optional[list[str]] = typer.Argument(
+        default=None, help=REPORT_FILES_DESC),
     by: list[SummaryKey] = typer.Option(default=[SummaryKey.TABLE.value],
                                         help=BY_DESC),
     errorLevel: ErrorKind = typer.Option(default=ErrorKind.ERROR.value,
                                          help=ERRLVL_DESC),
     out: str = typer.Option(default='', help=OUT_DESC),
     format: SummaryFormat = typer.Option(default=SummaryFormat.CSV.value,
-                                         help=FMT_DESC)
+                                         help=FMT_DESC),
+    workers: Optional[int] = typer.Option(default=None, help=WORKERS_DESC)
 ) -> None:
-    in_path = report_file
+    in_paths = expand_paths(report_files or [])
     out_fmt = format
     out_path = out
     if out_fmt == ReportFormat.TXT:
@@ -123,18 +108,43 @@ def main(
 
     # XXX: Don't print anything before reading of input is completed, to avoid
     # pollusion of stdout when piping from the validate tool.
-    if in_path:
-        report = read_report(in_path)
-    else:
-        report = read_report_from_file(sys.stdin)
-    if not report:
+    keys = set(by)
+    sum_report = None
+    result = None
+    try:
+        if len(in_paths) > 1:
+            sum_report = summarize_report_files(in_paths, keys, workers)
+        elif in_paths and is_report_store(in_paths[0]):
+            # summarized with SQL aggregates, without reading the errors
+            store = ReportStore(in_paths[0], readonly=True)
+            try:
+                sum_report = store.summarize(keys)
+            finally:
+                store.close()
+        elif in_paths:
+            with open_file(in_paths[0], 'r') as f:
+                result = read_report_to_summarize(f, keys)
+        else:
+            result = read_report_to_summarize(sys.stdin, keys)
+    except ValueError as e:
+        # like summarizing a sampled report by row
+        quit(f'failed to summarize report: {e}')
+    if not sum_report and not result:
         quit('failed to read report')
 
-    sum_report = summarize_report(report, by=set(by))
-
-    output = open(out_path, 'w') if out_path else sys.stdout
+    output = open_file(out_path, 'w') if out_path else sys.stdout
     try:
-        write_summary(output, sum_report, format)
+        if result:
+            report, summarizer = result
+            # csv summaries are written as they are generated, since
+            # summaries by row can be big
+            if out_fmt == SummaryFormat.CSV:
+                write_csv_rows(output, summarizer.iter_summary())
+            else:
+                write_summary(output, summarizer.summarize(report), out_fmt)
+        else:
+            assert sum_report
+            write_summary(output, sum_report, out_fmt)
     finally:
         if output != sys.stdout:
             output.close()
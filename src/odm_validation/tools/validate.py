@@ -6,7 +6,7 @@ import tempfile
 from enum import Enum
 from math import ceil
 from os.path import basename, join, splitext
-from typing import IO, Optional
+from typing import IO, Iterator, Optional
 
 
 import typer
@@ -16,14 +16,25 @@ from xlsx2csv import Xlsx2csv
 import odm_validation.odm as odm
 import odm_validation.part_tables as pt
 import odm_validation.utils as utils
+from odm_validation.compression import open_file, split_compression
+from odm_validation.foreign_keys import ForeignKeyIndex, get_foreign_keys
+from odm_validation.report_store import ReportStore
 from odm_validation.reports import ErrorVerbosity
-from odm_validation.schemas import import_schema
-from odm_validation.validation import _validate_data_ext, DataKind
+from odm_validation.schemas import Schema, get_table_columns, import_schema
+from odm_validation.summarization import OnlineSummarizer, SummaryKey
+from odm_validation.validation import (
+    DataKind,
+    _validate_data_ext,
+    get_table_info,
+    validate_pending_foreign_keys,
+)
+from odm_validation.versions import __version__
 
 from odm_validation.reports import (
     ErrorKind,
+    ReportBuilder,
+    TableInfo,
     ValidationReport,
-    join_reports
 )
 
 from odm_validation.tools.reportutils import (
@@ -31,23 +42,54 @@ from odm_validation.tools.reportutils import (
     detect_report_format_from_path,
     get_ext,
     write_json_report,
+    write_ndjson_entry,
+    write_ndjson_header,
+    write_ndjson_report,
     write_txt_report,
     write_yaml_report,
 )
+from odm_validation.tools.summarize import (
+    SummaryFormat,
+    write_csv_rows,
+    write_summary,
+)
 
 
 class DataFormat(Enum):
+    ARROW = 'arrow'
     CSV = 'csv'
+    FEATHER = 'feather'
+    PARQUET = 'parquet'
     XLSX = 'xlsx'
 
 
+# formats that are imported as typed columns
+COLUMNAR_FORMATS = [DataFormat.ARROW, DataFormat.FEATHER, DataFormat.PARQUET]
+
+
 DEF_VER = odm.VERSION_STR
 
-DATA_FILE_DESC = "Path of input files (xlsx/csv)."
+DATA_FILE_DESC = ("Path of input files (xlsx/csv/parquet/arrow/feather). CSV "
+                  "files can be compressed (csv.gz/csv.xz/csv.zst).")
 VERSION_DESC = "ODM version to validate against."
-OUT_DESC = "Output path of validation report. Defaults to stdout/console."
+OUT_DESC = ("Output path of validation report. Defaults to stdout/console. "
+            "Required for sqlite reports. Reports are compressed when the "
+            "path has a compression extension (like report.json.gz).")
 FORMAT_DESC = "Output format. Defaults to txt if unable to autodetect."
 VERB_DESC = "Error message verbosity, between 0 and 2."
+GROUP_VALUES_DESC = "Report repeated invalid values once per column."
+MAX_EXAMPLES_DESC = ("Max number of errors/warnings to report per table, "
+                     "column and rule. All of them are still counted, but "
+                     "the report can't be summarized by row.")
+SUMMARIZE_BY_DESC = ("Output a summary by table/column/row instead of the "
+                     "report, in csv/json/yaml. This can be specified "
+                     "multiple times.")
+CHECK_FOREIGN_KEYS_DESC = ("Check that foreign key values exist in the "
+                           "tables they reference. Referenced tables must be "
+                           "validated too.")
+COMPACT_KEYS_DESC = ("Keep only a digest of each primary key when checking "
+                     "for duplicates, which uses less memory for big "
+                     "tables.")
 
 
 def info(s: str = "", line: bool = True) -> None:
@@ -75,7 +117,7 @@ def import_xlsx(src_file: str, dst_dir: str) -> list[str]:
 
 
 def filename_without_ext(path: str) -> str:
-    return splitext(basename(path))[0]
+    return splitext(basename(split_compression(path)[0]))[0]
 
 
 def on_progress(action: str, table_id: str, offset: int, total: int) -> None:
@@ -88,11 +130,17 @@ def enum_values(E) -> list[str]:  # type: ignore
 
 
 def detect_data_format(path: str) -> Optional[DataFormat]:
+    """Detects the data format from the extension of `path`. Only CSV files
+    can be compressed (like ".csv.gz")."""
+    path, compression = split_compression(path)
     ext = get_ext(path)
     try:
-        return DataFormat[ext.upper()]
+        result = DataFormat[ext.upper()]
     except KeyError:
         return None
+    if compression and result != DataFormat.CSV:
+        return None
+    return result
 
 
 def get_schema_path(version: str) -> str:
@@ -128,26 +176,52 @@ def infer_tables(in_paths: list, version: Version) -> dict[pt.TableId, str]:
     return result
 
 
-def load_db_data(tables: dict[pt.TableId, str]) -> dict:
+def load_db_data(tables: dict[pt.TableId, str], schema: Schema,
+                 in_fmt: DataFormat) -> dict:
+    """Only the columns that are needed for validation are imported. Tables
+    that aren't part of the schema are skipped."""
     info('\nloading data...')
-    result = {}
+    result: dict = {}
     for table_id, path in tables.items():
-        result[table_id] = utils.import_dataset(path)
+        if table_id not in schema['schema']:
+            info(f'table "{table_id}" has no schema, skipping')
+            continue
+        columns = get_table_columns(schema, table_id)
+        if in_fmt in COLUMNAR_FORMATS:
+            result[table_id] = utils.import_arrow_file(path, columns)
+        else:
+            # the rows are only read by the validation, so they're compact
+            result[table_id] = utils.import_dataset(path, columns,
+                                                    compact=True)
     return result
 
 
-def strip_report(report: ValidationReport) -> None:
+def set_column_counts(table_info: dict[pt.TableId, TableInfo],
+                      tables: dict[pt.TableId, str]) -> None:
+    """Sets the column counts of `table_info` to the ones of the table
+    files, which includes the columns that weren't imported."""
+    for table_id, path in tables.items():
+        if table_id in table_info:
+            table_info[table_id]['columns'] = len(utils.import_header(path))
+
+
+def strip_entry(e: dict) -> None:
     """Removes the error debug fields 'validationRuleFields' and
     'row'/'rows'."""
+    # the fields are deleted instead of popped, which would render them
+    for key in ['validationRuleFields', 'row', 'rows']:
+        if key in e:
+            del e[key]
+
+
+def strip_report(report: ValidationReport) -> None:
     errorkind_errors = {
         ErrorKind.ERROR: report.errors,
         ErrorKind.WARNING: report.warnings,
     }
     for errors in errorkind_errors.values():
         for e in errors:
-            e.pop('validationRuleFields', None)
-            e.pop('row', None)
-            e.pop('rows', None)
+            strip_entry(e)
 
 
 def write_report(output: IO, report: ValidationReport, fmt: ReportFormat
@@ -158,6 +232,8 @@ def write_report(output: IO, report: ValidationReport, fmt: ReportFormat
         write_json_report(output, report)
     elif fmt == ReportFormat.YAML:
         write_yaml_report(output, report)
+    elif fmt == ReportFormat.NDJSON:
+        write_ndjson_report(output, report)
 
 
 # XXX: locals must be disabled to avoid `schema` being dumped to console on an
@@ -172,7 +248,15 @@ def main_cli(
     out: str = typer.Option(default="", help=OUT_DESC),
     format: Optional[ReportFormat] = typer.Option(default=None,
                                                   help=FORMAT_DESC),
-    verbosity: int = typer.Option(default=2, help=VERB_DESC)
+    verbosity: int = typer.Option(default=2, help=VERB_DESC),
+    group_values: bool = typer.Option(default=False, help=GROUP_VALUES_DESC),
+    max_examples: Optional[int] = typer.Option(default=None,
+                                               help=MAX_EXAMPLES_DESC),
+    summarize_by: list[SummaryKey] = typer.Option(default=[],
+                                                  help=SUMMARIZE_BY_DESC),
+    check_foreign_keys: bool = typer.Option(default=False,
+                                            help=CHECK_FOREIGN_KEYS_DESC),
+    compact_keys: bool = typer.Option(default=False, help=COMPACT_KEYS_DESC)
 ) -> None:
     out_path = out
     out_fmt = format
@@ -202,13 +286,29 @@ def main_cli(
             out_fmt = ReportFormat.TXT
     assert out_fmt
 
+    if summarize_by and out_fmt in [ReportFormat.NDJSON, ReportFormat.SQLITE]:
+        info(f'Summaries can\'t be written as {out_fmt.value}.')
+        quit(1)
+
+    is_stored = out_fmt == ReportFormat.SQLITE
+    if is_stored and not out_path:
+        info('Sqlite reports must be written to a file, with --out.')
+        quit(1)
+    if is_stored and max_examples is not None:
+        info('Sqlite reports can\'t be sampled, since all of the errors are '
+             'stored.')
+        quit(1)
+
     schema_path = get_schema_path(version)
     schema = import_schema(schema_path)
 
     if out_path:
         info(f'writing result to {out_path}\n')
 
-    output = open(out_path, 'w') if out_path else sys.stdout
+    # sqlite reports are stored in a database instead of being written
+    store = ReportStore(out_path, create=True) if is_stored else None
+    output = (open_file(out_path, 'w') if out_path and not is_stored
+              else sys.stdout)
     try:
         info(f'validating {in_paths}')
         info(f'using schema "{os.path.basename(schema_path)}"')
@@ -216,14 +316,57 @@ def main_cli(
         if in_fmt == DataFormat.XLSX:
             in_paths = convert_excel_to_csv(in_paths[0])
         tables = infer_tables(in_paths, Version.parse(version))
-        db_data = load_db_data(tables)
-
+        db_data = load_db_data(tables, schema, in_fmt)
+
+        # Columnar formats are typed, which means that their values don't
+        # need to be coerced from strings like in spreadsheets, and that
+        # there's no header row.
+        data_kind = (DataKind.python if in_fmt in COLUMNAR_FORMATS
+                     else DataKind.spreadsheet)
+
+        # shared between the tables, since they are validated one at a time
+        fk_index = None
+        if check_foreign_keys:
+            fk_index = ForeignKeyIndex(get_foreign_keys(schema['schema']))
+
+        # the errors are summarized as they are found, so only the examples
+        # asked for are kept
+        summarizer = None
+        if summarize_by:
+            summarizer = OnlineSummarizer(set(summarize_by),
+                                          table_ids=db_data)
+            if max_examples is None:
+                max_examples = 0
+
+        # ndjson and sqlite reports are written as the errors are found, so
+        # none of them are kept, unless only a sample of them is asked for
+        def write_entry(e: dict) -> None:
+            strip_entry(e)
+            if store:
+                store.add(e)
+            else:
+                write_ndjson_entry(output, e)
+
+        is_streamed = (out_fmt == ReportFormat.NDJSON and
+                       max_examples is None) or is_stored
+        on_error = write_entry if is_streamed else None
+        if is_streamed:
+            max_examples = 0
+
+        # the data is only loaded to be validated, so it's coerced in place
         def validate(data: dict[pt.TableId, pt.Dataset]) -> ValidationReport:
-            report = _validate_data_ext(schema, data, DataKind.spreadsheet,
+            report = _validate_data_ext(schema, data, data_kind,
                                         version, on_progress=on_progress,
                                         with_metadata=False,
-                                        verbosity=ErrorVerbosity(verbosity))
+                                        verbosity=ErrorVerbosity(verbosity),
+                                        fk_index=fk_index, inplace=True,
+                                        compact_keys=compact_keys,
+                                        group_values=group_values,
+                                        max_examples=max_examples,
+                                        summarizer=summarizer,
+                                        on_error=on_error)
             strip_report(report)
+            set_column_counts(report.table_info, tables)
             info()  # newline after progressbar
 
             # XXX: just in case the validation wrote anything to the console,
@@ -232,22 +375,80 @@ def main_cli(
             sys.stderr.flush()
             return report
 
+        # Generates the report of each table, with the index of the table in
+        # the input, since referenced tables are validated first. Foreign
+        # keys referencing tables that weren't validated yet are reported in
+        # an extra report of their table, once they are.
+        def validate_tables() -> Iterator[tuple[int, ValidationReport]]:
+            positions = {table_id: i for i, table_id in enumerate(db_data)}
+            table_ids = list(db_data)
+            if fk_index:
+                table_ids = fk_index.order_tables(table_ids)
+            validated: set[pt.TableId] = set()
+            for table_id in table_ids:
+                yield (positions[table_id],
+                       validate({table_id: db_data[table_id]}))
+                validated.add(table_id)
+                if not fk_index:
+                    continue
+                for pending_table_id in fk_index.pending_tables():
+                    if pending_table_id not in validated:
+                        continue
+                    report = validate_pending_foreign_keys(
+                        schema, fk_index, pending_table_id, version,
+                        verbosity=ErrorVerbosity(verbosity),
+                        max_examples=max_examples, summarizer=summarizer,
+                        on_error=on_error)
+                    strip_report(report)
+                    yield (positions[pending_table_id], report)
+            if fk_index:
+                for fk, n in fk_index.drop_pending().items():
+                    refs = '/'.join(fk.ref_table_ids)
+                    info(f'{n} values of {fk.table_id}.{fk.column_id} '
+                         f'weren\'t checked, since {refs} wasn\'t '
+                         'validated')
+
         # TODO: we should write continuously to output when the user is
         # watching in realtime on the terminal, however, stdout can be piped to
         # somewhere else, so we should detect and take that into account
         info()
         is_terminal = out_fmt == ReportFormat.TXT and not out_path
-        if is_terminal:
-            for table_id, table_data in db_data.items():
-                report = validate({table_id: table_data})
+        if summarizer:
+            builder = ReportBuilder()
+            for index, report in validate_tables():
+                builder.add(report, index)
+            main_report = builder.build()
+            if out_fmt == ReportFormat.TXT:
+                write_csv_rows(output, summarizer.iter_summary())
+            else:
+                write_summary(output, summarizer.summarize(main_report),
+                              SummaryFormat(out_fmt.value))
+        elif is_streamed:
+            table_info = get_table_info(db_data)
+            set_column_counts(table_info, tables)
+            header = ValidationReport(
+                data_version=version,
+                schema_version=schema['schemaVersion'],
+                package_version=__version__,
+                table_info=table_info,
+                errors=[],
+                warnings=[],
+            )
+            if store:
+                store.set_header(header)
+            else:
+                write_ndjson_header(output, header)
+            for _ in validate_tables():
+                pass
+        elif is_terminal:
+            for _, report in validate_tables():
                 write_report(output, report, ReportFormat.TXT)
                 info()
         else:
-            main_report = None
-            for table_id, table_data in db_data.items():
-                report = validate({table_id: table_data})
-                main_report = join_reports(main_report, report)
-            assert main_report
+            builder = ReportBuilder()
+            for index, report in validate_tables():
+                builder.add(report, index)
+            main_report = builder.build()
             write_report(output, main_report, out_fmt)
 
         # XXX: report data doesn't have newline at the end, so we need to add
@@ -258,8 +459,10 @@ def main_cli(
         # to cached writing of the big reports
         sys.stdout.flush()
     finally:
-        if out_path:
+        if output != sys.stdout:
             output.close()
+        if store:
+            store.close()
 
     info()
     if out_path:
@@ -1,13 +1,33 @@
 import inspect
+import io
+import mmap
 import os
 import sys
+from contextlib import contextmanager
 from os.path import join, splitext
 from pathlib import Path
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Iterable,
+    Iterator,
+    Mapping,
+    Optional,
+)
 
 import csv
 import json
 import yaml
 
+from odm_validation.compression import (
+    get_compression,
+    open_file,
+    split_compression,
+)
+
+if TYPE_CHECKING:
+    from _typeshed import WriteableBuffer
+
 
 def get_pkg_dir() -> str:
     '''returns the actual pkg. dir or `/src/odm_validation/` if in dev. env.'''
@@ -34,16 +54,141 @@ def get_asset_dir() -> str:
     return asset_dir
 
 
-def import_csv_file(path: str) -> list[dict]:
-    result = []
-    with open(path, newline='', encoding='utf-8-sig') as f:
-        for row in csv.DictReader(f):
-            result.append(row)
-    return result
+# the max number of distinct values to intern per column
+_INTERN_LIMIT = 4096
+
+
+class _ValueDictionary:
+    """Interns the values of each column, so that repeated values are stored
+    only once. Columns with more than `_INTERN_LIMIT` distinct values (like
+    IDs) are left as is, to not keep every value of them in memory."""
+    def __init__(self, column_count: int) -> None:
+        self.columns: list[Optional[dict[str, str]]] = \
+            [{} for _ in range(column_count)]
+
+    def intern(self, values: list[Optional[str]]) -> None:
+        for i, value in enumerate(values):
+            d = self.columns[i]
+            if d is None or value is None:
+                continue
+            interned = d.setdefault(value, value)
+            if interned is value and len(d) > _INTERN_LIMIT:
+                self.columns[i] = None
+            values[i] = interned
+
+
+class _MmapReader(io.RawIOBase):
+    """A raw stream of a memory-mapped file."""
+    def __init__(self, mm: mmap.mmap) -> None:
+        self.mm = mm
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: 'WriteableBuffer') -> int:
+        view = memoryview(buffer).cast('B')
+        data = self.mm.read(len(view))
+        view[:len(data)] = data
+        return len(data)
+
+
+@contextmanager
+def _open_csv(path: str) -> Iterator[IO[str]]:
+    """Opens a CSV file as text, with its line endings left as is for the
+    CSV reader, which handles CR, LF and CRLF line endings. Uncompressed
+    files are memory-mapped, while compressed files are decompressed as they
+    are read."""
+    def to_text(f: IO[bytes]) -> IO[str]:
+        return io.TextIOWrapper(f, encoding='utf-8-sig', newline='')
+
+    if get_compression(path):
+        with open_file(path, 'rb') as f:
+            yield to_text(f)
+        return
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield io.StringIO()  # empty files can't be mapped
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield to_text(io.BufferedReader(_MmapReader(mm)))
+
+
+def _iter_csv_records(path: str, columns: Optional[Iterable[str]],
+                      intern: bool = False
+                      ) -> Iterator[tuple[list[str], list[Optional[str]]]]:
+    """Yields the header (with only the `columns` that are part of it) and
+    values of each record in a CSV file."""
+    with _open_csv(path) as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        column_set = set(header if columns is None else columns)
+        indexes = [i for i, name in enumerate(header)
+                   if name in column_set]
+        names = [header[i] for i in indexes]
+        value_dict = _ValueDictionary(len(names)) if intern else None
+        for values in reader:
+            if not values:
+                continue
+            n = len(values)
+            record = [(values[i] if i < n else None) for i in indexes]
+            if value_dict is not None:
+                value_dict.intern(record)
+            yield (names, record)
+
+
+def iter_csv_file(path: str, columns: Optional[Iterable[str]] = None,
+                  compact: bool = False, intern: bool = False
+                  ) -> Iterator[Mapping]:
+    """Yields the rows of a CSV file, with only the `columns` that are part
+    of its header if specified. The file is memory-mapped, or decompressed
+    as it's read if it has a compression extension (like ".csv.gz"), and
+    the other columns are skipped without being stored.
+
+    Rows are yielded the same way as with `csv.DictReader`, which skips empty
+    lines and sets missing fields to None, except that fields without a
+    header are dropped.
+
+    :param compact: yields read-only `CompactRow`s instead of dicts.
+    :param intern: stores repeated values of low-cardinality columns only
+        once.
+    """
+    # imported here to avoid an import cycle
+    from odm_validation.compact_rows import CompactRow, make_header
+
+    header = None
+    for names, values in _iter_csv_records(path, columns, intern):
+        if compact:
+            if header is None:
+                header = make_header(names)
+            yield CompactRow(header, values)
+        else:
+            yield dict(zip(names, values))
+
+
+def import_csv_file(path: str, columns: Optional[Iterable[str]] = None,
+                    compact: bool = False, intern: bool = False) -> list:
+    """Imports a CSV file as a list of rows. See `iter_csv_file`."""
+    return list(iter_csv_file(path, columns, compact, intern))
+
+
+def import_header(path: str) -> list[str]:
+    """Returns the column names of a CSV, Parquet or Arrow IPC (Feather)
+    file, without importing its data."""
+    _, ext = splitext(split_compression(path)[0])
+    if ext == '.csv':
+        with _open_csv(path) as f:
+            return next(csv.reader(f), [])
+
+    # imported here since pyarrow is an optional dependency
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    if ext == '.parquet':
+        return list(pq.ParquetFile(path, memory_map=True).schema_arrow.names)
+    return list(feather.read_table(path, memory_map=True).column_names)
 
 
 def import_json_file(path: str) -> dict:
-    with open(path, 'r') as f:
+    with open_file(path, 'r') as f:
         return json.loads(f.read())
 
 
@@ -57,8 +202,44 @@ def export_yaml_file(data: dict, path: str) -> None:
         f.write(yaml.dump(data))
 
 
-def import_dataset(path: str) -> list[dict]:
-    # print('importing ' + path)
+def import_arrow_file(path: str, columns: Optional[Iterable[str]] = None
+                      ) -> dict:
+    """Imports a Parquet or Arrow IPC (Feather) file as a dict of NumPy
+    arrays, with one array per column. Only `columns` are read if specified,
+    ignoring the ones missing from the file.
+
+    The file is memory-mapped, which means that Arrow IPC columns without
+    nulls are used without being copied.
+
+    Requires pyarrow to be installed.
+    """
+    # imported here since pyarrow is an optional dependency
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    from odm_validation.vectorized import from_arrow
+
+    def select(names: list[str]) -> list[str]:
+        if columns is None:
+            return names
+        column_set = set(columns)
+        return [name for name in names if name in column_set]
+
     _, ext = splitext(path)
+    if ext == '.parquet':
+        pf = pq.ParquetFile(path, memory_map=True)
+        table = pf.read(columns=select(pf.schema_arrow.names))
+    else:
+        table = feather.read_table(path, memory_map=True)
+        table = table.select(select(table.column_names))
+    return from_arrow(table)
+
+
+def import_dataset(path: str, columns: Optional[Iterable[str]] = None,
+                   compact: bool = False, intern: bool = True) -> list:
+    """Imports a dataset file as a list of rows, which are read-only
+    `CompactRow`s if `compact` is True. Repeated values are interned
+    unless `intern` is False, see `iter_csv_file`. CSV files can be
+    compressed."""
+    _, ext = splitext(split_compression(path)[0])
     assert ext == ".csv", f'"{ext}" is not a dataset file extension'
-    return import_csv_file(path)
+    return import_csv_file(path, columns, compact, intern)
@@ -3,9 +3,8 @@ This is the main module of the package. It contains functions for schema
 generation and data validation.
 """
 
-from collections import defaultdict
 from copy import deepcopy
-from typing import Callable, Iterator, Optional
+from typing import Callable, Iterable, Iterator, Optional, cast
 from enum import Enum
 # from pprint import pprint
 
@@ -13,25 +12,45 @@ import odm_validation.odm as odm
 import odm_validation.part_tables as pt
 import odm_validation.reports as reports
 import odm_validation.schemas as schemas
-from odm_validation.cerberusext import ContextualCoercer, OdmValidator
-from odm_validation.input_data import DataKind
+from odm_validation.compact_rows import CompactRow
+from odm_validation.cerberusext import (
+    COERCE_TYPES,
+    AggregatedError,
+    ContextualCoercer,
+    OdmValidator,
+    needs_coercion,
+)
+from odm_validation.foreign_keys import (
+    FOREIGN_KEY_RULE,
+    ForeignKeyIndex,
+    get_foreign_keys,
+)
+from odm_validation.input_data import Coercion, DataKind
 from odm_validation.reports import ErrorVerbosity, TableInfo, ValidationCtx
 from odm_validation.rule_filters import RuleFilter
 from odm_validation.rules import RuleId, ruleset
 from odm_validation.schemas import Schema
+from odm_validation.summarization import OnlineSummarizer
 from odm_validation.stdext import deep_update, keep, strip_dict_key
 from odm_validation.versions import __version__, parse_version
 from odm_validation.rule_errors import (
+    ErrorGroups,
+    ErrorSampler,
     filter_errors,
     gen_additions_schema,
     map_aggregated_errors,
     map_cerb_errors,
+    map_error_groups,
+    map_missing_columns,
 )
 
 TableDataset = dict[pt.TableId, pt.Dataset]
 
 _BATCH_SIZE = 20
 
+# the number of rows sampled per table when detecting typed columns
+_TYPE_SAMPLE_SIZE = 100
+
 
 def _generate_validation_schema_ext(parts: pt.Dataset,
                                     sets: pt.Dataset = [],
@@ -93,8 +112,17 @@ def generate_validation_schema(parts: pt.Dataset,
 OnProgress = Callable[[str, str, int, int], None]
 
 
-def _strip_coerce_rules(cerb_schema: dict) -> dict:
-    return strip_dict_key(deepcopy(cerb_schema), schemas.COERCE_KEY)
+def _strip_stage_rules(cerb_schema: dict) -> dict:
+    """Strips the rules that are implemented as separate stages, outside of
+    the Cerberus validation."""
+    result = deepcopy(cerb_schema)
+    for key in [schemas.COERCE_KEY, FOREIGN_KEY_RULE]:
+        strip_dict_key(result, key)
+    return result
+
+
+def _is_rule_enabled(rule_filter: RuleFilter, rule_id: RuleId) -> bool:
+    return any(r.id == rule_id for r in rule_filter.filter(ruleset))
 
 
 def filter_dict_by_key(key: str, d: dict) -> dict:
@@ -136,6 +164,15 @@ def _validate_data_ext(
     on_progress: Optional[OnProgress] = None,
     verbosity: ErrorVerbosity = ErrorVerbosity.LONG_METADATA_MESSAGE,
     with_metadata: bool = True,
+    compact_keys: bool = False,
+    check_foreign_keys: bool = False,
+    fk_index: Optional[ForeignKeyIndex] = None,
+    coercion: Coercion = Coercion.all,
+    inplace: bool = False,
+    group_values: bool = False,
+    max_examples: Optional[int] = None,
+    summarizer: Optional[OnlineSummarizer] = None,
+    on_error: Optional[Callable[[dict], None]] = None,
 ) -> reports.ValidationReport:
     """
     Validates `data` with `schema`, using Cerberus.
@@ -145,6 +182,40 @@ def _validate_data_ext(
 
     :param rule_whitelist: list of rule ids to explicitly enable.
     :param rule_blacklist: list of rule ids to explicitly disable.
+    :param compact_keys: keeps only a digest and row index per primary key
+        when checking for duplicate entries, instead of the key and row
+        themselves. This uses less memory for big tables.
+    :param check_foreign_keys: checks that the foreign key values exist in
+        the tables in `data` they reference (the `invalid_foreign_key` rule).
+        References to tables that aren't in `data` aren't checked.
+    :param fk_index: an index of the primary keys referenced by foreign keys,
+        which also checks the foreign keys. Pass the same index to multiple
+        calls to check foreign keys across tables that are validated one at
+        a time. References to tables that aren't indexed yet are kept as
+        pending in the index, and are reported by
+        `validate_pending_foreign_keys` once they are.
+    :param coercion: which columns to coerce. Skipping the columns of data
+        that is already typed, like ints and datetimes from Python, saves the
+        coercion pass. Tables given as columns only coerce the values that
+        need it regardless.
+    :param inplace: writes the coerced values into the rows of `data`,
+        instead of into a copy of them. This uses less memory, but `data`
+        is modified. Tables given as columns are never modified.
+    :param group_values: reports the errors with the same table, column,
+        rule and value as one error, with the row numbers of all of them,
+        but only the first few rows. This keeps reports of repeated invalid
+        values small.
+    :param max_examples: keeps only the first `max_examples` errors and
+        warnings of each table, column and rule, and counts all of them in
+        the `error_counts` and `warning_counts` of the report. The errors
+        are sampled as they are found, which keeps the memory use and the
+        report small when there are lots of errors.
+    :param summarizer: summarizes the errors and warnings as they are found.
+        Together with `max_examples`, this gives a full summary without
+        keeping all the errors.
+    :param on_error: is called with every error and warning as they are
+        found, like `summarizer`. Together with `max_examples`, this can be
+        used to write the errors somewhere else instead of keeping them.
     """
     # `rule_whitelist` determines which rules/errors are triggered during
     # validation. It is needed when testing data validation, to be able to
@@ -192,82 +263,420 @@ def _validate_data_ext(
     rule_filter = RuleFilter(whitelist=rule_whitelist,
                              blacklist=rule_blacklist)
 
-    def batch_table_data(
-        action: str,
-        table_id: pt.TableId,
-        table_data: pt.Dataset
-    ) -> Iterator[tuple[dict[pt.TableId, pt.Dataset], int]]:
-        total = len(table_data)
-        offset = 0
-        while offset < total:
-            n = min(total - offset, _BATCH_SIZE)
-            first = offset
-            last = offset + n
-            batch_data = {table_id: table_data[first:last]}
-            yield (batch_data, offset)
-            offset += n
-            if on_progress:
-                on_progress(action, table_id, offset, total)
-
-    batch_data: dict[pt.TableId, pt.Dataset] = {}
-    offset: int = 0
-
     coercion_schema = (cerb_schema if with_metadata else
                        gen_coercion_schema(cerb_schema))
-    coerced_data: dict[pt.TableId, pt.Dataset] = defaultdict(list)
-    coercer = ContextualCoercer(warnings=warnings, errors=errors)
-    for table_id, table_data in data.items():
-        schema = {table_id: coercion_schema[table_id]}
-        for batch in batch_table_data('coercing', table_id, table_data):
-            batch_data, offset = batch
-            coerce_result = coercer.coerce(batch_data, schema,
-                                           offset, data_kind)
-            coerced_data[table_id] += coerce_result[table_id]
-
-    table_info: dict[pt.TableId, TableInfo] = {}
+    validation_schema = _strip_stage_rules(cerb_schema)
+    # foreign keys are only checked when asked for, since the referenced
+    # tables must be validated too
+    if not _is_rule_enabled(rule_filter, RuleId.invalid_foreign_key):
+        fk_index = None
+    elif check_foreign_keys and fk_index is None:
+        fk_index = ForeignKeyIndex(get_foreign_keys(cerb_schema))
+
+    sampler = _new_sampler(max_examples, summarizer, on_error)
+
+    if _is_columnar(data):
+        # imported here since numpy is an optional dependency
+        from odm_validation.vectorized import validate_columnar
+        assert data_kind == DataKind.python, \
+            'columnar data can only be validated as `DataKind.python`'
+        table_info = validate_columnar(
+            vctx, cast(dict, data), coercion_schema, validation_schema,
+            rule_filter, fk_index, compact_keys, group_values, sampler,
+            errors, warnings, on_progress)
+    else:
+        table_info = _validate_rows(
+            vctx, data, data_kind, coercion_schema, validation_schema,
+            rule_filter, fk_index, compact_keys, coercion, inplace,
+            group_values, sampler, errors, warnings, on_progress)
+
+    return _gen_report(data_version, versioned_schema["schemaVersion"],
+                       table_info, errors, warnings, sampler, max_examples)
+
+
+def validate_pending_foreign_keys(
+    schema: Schema,
+    fk_index: ForeignKeyIndex,
+    table_id: pt.TableId,
+    data_version: str = odm.VERSION_STR,
+    rule_blacklist: list[RuleId] = [],
+    rule_whitelist: list[RuleId] = [],
+    verbosity: ErrorVerbosity = ErrorVerbosity.LONG_METADATA_MESSAGE,
+    max_examples: Optional[int] = None,
+    summarizer: Optional[OnlineSummarizer] = None,
+    on_error: Optional[Callable[[dict], None]] = None,
+) -> reports.ValidationReport:
+    """Reports the pending foreign keys of `table_id` in `fk_index`, from an
+    earlier call to `_validate_data_ext`, that can be checked now that
+    their referenced tables are indexed. The report only has the errors of
+    `table_id`, which is meant to be joined with its report, and has no
+    table info. The errors have no rows.
 
-    validation_schema = _strip_coerce_rules(cerb_schema)
-    for table_id, table_data in coerced_data.items():
-        table_info[table_id] = TableInfo(
-            columns=len(table_data[0]),
-            rows=len(table_data),
-        )
-        v: OdmValidator = OdmValidator.new()  # type: ignore
-        schema = {table_id: validation_schema[table_id]}
-        for batch in batch_table_data('validating', table_id, table_data):
-            batch_data, offset = batch
-            v._errors.clear()
-            if v.validate(offset, data_kind, batch_data, schema):
-                continue
-            e, w = map_cerb_errors(vctx, table_id, v._errors,
-                                   schema, rule_filter, offset,
-                                   data_kind)
-            errors += e
-            warnings += w
-        errors += map_aggregated_errors(vctx, table_id,
-                                        v.error_state.aggregated_errors,
-                                        rule_filter)
-
-    errors = filter_errors(errors)
+    The parameters are the same as for `_validate_data_ext`.
+    """
+    vctx = ValidationCtx(verbosity=verbosity)
+    rule_filter = RuleFilter(whitelist=rule_whitelist,
+                             blacklist=rule_blacklist)
+    sampler = _new_sampler(max_examples, summarizer, on_error)
+    errors = map_aggregated_errors(vctx, table_id,
+                                   fk_index.resolve_pending(table_id),
+                                   rule_filter)
+    return _gen_report(data_version, schema["schemaVersion"], {}, errors, [],
+                       sampler, max_examples)
+
+
+def _new_sampler(max_examples: Optional[int],
+                 summarizer: Optional[OnlineSummarizer],
+                 on_error: Optional[Callable[[dict], None]]
+                 ) -> Optional[ErrorSampler]:
+    if summarizer is not None:
+        summarizer.start_report()
+        on_error = _chain_callbacks(summarizer.add, on_error)
+    if max_examples is None and on_error is None:
+        return None
+    return ErrorSampler(max_examples, on_error)
+
+
+def _gen_report(data_version: str, schema_version: str,
+                table_info: dict[pt.TableId, TableInfo], errors: list,
+                warnings: list, sampler: Optional[ErrorSampler],
+                max_examples: Optional[int]) -> reports.ValidationReport:
+    """Returns the report of the validated `errors` and `warnings`, which
+    are sampled by `sampler` if given."""
+    error_counts = None
+    warning_counts = None
+    if sampler is not None:
+        sampler.drain(errors, warnings)
+        errors, warnings = sampler.finish()
+        if max_examples is not None:
+            error_counts = sampler.error_counts
+            warning_counts = sampler.warning_counts
+    else:
+        errors = filter_errors(errors)
 
     return reports.ValidationReport(
         data_version=data_version,
-        schema_version=versioned_schema["schemaVersion"],
+        schema_version=schema_version,
         package_version=__version__,
         table_info=table_info,
         errors=errors,
         warnings=warnings,
+        error_counts=error_counts,
+        warning_counts=warning_counts,
     )
 
 
+def _chain_callbacks(first: Callable[[dict], None],
+                     second: Optional[Callable[[dict], None]]
+                     ) -> Callable[[dict], None]:
+    if second is None:
+        return first
+
+    def call_both(e: dict) -> None:
+        first(e)
+        second(e)
+    return call_both
+
+
+def _is_columnar(data: dict) -> bool:
+    """Returns True if the tables of `data` are given as columns (like
+    DataFrames) instead of rows."""
+    is_rows = [isinstance(table, list) for table in data.values()]
+    assert all(is_rows) or not any(is_rows), \
+        'tables must either all be lists of rows, or all be columnar'
+    return not all(is_rows)
+
+
+def _get_rows_info(rows: pt.Dataset) -> TableInfo:
+    return TableInfo(columns=len(rows[0]), rows=len(rows))
+
+
+def get_table_info(data: TableDataset) -> dict[pt.TableId, TableInfo]:
+    """Returns the number of columns and rows of each table in `data`, the
+    same as the `table_info` of its validation report, without validating
+    it."""
+    if _is_columnar(data):
+        # imported here since numpy is an optional dependency
+        from odm_validation.vectorized import get_columnar_info
+        return {table_id: get_columnar_info(table)
+                for table_id, table in cast(dict, data).items()}
+    return {table_id: _get_rows_info(rows) for table_id, rows in data.items()}
+
+
+def batch_rows(
+    action: str,
+    table_id: pt.TableId,
+    rows: pt.Dataset,
+    on_progress: Optional[OnProgress] = None,
+    first_offset: int = 0,
+    total: Optional[int] = None,
+) -> Iterator[tuple[TableDataset, int]]:
+    """Splits `rows` into batches, yielding each batch together with the
+    offset of its first row in the table.
+
+    :param first_offset: the table offset of the first row in `rows`.
+    :param total: the number of rows in the table, defaults to the length
+        of `rows`.
+    """
+    if total is None:
+        total = len(rows)
+    ix = 0
+    while ix < len(rows):
+        n = min(len(rows) - ix, _BATCH_SIZE)
+        batch_data = {table_id: rows[ix:ix+n]}
+        yield (batch_data, first_offset + ix)
+        ix += n
+        if on_progress:
+            on_progress(action, table_id, first_offset + ix, total)
+
+
+def sample_batches(batches: Iterable[tuple[TableDataset, int]],
+                   sampler: Optional[ErrorSampler], errors: list,
+                   warnings: list) -> Iterator[tuple[TableDataset, int]]:
+    """Yields `batches`, and moves the errors and warnings into `sampler`
+    after each of them, if given."""
+    for batch in batches:
+        yield batch
+        if sampler is not None:
+            sampler.drain(errors, warnings)
+
+
+def coerce_table(coercer: ContextualCoercer, coercion_schema: dict,
+                 table_id: pt.TableId,
+                 batches: Iterable[tuple[TableDataset, int]],
+                 data_kind: DataKind,
+                 groups: Optional[ErrorGroups] = None) -> pt.Dataset:
+    """Coerces the `batches` of `table_id`, and returns the coerced rows.
+    Errors and warnings are added to the coercer, or to `groups`."""
+    result: pt.Dataset = []
+    schema = {table_id: coercion_schema[table_id]}
+    group = groups.add_coercion if groups is not None else None
+    for batch_data, offset in batches:
+        coerce_result = coercer.coerce(batch_data, schema, offset, data_kind,
+                                       group)
+        result += coerce_result[table_id]
+    return result
+
+
+def _get_typed_columns(rows: pt.Dataset, column_schemas: dict) -> set[str]:
+    """Returns the columns of `column_schemas` with values in a sample of
+    `rows`, where none of the values need coercion."""
+    sample = rows[:_TYPE_SAMPLE_SIZE]
+    result = set()
+    for column_id, rules in column_schemas.items():
+        type_class = COERCE_TYPES[rules[schemas.COERCE_KEY]]
+        values = [row.get(column_id) for row in sample]
+        if any(values) and not any(needs_coercion(v, type_class)
+                                   for v in values):
+            result.add(column_id)
+    return result
+
+
+def _get_table_coercion_schema(coercion_schema: dict, table_id: pt.TableId,
+                               rows: pt.Dataset, coercion: Coercion) -> dict:
+    """Returns a coercion schema with only `table_id`, and only the columns
+    that should be coerced."""
+    table_schema = coercion_schema[table_id]
+    column_schemas = {
+        column_id: rules
+        for column_id, rules in table_schema['schema']['schema'].items()
+        if rules.get(schemas.COERCE_KEY)
+    }
+    if coercion == Coercion.none:
+        column_schemas = {}
+    elif coercion == Coercion.untyped:
+        typed = _get_typed_columns(rows, column_schemas)
+        column_schemas = {column_id: rules
+                          for column_id, rules in column_schemas.items()
+                          if column_id not in typed}
+    schema = dict(table_schema['schema'], schema=column_schemas)
+    return {table_id: dict(table_schema, schema=schema)}
+
+
+def validate_table(vctx: ValidationCtx, v: OdmValidator,
+                   validation_schema: dict, table_id: pt.TableId,
+                   batches: Iterable[tuple[TableDataset, int]],
+                   rule_filter: RuleFilter, data_kind: DataKind,
+                   errors: list, warnings: list,
+                   groups: Optional[ErrorGroups] = None) -> None:
+    """Validates the coerced `batches` of `table_id`, and adds the resulting
+    errors and warnings to `errors` and `warnings`, or to `groups`."""
+    schema = {table_id: validation_schema[table_id]}
+    for batch_data, offset in batches:
+        v._errors.clear()
+        if v.validate(offset, data_kind, batch_data, schema):
+            continue
+        e, w = map_cerb_errors(vctx, table_id, v._errors, schema,
+                               rule_filter, offset, data_kind, groups)
+        errors += e
+        warnings += w
+    errors += map_aggregated_errors(vctx, table_id,
+                                    v.error_state.aggregated_errors,
+                                    rule_filter)
+
+
+def _get_uniform_columns(rows: pt.Dataset) -> Optional[set[str]]:
+    """Returns the columns of `rows` if all the rows have the same columns,
+    which is always the case for imported files, or None otherwise."""
+    if not rows:
+        return None
+    first = rows[0]
+    if isinstance(first, CompactRow):
+        # compact rows with the same columns share their header
+        header = first.header
+        if all(isinstance(row, CompactRow) and row.header is header
+               for row in rows):
+            return set(header)
+    keys = first.keys()
+    if all(row.keys() == keys for row in rows):
+        return set(keys)
+    return None
+
+
+def _get_missing_columns(validation_schema: dict, table_id: pt.TableId,
+                         columns: set[str]) -> list[str]:
+    """Returns the mandatory columns of `table_id` that aren't in
+    `columns`, in schema order."""
+    column_schemas = validation_schema[table_id]['schema']['schema']
+    return [column_id for column_id, rules in column_schemas.items()
+            if rules.get('required') and column_id not in columns]
+
+
+def _strip_required(validation_schema: dict, table_id: pt.TableId) -> dict:
+    """Returns a schema with only `table_id`, where the `required` rule is
+    removed from its columns. The other rules are shared with
+    `validation_schema`."""
+    table_schema = validation_schema[table_id]
+    column_schemas = {
+        column_id: {k: v for k, v in rules.items() if k != 'required'}
+        for column_id, rules in table_schema['schema']['schema'].items()
+    }
+    schema = dict(table_schema['schema'], schema=column_schemas)
+    return {table_id: dict(table_schema, schema=schema)}
+
+
+def check_mandatory_columns(vctx: ValidationCtx, validation_schema: dict,
+                            table_id: pt.TableId, columns: set[str],
+                            get_row: Callable[[int], pt.Row],
+                            row_count: int, rule_filter: RuleFilter,
+                            data_kind: DataKind, errors: list,
+                            warnings: list) -> dict:
+    """Checks the mandatory columns of `table_id` once for the whole table,
+    given the `columns` of all its rows, and adds the errors to `errors` and
+    `warnings`. Returns the validation schema of the table, without the
+    per-row `required` rule."""
+    missing = _get_missing_columns(validation_schema, table_id, columns)
+    e, w = map_missing_columns(vctx, table_id, missing, get_row, row_count,
+                               validation_schema, rule_filter, data_kind)
+    errors += e
+    warnings += w
+    return _strip_required(validation_schema, table_id)
+
+
+def add_to_groups(vctx: ValidationCtx, groups: Optional[ErrorGroups],
+                  agg_errors: list[AggregatedError]
+                  ) -> list[AggregatedError]:
+    """Adds the single-row `agg_errors` to `groups`, and returns the rest."""
+    if groups is None:
+        return agg_errors
+    return [e for e in agg_errors
+            if len(e.row_numbers) > 1 or not groups.add(vctx, e)]
+
+
+def map_groups(vctx: ValidationCtx, groups: Optional[ErrorGroups],
+               rule_filter: RuleFilter, errors: list, warnings: list
+               ) -> None:
+    if groups is None:
+        return
+    e, w = map_error_groups(vctx, groups, rule_filter)
+    errors += e
+    warnings += w
+
+
+def _validate_rows(vctx: ValidationCtx, data: TableDataset,
+                   data_kind: DataKind, coercion_schema: dict,
+                   validation_schema: dict, rule_filter: RuleFilter,
+                   fk_index: Optional[ForeignKeyIndex], compact_keys: bool,
+                   coercion: Coercion, inplace: bool, group_values: bool,
+                   sampler: Optional[ErrorSampler], errors: list,
+                   warnings: list,
+                   on_progress: Optional[OnProgress]
+                   ) -> dict[pt.TableId, TableInfo]:
+    """Validates tables given as lists of rows."""
+    coerced_data: dict[pt.TableId, pt.Dataset] = {}
+    coercer = ContextualCoercer(warnings=warnings, errors=errors,
+                                inplace=inplace)
+    for table_id, table_data in data.items():
+        table_schema = _get_table_coercion_schema(coercion_schema, table_id,
+                                                  table_data, coercion)
+        if (coercion != Coercion.all and
+                not table_schema[table_id]['schema']['schema']):
+            coerced_data[table_id] = table_data
+            continue
+        batches = sample_batches(
+            batch_rows('coercing', table_id, table_data, on_progress),
+            sampler, errors, warnings)
+        groups = ErrorGroups() if group_values else None
+        coerced_rows = coerce_table(coercer, table_schema, table_id,
+                                    batches, data_kind, groups)
+        map_groups(vctx, groups, rule_filter, errors, warnings)
+        if inplace:
+            # replaced compact rows are put back into the table
+            table_data[:] = coerced_rows
+            coerced_rows = table_data
+        coerced_data[table_id] = coerced_rows
+
+    # foreign keys referencing tables that aren't indexed yet are kept as
+    # pending in `fk_index`, see `validate_pending_foreign_keys`
+    if fk_index:
+        for table_id, table_data in coerced_data.items():
+            fk_index.add_table(table_id, table_data)
+
+    table_info: dict[pt.TableId, TableInfo] = {}
+    for table_id, table_data in coerced_data.items():
+        table_info[table_id] = _get_rows_info(table_data)
+        table_schema = validation_schema
+        columns = _get_uniform_columns(table_data)
+        if columns is not None:
+            table_schema = check_mandatory_columns(
+                vctx, validation_schema, table_id, columns,
+                table_data.__getitem__, len(table_data), rule_filter,
+                data_kind, errors, warnings)
+        row_source = table_data.__getitem__ if compact_keys else None
+        v: OdmValidator = OdmValidator.new(row_source)  # type: ignore
+        batches = sample_batches(
+            batch_rows('validating', table_id, table_data, on_progress),
+            sampler, errors, warnings)
+        groups = ErrorGroups() if group_values else None
+        validate_table(vctx, v, table_schema, table_id, batches,
+                       rule_filter, data_kind, errors, warnings, groups)
+        if fk_index:
+            fk_errors = fk_index.check_table(table_id, table_data, data_kind)
+            fk_errors = add_to_groups(vctx, groups, fk_errors)
+            errors += map_aggregated_errors(vctx, table_id, fk_errors,
+                                            rule_filter)
+        map_groups(vctx, groups, rule_filter, errors, warnings)
+    return table_info
+
+
 def validate_data(schema: Schema,
                   data: TableDataset,
                   data_kind: DataKind = DataKind.python,
                   data_version: str = odm.VERSION_STR,
                   rule_blacklist: list[RuleId] = [],
+                  max_examples: Optional[int] = None,
+                  summarizer: Optional[OnlineSummarizer] = None,
                   ) -> reports.ValidationReport:
     """
     :param rule_blacklist: A list of rule ids to explicitly disable.
+    :param max_examples: The number of errors and warnings to keep for each
+        table, column and rule. All of them are still counted, in the
+        `error_counts` and `warning_counts` of the report. Defaults to
+        keeping all of them.
+    :param summarizer: An `OnlineSummarizer` to summarize the errors and
+        warnings with as they are found, which includes the ones that
+        aren't kept.
     """
     return _validate_data_ext(schema, data, data_kind, data_version,
-                              rule_blacklist)
+                              rule_blacklist, max_examples=max_examples,
+                              summarizer=summarizer)
@@ -0,0 +1,599 @@
+"""Vectorized validation of columnar tables.
+
+Tables may be given as pandas DataFrames, Arrow tables, or as dicts of NumPy
+arrays with one array per column. The result is the same as validating the
+rows returned by `to_rows` with `DataKind.python`.
+
+The rules are first checked with vectorized column operations, to find the
+rows that may fail. Only those rows are then converted to dicts and passed
+through the regular coercion and validation, which generates the report
+entries. The screening may include rows that turn out to be valid, but never
+excludes a row that would produce an error or warning.
+
+NumPy is an optional dependency, which must be installed to use this module.
+"""
+
+from datetime import datetime
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Iterable,
+    Iterator,
+    Optional,
+    Protocol,
+    Union,
+    cast,
+)
+
+import numpy as np
+from numpy.dtypes import StringDType
+
+import odm_validation.part_tables as pt
+from odm_validation.cerberusext import (
+    COERCE_TYPES,
+    ContextualCoercer,
+    OdmValidator,
+    convert_value,
+    needs_coercion,
+)
+from odm_validation.foreign_keys import ForeignKeyIndex
+from odm_validation.input_data import DataKind
+from odm_validation.part_tables import Row, SomeValue
+from odm_validation.reports import TableInfo, ValidationCtx
+from odm_validation.rule_errors import (
+    ErrorGroups,
+    ErrorSampler,
+    map_aggregated_errors,
+)
+from odm_validation.rule_filters import RuleFilter
+from odm_validation.schemas import COERCE_KEY
+from odm_validation.validation import (
+    OnProgress,
+    add_to_groups,
+    batch_rows,
+    check_mandatory_columns,
+    coerce_table,
+    map_groups,
+    sample_batches,
+    validate_table,
+)
+
+
+# NumPy arrays, which are typed without `Any` (as `ndarray` is by default),
+# and aren't subscriptable at runtime
+if TYPE_CHECKING:
+    Array = np.ndarray[tuple[int, ...], np.dtype[np.generic[object]]]
+    Mask = np.ndarray[tuple[int, ...], np.dtype[np.bool_]]
+else:
+    Array = np.ndarray
+    Mask = np.ndarray
+
+
+class SeriesLike(Protocol):
+    def to_numpy(self) -> Array: ...
+
+
+class DataFrameLike(Protocol):
+    """A pandas DataFrame, without depending on pandas."""
+    @property
+    def columns(self) -> Iterable[str]: ...
+
+    def __getitem__(self, key: str) -> SeriesLike: ...
+
+
+class ChunkedArrayLike(Protocol):
+    @property
+    def type(self) -> object: ...
+
+    @property
+    def null_count(self) -> int: ...
+
+    def fill_null(self, fill_value: int) -> 'ChunkedArrayLike': ...
+
+    def is_null(self) -> 'ChunkedArrayLike': ...
+
+    def to_numpy(self) -> Array: ...
+
+
+class ArrowTableLike(Protocol):
+    """A pyarrow Table or RecordBatch, without depending on pyarrow."""
+    @property
+    def column_names(self) -> list[str]: ...
+
+    def column(self, name: str) -> ChunkedArrayLike: ...
+
+
+ColumnarTable = Union[DataFrameLike, ArrowTableLike, dict[str, Array]]
+Columns = dict[str, Array]
+
+# the rules that `empty` skips for empty values, as in Cerberus
+_EMPTY_SKIPPED_RULES = {'allowed', 'forbidden', 'minlength', 'maxlength'}
+
+# the rules that are checked per row instead of per value
+_ROW_RULES = {'meta', 'required', 'type', 'unique'}
+
+
+def _is_arrow_integer(column: ChunkedArrayLike) -> bool:
+    return str(column.type).startswith(('int', 'uint'))
+
+
+def _arrow_to_numpy(column: ChunkedArrayLike) -> Array:
+    """Converts an Arrow `column` to a NumPy array. The data isn't copied for
+    primitive columns without nulls that consist of a single chunk."""
+    if _is_arrow_integer(column) and column.null_count > 0:
+        # NumPy can't represent missing integers, which Arrow converts to
+        # NaN floats, so the integers are kept as Python ints instead
+        result = column.fill_null(0).to_numpy().astype(object)
+        result[column.is_null().to_numpy().astype(bool)] = None
+        return result
+    return column.to_numpy()
+
+
+def from_arrow(table: ArrowTableLike) -> Columns:
+    """Returns the columns of the Arrow `table` as NumPy arrays, with the
+    Arrow types preserved as far as possible. Dictionary encoded columns are
+    decoded."""
+    return {column_id: _arrow_to_numpy(table.column(column_id))
+            for column_id in table.column_names}
+
+
+def get_columns(table: ColumnarTable) -> Columns:
+    """Returns the columns of `table` as NumPy arrays."""
+    if isinstance(table, dict):
+        result = {column_id: np.asarray(values)
+                  for column_id, values in table.items()}
+    elif hasattr(table, 'column_names'):
+        result = from_arrow(cast(ArrowTableLike, table))
+    else:
+        table = cast(DataFrameLike, table)
+        result = {column_id: table[column_id].to_numpy()
+                  for column_id in table.columns}
+    assert len(set(map(len, result.values()))) <= 1, \
+        'all the columns of a table must have the same length'
+    return result
+
+
+def _get_row_count(columns: Columns) -> int:
+    return len(next(iter(columns.values()))) if columns else 0
+
+
+def get_columnar_info(table: ColumnarTable) -> TableInfo:
+    """Returns the number of columns and rows of `table`."""
+    columns = get_columns(table)
+    return TableInfo(columns=len(columns), rows=_get_row_count(columns))
+
+
+def _map_mask(func: Callable[[object], bool], values: Array) -> Mask:
+    """Returns the result of `func` for each of `values`."""
+    return np.asarray(np.frompyfunc(func, 1, 1)(values)).astype(bool)
+
+
+def _is_missing(value: object) -> bool:
+    # NaN and NaT are the only values not equal to themselves
+    if value is None:
+        return True
+    try:
+        return bool(value != value)
+    except TypeError:
+        # pandas.NA can't be converted to bool
+        return True
+    except ValueError:
+        return False
+
+
+def to_value(cell: object) -> SomeValue:
+    """Converts a `cell` of a column to the Python value it is validated as.
+    Missing values (None, NaN, NaT, etc.) are converted to empty strings, the
+    same as empty cells in a CSV file."""
+    if _is_missing(cell):
+        return ''
+    if isinstance(cell, np.datetime64):
+        return cell.astype('datetime64[us]').item()
+    if isinstance(cell, np.generic):
+        return cell.item()
+    return cell  # type: ignore
+
+
+def _get_row(columns: Columns, row_ix: int) -> Row:
+    return {column_id: to_value(values[row_ix])
+            for column_id, values in columns.items()}
+
+
+def to_rows(table: ColumnarTable) -> pt.Dataset:
+    """Converts `table` to a list of rows."""
+    columns = get_columns(table)
+    return [_get_row(columns, i) for i in range(_get_row_count(columns))]
+
+
+def _coerce_row(row: Row, coerce_types: dict[str, type]) -> Row:
+    """Returns `row` with the same coercions as `ContextualCoercer`."""
+    result = dict(row)
+    for column_id, type_class in coerce_types.items():
+        value = row.get(column_id)
+        if not needs_coercion(value, type_class):
+            continue
+        assert value is not None
+        try:
+            result[column_id] = convert_value(value, type_class)
+        except (ArithmeticError, ValueError):
+            pass
+    return result
+
+
+class _Cells:
+    """Masks of the Python types that the cells of a column are validated
+    as, together with the vectorized values of each type."""
+    # Missing values are validated as empty strings, which is why they're
+    # part of `is_str` regardless of the column type.
+
+    def __init__(self, values: Array) -> None:
+        n = len(values)
+        kind = values.dtype.kind
+        self.values = values
+        none: Mask = np.zeros(n, dtype=bool)
+        self.is_int = none
+        self.is_float = none
+        self.is_bool = none
+        self.is_datetime = none
+        self.is_other = none
+        if kind in 'UT':
+            self.is_str: Mask = np.ones(n, dtype=bool)
+            self.strs = values.astype(StringDType())
+        elif kind == 'O':
+            missing = _map_mask(_is_missing, values)
+            is_str = _map_mask(lambda x: isinstance(x, str), values) & ~missing
+            self.is_str = is_str | missing
+            self.is_other = ~self.is_str
+            self.strs = np.where(is_str, values, '').astype(StringDType())
+        else:
+            if kind == 'f':
+                missing = np.isnan(values)
+                self.is_float = ~missing
+            elif kind == 'M':
+                missing = np.isnat(values)
+                self.is_datetime = ~missing
+            else:
+                missing = none
+                if kind in 'iu':
+                    self.is_int = ~missing
+                elif kind == 'b':
+                    self.is_bool = ~missing
+                else:
+                    self.is_other = ~missing
+            self.is_str = missing
+            self.strs = np.full(n, '', dtype=StringDType())
+        self.str_len = np.strings.str_len(self.strs)
+        self.is_empty_str = self.is_str & (self.str_len == 0)
+
+    @property
+    def is_number(self) -> Mask:
+        return self.is_int | self.is_float | self.is_bool
+
+    @property
+    def is_zero(self) -> Mask:
+        """Cells with a number equal to zero, or False."""
+        if self.values.dtype.kind in 'iufb':
+            return self.is_number & (self.values == 0)
+        return np.zeros(len(self.values), dtype=bool)
+
+    def compare(self, op: str, constraint: Union[int, float]) -> Mask:
+        """Returns the cells where `value <op> constraint` is true. Only
+        number cells are compared."""
+        if self.values.dtype.kind not in 'iufb':
+            return np.zeros(len(self.values), dtype=bool)
+        with np.errstate(invalid='ignore'):
+            result = (np.less(self.values, constraint) if op == '<' else
+                      np.greater(self.values, constraint))
+        return self.is_number & result
+
+
+def _coercion_mask(cells: _Cells, type_class: type) -> Mask:
+    """Returns the cells that need coercion to `type_class`."""
+    # mirrors `needs_coercion`
+    result = cells.is_other | (cells.is_str & ~cells.is_empty_str)
+    nonzero = cells.is_number & ~cells.is_zero
+    if type_class is datetime:
+        result |= nonzero
+    else:
+        result |= cells.is_datetime
+        if type_class is int:
+            result |= cells.is_float & ~cells.is_zero
+    return result
+
+
+def _type_mask(cells: _Cells, type_name: str) -> Optional[Mask]:
+    """Returns the cells matching the Cerberus type `type_name`, or None if
+    the type is unsupported."""
+    if type_name == 'string':
+        return cells.is_str
+    if type_name == 'integer':
+        return cells.is_int | cells.is_bool
+    if type_name == 'float':
+        return cells.is_number
+    if type_name == 'number':
+        return cells.is_int | cells.is_float
+    if type_name == 'boolean':
+        return cells.is_bool
+    if type_name == 'datetime':
+        return cells.is_datetime
+    return None
+
+
+def _str_items(constraint: Iterable[object]) -> list[str]:
+    return [x for x in constraint if isinstance(x, str)]
+
+
+def _is_number(x: object) -> bool:
+    return isinstance(x, (int, float)) and not isinstance(x, bool)
+
+
+def _rule_passes(cells: _Cells, key: str, constraint: object) -> Mask:
+    """Returns the cells that pass the Cerberus rule `key`. Cells that can't
+    be proven to pass are excluded."""
+    n = len(cells.values)
+    none = np.zeros(n, dtype=bool)
+    not_str = cells.is_number | cells.is_datetime
+    if key == 'allowed':
+        assert isinstance(constraint, list)
+        return cells.is_str & np.isin(cells.strs, _str_items(constraint))
+    if key == 'forbidden':
+        assert isinstance(constraint, list)
+        items = _str_items(constraint)
+        result = cells.is_str & ~np.isin(cells.strs, items)
+        if len(items) == len(constraint):
+            # non-strings can't be equal to any of the forbidden strings
+            result |= not_str
+        return result
+    if key == 'maxlength':
+        assert isinstance(constraint, int)
+        return (cells.is_str & (cells.str_len <= constraint)) | not_str
+    if key == 'minlength':
+        assert isinstance(constraint, int)
+        return (cells.is_str & (cells.str_len >= constraint)) | not_str
+    if key in ('min', 'max'):
+        if not _is_number(constraint):
+            return none
+        assert isinstance(constraint, (int, float))
+        # non-numbers can't be compared with numbers, which Cerberus ignores
+        op = '<' if key == 'min' else '>'
+        return ~cells.is_other & ~cells.compare(op, constraint)
+    if key == 'emptyTrimmed':
+        stripped_len = np.strings.str_len(np.strings.strip(cells.strs))
+        is_empty = ((cells.is_str & (stripped_len == 0)) | cells.is_zero)
+        passes = is_empty if constraint else ~is_empty
+        return passes & ~cells.is_other
+    if key == 'anyof':
+        assert isinstance(constraint, list)
+        result = none
+        for rules in constraint:
+            result = result | _rules_pass(cells, rules)
+        return result
+    return none
+
+
+def _rules_pass(cells: _Cells, rules: dict) -> Mask:
+    """Returns the cells that pass all `rules`."""
+    result = ~cells.is_other
+    empty_skipped = np.zeros(len(cells.values), dtype=bool)
+    if 'empty' in rules:
+        if not rules['empty']:
+            result &= ~cells.is_empty_str
+        empty_skipped = cells.is_empty_str
+    for key, constraint in rules.items():
+        if key == 'empty':
+            continue
+        passes = _rule_passes(cells, key, constraint)
+        if key in _EMPTY_SKIPPED_RULES:
+            passes |= empty_skipped
+        result &= passes
+    return result
+
+
+def _screen_column(cells: _Cells, rules: dict,
+                   coerce_type: Optional[type]) -> Mask:
+    """Returns the cells that may fail `rules`, or need coercion."""
+    result = cells.is_other.copy()
+    if coerce_type:
+        result |= _coercion_mask(cells, coerce_type)
+    unchecked = ~result
+    type_name = rules.get('type')
+    if type_name is not None:
+        type_names = [type_name] if isinstance(type_name, str) else type_name
+        matches = np.zeros(len(cells.values), dtype=bool)
+        for name in type_names:
+            mask = _type_mask(cells, name)
+            if mask is None:
+                return np.ones(len(cells.values), dtype=bool)
+            matches |= mask
+        # Values of the wrong type are reported, except for empty values,
+        # and the remaining rules are skipped.
+        result |= unchecked & ~matches & ~cells.is_empty_str
+        unchecked &= matches
+    value_rules = {k: v for k, v in rules.items() if k not in _ROW_RULES}
+    result |= unchecked & ~_rules_pass(cells, value_rules)
+    return result
+
+
+def _id_key(value: SomeValue) -> str:
+    # same as `get_primary_key` and `get_key_value`
+    return str(value).strip()
+
+
+def _date_key(value: SomeValue) -> str:
+    # same as `get_primary_key`
+    return str(value or '').strip()
+
+
+def _get_keys(cells: _Cells, coerce_type: Optional[type],
+              get_key: Callable[[SomeValue], str]) -> Array:
+    """Returns the coerced values of a column, normalized with `get_key`."""
+    if cells.is_str.all() and not coerce_type:
+        return np.strings.strip(cells.strs)
+    keys = []
+    for cell in cells.values:
+        value = to_value(cell)
+        if coerce_type and needs_coercion(value, coerce_type):
+            try:
+                value = convert_value(value, coerce_type)
+            except (ArithmeticError, ValueError):
+                pass
+        keys.append(get_key(value))
+    return np.array(keys, dtype=StringDType())
+
+
+def _duplicate_mask(ids: Array, dates: Array) -> Mask:
+    """Returns the rows where the pair of `ids` and `dates` isn't unique."""
+    # Joining the pairs can make different pairs equal, which only makes the
+    # screening include more rows.
+    pairs = np.add(np.add(ids, '\x1f'), dates)
+    _, inverse, counts = np.unique(pairs, return_inverse=True,
+                                   return_counts=True)
+    return counts[inverse] > 1
+
+
+class _ColumnarTable:
+    """The state of a columnar table during validation."""
+    def __init__(self, table_id: pt.TableId, table: ColumnarTable,
+                 coercion_schema: dict, validation_schema: dict) -> None:
+        self.table_id = table_id
+        self.columns = get_columns(table)
+        self.row_count = _get_row_count(self.columns)
+        self.rules: dict[str, dict] = \
+            validation_schema[table_id]['schema']['schema']
+        self.coerce_types: dict[str, type] = {}
+        coerce_rules = coercion_schema[table_id]['schema']['schema']
+        for column_id, rules in coerce_rules.items():
+            coerce = rules.get(COERCE_KEY)
+            if coerce:
+                self.coerce_types[column_id] = COERCE_TYPES[coerce]
+        self._cells: dict[str, _Cells] = {}
+
+        # (coerced rows, offset) for each run of screened rows
+        self.runs: list[tuple[pt.Dataset, int]] = []
+
+    def get_cells(self, column_id: str) -> _Cells:
+        cells = self._cells.get(column_id)
+        if cells is None:
+            cells = _Cells(self.columns[column_id])
+            self._cells[column_id] = cells
+        return cells
+
+    def get_keys(self, column_id: str,
+                 get_key: Callable[[SomeValue], str] = _id_key
+                 ) -> Array:
+        return _get_keys(self.get_cells(column_id),
+                         self.coerce_types.get(column_id), get_key)
+
+    def get_coerced_row(self, row_ix: int) -> Row:
+        return _coerce_row(_get_row(self.columns, row_ix), self.coerce_types)
+
+    def screen(self) -> Mask:
+        """Returns the rows that may fail validation."""
+        n = self.row_count
+        result = np.zeros(n, dtype=bool)
+        for column_id in self.rules.keys() | self.coerce_types.keys():
+            rules = self.rules.get(column_id, {})
+            # missing mandatory columns are checked once for the table
+            if column_id not in self.columns:
+                continue
+            cells = self.get_cells(column_id)
+            result |= _screen_column(cells, rules,
+                                     self.coerce_types.get(column_id))
+            if rules.get('unique'):
+                result |= self._screen_duplicates(column_id)
+        self._cells.clear()
+        return result
+
+    def _screen_duplicates(self, column_id: str) -> Mask:
+        ids = self.get_keys(column_id)
+        if pt.LAST_UPDATED in self.columns:
+            dates = self.get_keys(pt.LAST_UPDATED, _date_key)
+        else:
+            dates = np.full(self.row_count, '', dtype=StringDType())
+        return _duplicate_mask(ids, dates)
+
+
+def _find_runs(mask: Mask) -> Iterator[tuple[int, int]]:
+    """Yields the (start, end) indexes of each run of true values."""
+    indexes = np.flatnonzero(mask)
+    if len(indexes) == 0:
+        return
+    breaks = np.flatnonzero(np.diff(indexes) != 1)
+    starts = np.concatenate(([indexes[0]], indexes[breaks + 1]))
+    ends = np.concatenate((indexes[breaks], [indexes[-1]])) + 1
+    yield from zip(starts.tolist(), ends.tolist())
+
+
+def validate_columnar(vctx: ValidationCtx,
+                      data: dict[pt.TableId, ColumnarTable],
+                      coercion_schema: dict, validation_schema: dict,
+                      rule_filter: RuleFilter,
+                      fk_index: Optional[ForeignKeyIndex],
+                      compact_keys: bool, group_values: bool,
+                      sampler: Optional[ErrorSampler],
+                      errors: list, warnings: list,
+                      on_progress: Optional[OnProgress] = None
+                      ) -> dict[pt.TableId, TableInfo]:
+    """Validates tables given as columns. Errors and warnings are added to
+    `errors` and `warnings`, in the same order as for tables given as rows.
+    """
+    data_kind = DataKind.python
+    tables = [_ColumnarTable(table_id, table, coercion_schema,
+                             validation_schema)
+              for table_id, table in data.items()]
+
+    coercer = ContextualCoercer(warnings=warnings, errors=errors)
+    for t in tables:
+        groups = ErrorGroups() if group_values else None
+        for start, end in _find_runs(t.screen()):
+            rows = [_get_row(t.columns, i) for i in range(start, end)]
+            batches = sample_batches(
+                batch_rows('coercing', t.table_id, rows, on_progress, start,
+                           t.row_count),
+                sampler, errors, warnings)
+            coerced_rows = coerce_table(coercer, coercion_schema,
+                                        t.table_id, batches, data_kind,
+                                        groups)
+            t.runs.append((coerced_rows, start))
+        map_groups(vctx, groups, rule_filter, errors, warnings)
+
+    if fk_index:
+        for t in tables:
+            for column_id in fk_index.referenced_columns(t.table_id):
+                keys: Iterable[str] = (t.get_keys(column_id)
+                                       if column_id in t.columns else [])
+                fk_index.add_keys(t.table_id, column_id, keys)
+
+    table_info: dict[pt.TableId, TableInfo] = {}
+    for t in tables:
+        table_info[t.table_id] = TableInfo(
+            columns=len(t.columns),
+            rows=t.row_count,
+        )
+        table_schema = check_mandatory_columns(
+            vctx, validation_schema, t.table_id, set(t.columns),
+            t.get_coerced_row, t.row_count, rule_filter, data_kind, errors,
+            warnings)
+        row_source = t.get_coerced_row if compact_keys else None
+        v: OdmValidator = OdmValidator.new(row_source)  # type: ignore
+        batches = sample_batches(
+            (batch
+             for rows, start in t.runs
+             for batch in batch_rows('validating', t.table_id, rows,
+                                     on_progress, start, t.row_count)),
+            sampler, errors, warnings)
+        groups = ErrorGroups() if group_values else None
+        validate_table(vctx, v, table_schema, t.table_id, batches,
+                       rule_filter, data_kind, errors, warnings, groups)
+        t.runs.clear()
+        if fk_index:
+            column_keys = {fk.column_id: t.get_keys(fk.column_id)
+                           for fk in fk_index.table_foreign_keys(t.table_id)
+                           if fk.column_id in t.columns}
+            fk_errors = fk_index.check_keys(t.table_id, column_keys,
+                                            t.get_coerced_row, data_kind)
+            fk_errors = add_to_groups(vctx, groups, fk_errors)
+            errors += map_aggregated_errors(vctx, t.table_id, fk_errors,
+                                            rule_filter)
+        map_groups(vctx, groups, rule_filter, errors, warnings)
+    return table_info
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from os.path import join
+
+from parameterized import parameterized
+
+from odm_validation.schemas import import_schema
+from odm_validation.utils import import_arrow_file, import_json_file
+from odm_validation.validation import _validate_data_ext
+
+import common
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+    from odm_validation.vectorized import to_rows
+    has_arrow = True
+except ImportError:
+    has_arrow = False
+
+
+schema = import_schema(join(common.ASSET_DIR, 'validation-schemas',
+                            'schema-v2.2.3.yml'))
+
+
+def gen_samples():
+    return pa.table({
+        'sampleID': ['sample-1', 'sample-2', 'sample-3'],
+        'siteID': pa.array(['site-1', 'site-1', 'site-1']).dictionary_encode(),
+        'collDT': [datetime(2023, 1, 1, 10), None, datetime(2023, 1, 3, 10)],
+        'collNum': pa.array([1, None, 3], type=pa.int32()),
+        'collPer': [24.0, 24.0, -1.0],
+        'collType': ['comp', 'comp', 'unknown'],
+        'saMaterial': ['rawWW', 'rawWW', 'rawWW'],
+        'notInSchema': [1, 2, 3],
+    })
+
+
+def write_table(table, path):
+    if path.endswith('.parquet'):
+        pq.write_table(table, path)
+    else:
+        feather.write_feather(table, path)
+
+
+@unittest.skipUnless(has_arrow, 'requires pyarrow')
+class TestArrow(common.OdmTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    @parameterized.expand(['samples.parquet', 'samples.feather'])
+    def test_import(self, filename):
+        path = join(self.tmpdir.name, filename)
+        write_table(gen_samples(), path)
+        columns = schema['schema']['samples']['schema']['schema'].keys()
+        samples = import_arrow_file(path, columns)
+        self.assertNotIn('notInSchema', samples)
+        self.assertEqual([1, '', 3], [r['collNum'] for r in to_rows(samples)])
+        self.assertEqual(['site-1'] * 3,
+                         [r['siteID'] for r in to_rows(samples)])
+
+        data = {'samples': samples}
+        report = _validate_data_ext(schema, data)
+        expected = _validate_data_ext(schema, {'samples': to_rows(samples)})
+        self.assertEqual(expected.errors, report.errors)
+        self.assertEqual(expected.warnings, report.warnings)
+        self.assertEqual([3, 3], [e['rowNumber'] for e in report.errors])
+        self.assertEqual(0, len(report.warnings))
+
+    def test_typed_columns_are_not_coerced(self):
+        table = gen_samples().slice(0, 1)
+        progress = []
+
+        def on_progress(action, table_id, offset, total):
+            progress.append(action)
+
+        report = _validate_data_ext(schema, {'samples': table},
+                                    on_progress=on_progress)
+        self.assertEqual([], report.errors + report.warnings)
+        self.assertEqual([], progress)
+
+    def test_validate_tool(self):
+        path = join(self.tmpdir.name, 'samples.parquet')
+        write_table(gen_samples(), path)
+        out_path = join(self.tmpdir.name, 'report.json')
+        rc = os.system(f'odm-validate {path} --out={out_path} 2> /dev/null')
+        self.assertEqual(0, rc)
+        report = import_json_file(out_path)
+        self.assertEqual([3, 3], [e['rowNumber'] for e in report['errors']])
+
+
+if __name__ == '__main__':
+    unittest.main()
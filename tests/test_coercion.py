@@ -1,8 +1,10 @@
 import unittest
 # from pprint import pprint
 
-from odm_validation.cerberusext import ContextualCoercer
-from odm_validation.validation import _validate_data_ext
+from odm_validation.cerberusext import CoercionCache, ContextualCoercer
+from odm_validation.compact_rows import compact_rows
+from odm_validation.input_data import Coercion
+from odm_validation.validation import _TYPE_SAMPLE_SIZE, _validate_data_ext
 
 import common
 
@@ -125,10 +127,84 @@ class TestCoercion(common.OdmTestCase):
         self.assertEqual(coerced_data, result)
         self.assertEqual(expected_coercion_warnings, warnings)
 
+    def test_coerce_compact_rows(self):
+        compact_data = {'mytable': compact_rows(data['mytable'])}
+        warnings = []
+        v = ContextualCoercer(warnings=warnings)
+        result = v.coerce(compact_data, cerb_schema, 0)
+        self.assertEqual(coerced_data, result)
+        self.assertEqual(expected_coercion_warnings, warnings)
+        # rows are copied on write
+        self.assertEqual(data, compact_data)
+
+    def test_repeated_values(self):
+        rows = [{'amount': '1.5'}, {'amount': 'x'}] * 3
+        warnings = []
+        errors = []
+        v = ContextualCoercer(warnings=warnings, errors=errors)
+        result = v.coerce({'mytable': rows}, cerb_schema, 0)
+        self.assertEqual([1.5, 'x'] * 3,
+                         [row['amount'] for row in result['mytable']])
+        # every row is still reported
+        self.assertEqual([1, 3, 5], [w['rowNumber'] for w in warnings])
+        self.assertEqual([2, 4, 6], [e['rowNumber'] for e in errors])
+
+    def test_coerce_inplace(self):
+        for rows in [[dict(row) for row in data['mytable']],
+                     compact_rows(data['mytable'])]:
+            inplace_data = {'mytable': rows}
+            warnings = []
+            v = ContextualCoercer(warnings=warnings, inplace=True)
+            v.coerce(inplace_data, cerb_schema, 0)
+            self.assertEqual(coerced_data, inplace_data)
+            # the original values are still reported
+            self.assertEqual(expected_coercion_warnings, warnings)
+
+    def test_validate_inplace(self):
+        inplace_data = {'mytable': [dict(row) for row in data['mytable']]}
+        expected = _validate_data_ext(schema, data)
+        report = _validate_data_ext(schema, inplace_data, inplace=True)
+        self.assertEqual(expected.warnings, report.warnings)
+        self.assertEqual(coerced_data, inplace_data)
+
+    def test_coercion_cache(self):
+        cache = CoercionCache()
+        self.assertEqual(1, cache.convert('t', 'c', '1.0', int))
+        self.assertEqual(1, cache.convert('t', 'c', '1.0', int))
+        self.assertEqual(1.0, cache.convert('t', 'c', '1.0', float))
+        with self.assertRaises(ValueError):
+            cache.convert('t', 'c', '1.5', int)
+        with self.assertRaises(ValueError):
+            cache.convert('t', 'c', '1.5', int)
+
     def test_validation(self):
         report = _validate_data_ext(schema, data)
         self.assertTrue(report.valid())
 
+    def test_typed_input(self):
+        typed_data = {'mytable': [{'amount': 1.5, 'quantity': 1}] * 3}
+        for coercion in Coercion:
+            report = _validate_data_ext(schema, typed_data,
+                                        coercion=coercion)
+            self.assertTrue(report.valid())
+
+        report = _validate_data_ext(schema, data, coercion=Coercion.none)
+        self.assertEqual([], report.warnings)
+        self.assertEqual(['invalid_type'] * 2,
+                         [e['errorType'] for e in report.errors])
+
+    def test_untyped_columns_are_coerced(self):
+        rows = ([{'amount': 1.5, 'quantity': '2'}] * _TYPE_SAMPLE_SIZE +
+                [{'amount': '2.5'}])
+        report = _validate_data_ext(schema, {'mytable': rows},
+                                    coercion=Coercion.untyped)
+        # only `quantity` is coerced, since `amount` is typed in the sample
+        self.assertEqual({'quantity'},
+                         {w['columnName'] for w in report.warnings})
+        self.assertEqual([('amount', 'invalid_type')],
+                         [(e['columnName'], e['errorType'])
+                          for e in report.errors])
+
 
 if __name__ == '__main__':
     unittest.main()
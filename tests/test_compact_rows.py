@@ -0,0 +1,56 @@
+import copy
+import unittest
+from os.path import join
+
+from odm_validation.compact_rows import CompactRow, compact_rows, make_header
+from odm_validation.schemas import import_schema
+from odm_validation.validation import _validate_data_ext
+
+import common
+
+
+schema = import_schema(join(common.ASSET_DIR, 'validation-schemas',
+                            'schema-v2.2.3.yml'))
+
+
+class TestCompactRows(common.OdmTestCase):
+    def test_mapping(self):
+        row = CompactRow(make_header(['a', 'b']), ('x', None))
+        self.assertEqual({'a': 'x', 'b': None}, row)
+        self.assertEqual(['a', 'b'], list(row))
+        self.assertEqual('x', row['a'])
+        self.assertEqual('-', row.get('c', '-'))
+        self.assertNotIn('c', row)
+        self.assertIs(row, copy.deepcopy(row))
+        with self.assertRaises(TypeError):
+            row['a'] = 'y'
+
+    def test_replace(self):
+        row = CompactRow(make_header(['a', 'b']), ('x', 'y'))
+        self.assertEqual({'a': 'x', 'b': 'z'}, row.replace('b', 'z'))
+        self.assertEqual({'a': 'x', 'b': 'y'}, row)
+
+    def test_shared_header(self):
+        rows = compact_rows([{'a': 1}, {'a': 2}, {'b': 3}])
+        self.assertIs(rows[0]._header, rows[1]._header)
+        self.assertIsNot(rows[0]._header, rows[2]._header)
+
+    def test_same_report_as_dicts(self):
+        samples = [
+            {'sampleID': 's1', 'siteID': 'site-1', 'collPer': '24',
+             'collNum': '1.5', 'collType': 'comp', 'saMaterial': 'rawWW',
+             'collDT': '2023-01-01'},
+            {'sampleID': 's1', 'siteID': '', 'collPer': '-1',
+             'collNum': '', 'collType': 'unknown', 'saMaterial': 'rawWW',
+             'collDT': 'x'},
+        ]
+        expected = _validate_data_ext(schema, {'samples': samples})
+        report = _validate_data_ext(schema,
+                                    {'samples': compact_rows(samples)})
+        self.assertGreater(len(expected.errors), 0)
+        self.assertEqual(expected.errors, report.errors)
+        self.assertEqual(expected.warnings, report.warnings)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import tempfile
+import unittest
+from io import BytesIO
+from os.path import join
+
+from parameterized import parameterized
+
+from odm_validation import compression
+from odm_validation.compression import Compression, open_file
+
+import common
+
+
+class FailingFile(BytesIO):
+    def write(self, b):
+        raise OSError('disk full')
+
+
+class TestCompression(common.OdmTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_split_compression(self):
+        self.assertEqual(('a.csv', Compression.GZIP),
+                         compression.split_compression('a.csv.gz'))
+        self.assertEqual(('a.json', Compression.XZ),
+                         compression.split_compression('a.json.XZ'))
+        self.assertEqual(('a.csv', None),
+                         compression.split_compression('a.csv'))
+
+    @parameterized.expand(['report.json', 'report.json.gz', 'report.json.xz'])
+    def test_round_trip(self, filename):
+        path = join(self.tmpdir.name, filename)
+        # bigger than a chunk, to be written in multiple chunks
+        lines = [f'line {i}\n' for i in range(200000)]
+        with open_file(path, 'w') as f:
+            for line in lines:
+                f.write(line)
+        with open_file(path, 'r') as f:
+            self.assertEqual(lines, list(f))
+        with open(path, 'rb') as f:
+            is_compressed = f.read(4) != b'line'
+        self.assertEqual(filename != 'report.json', is_compressed)
+
+    def test_thread_errors_are_raised(self):
+        writer = compression._ThreadedWriter(FailingFile())
+        writer.write(b'x')
+        with self.assertRaises(OSError):
+            writer.close()
+        self.assertTrue(writer.closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+import dateutil.parser as dateutil_parser
+from parameterized import parameterized
+
+from odm_validation.datetimes import (
+    MIN_LENGTH,
+    ColumnDatetimeParser,
+    parse_datetime,
+)
+
+import common
+
+
+def gen_cases():
+    times = ['', 'T10:00', ' 23:59:59', 'T10:00:00.5', ' 10:00:00.123',
+             'T10:00:00.123456', 'T24:00', ' 10:60', 'Z', 'T10:00Z',
+             ' 10:00 PM', 'T10:00+02:00']
+    result = []
+    for year in ['2023', '0001', '9999', '0000']:
+        for month in [0, 1, 2, 12, 13]:
+            for day in [0, 1, 13, 29, 30, 31, 32]:
+                date = f'{year}-{month:02}-{day:02}'
+                result += [date + t for t in times]
+                result += [f'{year}{month:02}{day:02}',
+                           f'{year}/{month:02}/{day:02}',
+                           f'{year}/{month:02}/{day:02} 10:00',
+                           f'{month}/{day}/{year}',
+                           f'{month:02}/{day:02}/{year} 10:00:00']
+    result += ['', '2023', '2023-01', ' 2023-01-01', '2023-01-01 ',
+               'Jan 1, 2023', '1 January 2023', 'not a date', '٢٠٢٣-٠١-٠١']
+    return result
+
+
+def parse(f, s):
+    try:
+        return ('ok', f(s))
+    except (ValueError, OverflowError):
+        return ('error', None)
+
+
+def parse_with_dateutil(s):
+    if len(s) < MIN_LENGTH:
+        return ('error', None)
+    return parse(dateutil_parser.parse, s)
+
+
+class TestDatetimes(common.OdmTestCase):
+    @parameterized.expand([('parse_datetime',), ('column_parser',)])
+    def test_same_as_dateutil(self, kind):
+        f = (parse_datetime if kind == 'parse_datetime'
+             else ColumnDatetimeParser().parse)
+        for s in gen_cases():
+            with self.subTest(s=s):
+                self.assertEqual(parse_with_dateutil(s), parse(f, s))
+
+    def test_dominant_format(self):
+        parser = ColumnDatetimeParser()
+        for i in range(ColumnDatetimeParser.SAMPLE_SIZE):
+            parser.parse(f'{i % 12 + 1}/1/2023')
+        self.assertEqual('m/d/y', parser.formats[0].name)
+
+
+if __name__ == '__main__':
+    unittest.main()
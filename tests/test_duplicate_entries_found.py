@@ -3,6 +3,7 @@ import unittest
 from parameterized import parameterized
 
 import odm_validation.odm as odm
+from odm_validation.cerberusext import KeyDigestTable
 from odm_validation.rules import RuleId
 from odm_validation.schemas import import_schema
 from odm_validation.utils import (
@@ -73,6 +74,37 @@ class TestDuplicateEntriesFound(common.OdmTestCase):
         expected = self.assets.error_report[i]
         self.assertReportEqual(expected, report)
 
+    @parameterized.expand(param_range(1, 3))
+    def test_failing_datasets_compact_keys(self, i):
+        data = self.assets.data_fail[i]
+        report = _validate_data_ext(schema=self.assets.schemas['2.0.0'],
+                                    data=data, compact_keys=True)
+        expected = self.assets.error_report[i]
+        self.assertReportEqual(expected, report)
+
+
+class TestKeyDigestTable(common.OdmTestCase):
+    def test_digest_collision(self):
+        keys = ['a', 'b', 'a', 'b', 'c']
+        table = KeyDigestTable()
+        firsts = []
+        for i, key in enumerate(keys):
+            def is_same(other_index):
+                return keys[other_index] == key
+            # all keys share the same digest
+            firsts.append(table.add(1, i, is_same))
+        self.assertEqual(firsts, [None, None, 0, 1, None])
+        self.assertEqual(table.size, 3)
+
+    def test_grow(self):
+        table = KeyDigestTable()
+        n = 5000
+        for i in range(n):
+            self.assertIsNone(table.add(i + 1, i, lambda _: True))
+        for i in range(n):
+            self.assertEqual(table.add(i + 1, n + i, lambda _: True), i)
+        self.assertEqual(table.size, n)
+
 
 if __name__ == '__main__':
     unittest.main()
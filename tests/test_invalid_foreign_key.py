@@ -0,0 +1,130 @@
+import unittest
+from copy import deepcopy
+
+from parameterized import parameterized
+
+import odm_validation.odm as odm
+from odm_validation.foreign_keys import ForeignKeyIndex, get_foreign_keys
+from odm_validation.rules import RuleId
+from odm_validation.schemas import import_schema
+from odm_validation.utils import (
+    import_dataset,
+    import_json_file,
+)
+from odm_validation.validation import (
+    _generate_validation_schema_ext,
+    _validate_data_ext,
+    validate_pending_foreign_keys,
+)
+
+import common
+from common import asset
+
+
+common.ASSET_SUBDIR = 'validation-rules/invalid-foreign-key'
+
+
+parts = import_dataset(asset('parts.csv'))
+schema_v1 = import_schema(asset('schema-v1.yml'))
+schema_v2 = import_schema(asset('schema-v2.yml'))
+v2_schemas = common.gen_v2_testschemas(schema_v2)
+error_report = import_json_file(asset('error-report.json'))
+
+sites = import_dataset(asset('sites.csv'))
+valid_samples = import_dataset(asset('valid-samples.csv'))
+invalid_samples = import_dataset(asset('invalid-samples.csv'))
+
+
+def with_sites_table(schema):
+    # The referenced table has no rules of its own, but must be in the schema
+    # to be part of the validated data.
+    result = deepcopy(schema)
+    result['schema']['sites'] = {
+        'type': 'list',
+        'schema': {'type': 'dict', 'schema': {}},
+    }
+    return result
+
+
+class TestInvalidForeignKey(common.OdmTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.maxDiff = None
+        cls.whitelist = [RuleId.invalid_foreign_key]
+
+    def test_schema_generation_v1(self):
+        result = _generate_validation_schema_ext(
+            parts=parts,
+            schema_version='1.0.0',
+            rule_whitelist=self.whitelist)
+        self.assertDictEqual(schema_v1, result)
+
+    @parameterized.expand(odm.CURRENT_VERSION_STRS)
+    def test_schema_generation_v2(self, v):
+        result = _generate_validation_schema_ext(
+            parts=parts,
+            schema_version=v,
+            rule_whitelist=self.whitelist)
+        self.assertDictEqual(v2_schemas[v], result)
+
+    @parameterized.expand(odm.CURRENT_VERSION_STRS)
+    def test_invalid_foreign_key_v2(self, v):
+        schema = with_sites_table(v2_schemas[v])
+
+        data = {'sites': sites, 'samples': valid_samples}
+        report = _validate_data_ext(schema, data, check_foreign_keys=True)
+        self.assertTrue(report.valid())
+
+        data = {'sites': sites, 'samples': invalid_samples}
+        report = _validate_data_ext(schema, data, check_foreign_keys=True)
+        self.assertEqual(report.errors, error_report['errors'])
+
+        # foreign keys are only checked when asked for
+        report = _validate_data_ext(schema, data)
+        self.assertTrue(report.valid())
+
+    @parameterized.expand([
+        ('referenced_first', ['sites', 'samples']),
+        ('referencing_first', ['samples', 'sites']),
+    ])
+    def test_shared_index(self, _, table_order):
+        schema = with_sites_table(v2_schemas[odm.VERSION_STR])
+        data = {'sites': sites, 'samples': invalid_samples}
+        fk_index = ForeignKeyIndex(get_foreign_keys(schema['schema']))
+        errors = []
+        for table_id in table_order:
+            report = _validate_data_ext(schema, {table_id: data[table_id]},
+                                        fk_index=fk_index)
+            self.assertEqual(set(report.table_info), {table_id})
+            errors += report.errors
+        self.assertEqual(fk_index.pending_tables(), table_order[:1]
+                         if table_order[0] == 'samples' else [])
+
+        # the pending errors are reported for the table they belong to,
+        # without rows, since only the row numbers and values are kept
+        report = validate_pending_foreign_keys(schema, fk_index, 'samples')
+        errors += report.errors
+        self.assertEqual(len(fk_index.pending), 0)
+        expected = error_report['errors']
+        if table_order[0] == 'samples':
+            expected = [{k: v for k, v in e.items() if k != 'row'}
+                        for e in expected]
+        self.assertEqual(errors, expected)
+
+    def test_unresolved_pending(self):
+        schema = with_sites_table(v2_schemas[odm.VERSION_STR])
+        fk_index = ForeignKeyIndex(get_foreign_keys(schema['schema']))
+        _validate_data_ext(schema, {'samples': invalid_samples},
+                           fk_index=fk_index)
+        self.assertEqual([(1, 'site-1'), (2, 'site-3'), (3, 'site-3')],
+                         [p for ps in fk_index.pending.values() for p in ps])
+
+        # the values can't be checked until their table is indexed
+        report = validate_pending_foreign_keys(schema, fk_index, 'samples')
+        self.assertTrue(report.valid())
+        self.assertEqual([3], list(fk_index.drop_pending().values()))
+        self.assertEqual(len(fk_index.pending), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@ import unittest
 from parameterized import parameterized
 
 import odm_validation.odm as odm
+from odm_validation.input_data import DataKind
 from odm_validation.rules import RuleId
 from odm_validation.schemas import import_schema
 from odm_validation.utils import import_dataset, import_json_file
@@ -61,6 +62,23 @@ class TestMissingMandatoryColumn(common.OdmTestCase):
         expected = error_report
         self.assertEqual(report.errors, expected['errors'])
 
+    def test_rows_with_different_columns(self):
+        # rows without the same columns are checked one by one
+        schema = v2_schemas[odm.VERSION_STR]
+        rows = missing_mandatory_column_fail_v2['addresses']
+        data = {'addresses': rows + [dict(rows[0], extra='x')]}
+        report = validate_data(schema, data)
+        self.assertEqual([1, 2], [e['rowNumber'] for e in report.errors])
+
+    def test_spreadsheet_first_row_only(self):
+        schema = v2_schemas[odm.VERSION_STR]
+        rows = missing_mandatory_column_fail_v2['addresses']
+        data = {'addresses': rows * 3}
+        report = validate_data(schema, data, DataKind.spreadsheet)
+        self.assertEqual(len(error_report['errors']), len(report.errors))
+        report = validate_data(schema, data)
+        self.assertEqual(3 * len(error_report['errors']), len(report.errors))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,114 @@
+import tempfile
+import unittest
+from os.path import join
+
+from odm_validation.input_data import DataKind
+from odm_validation.report_store import ReportStore
+from odm_validation.reports import ErrorKind
+from odm_validation.rules import RuleId
+from odm_validation.summarization import SummaryKey, summarize_report
+from odm_validation.validation import validate_data
+
+import common
+
+
+def gen_schema(table_ids):
+    return {
+        'schemaVersion': '2.0.0',
+        'schema': {
+            table_id: {
+                'type': 'list',
+                'schema': {
+                    'type': 'dict',
+                    'schema': {
+                        'num': {'type': 'integer', 'coerce': 'integer',
+                                'min': 0},
+                        'kind': {'allowed': ['a']},
+                        'addID': {'required': True},
+                    }
+                }
+            }
+            for table_id in table_ids
+        }
+    }
+
+
+class TestReportStore(common.OdmTestCase):
+    all_keys = {SummaryKey.TABLE, SummaryKey.COLUMN, SummaryKey.ROW}
+
+    def setUp(self):
+        self.maxDiff = None
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = join(self.tmpdir.name, 'report.sqlite')
+        schema = gen_schema(['addresses', 'sites'])
+        rows = [{'num': n, 'kind': k}
+                for n, k in [('1', 'b'), ('-1', 'a'), ('x', 'b'), ('0', 'a'),
+                             ('2.0', 'a')]]
+        data = {'sites': rows, 'addresses': rows[::-1]}
+        self.report = validate_data(schema, data, DataKind.spreadsheet)
+
+        # entries are stored in the order they are found, which isn't the
+        # order of the report
+        store = ReportStore(self.path, create=True)
+        store.set_header(self.report)
+        for e in reversed(self.report.errors):
+            store.add(e)
+        for w in self.report.warnings:
+            store.add(w)
+        store.close()
+        self.store = ReportStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def test_read_report(self):
+        self.assertEqual(self.report, self.store.read_report())
+
+    def test_same_summary_as_report(self):
+        for keys in [{SummaryKey.TABLE}, {SummaryKey.ROW}, self.all_keys]:
+            self.assertEqual(summarize_report(self.report, keys),
+                             self.store.summarize(keys))
+
+    def test_query(self):
+        def query(**kwargs):
+            return list(self.store.query(**kwargs))
+
+        errors = self.report.errors
+        self.assertEqual(errors, query(kind=ErrorKind.ERROR))
+        self.assertEqual(self.report.warnings, query(kind=ErrorKind.WARNING))
+        self.assertEqual([e for e in errors if e['tableName'] == 'sites'],
+                         query(kind=ErrorKind.ERROR, table='sites'))
+        self.assertEqual(
+            [e for e in errors
+             if e['tableName'] == 'sites' and e['columnName'] == 'kind'],
+            query(table='sites', column='kind'))
+        rule = RuleId.less_than_min_value
+        self.assertEqual([e for e in errors if e['errorType'] == rule.name],
+                         query(rule=rule))
+        self.assertEqual(
+            [e for e in errors if e.get('rowNumber') in [2, 3]],
+            query(kind=ErrorKind.ERROR, rows=(2, 3)))
+
+    def test_reading_doesnt_write(self):
+        self.store.close()
+        with open(self.path, 'rb') as f:
+            expected = f.read()
+        for readonly in [False, True]:
+            self.store = ReportStore(self.path, readonly=readonly)
+            self.store.summarize(self.all_keys)
+            list(self.store.query())
+            self.store.close()
+            with open(self.path, 'rb') as f:
+                self.assertEqual(expected, f.read())
+        self.store = ReportStore(self.path, readonly=True)
+
+    def test_reopened_store_appends(self):
+        e = dict(self.report.errors[0], rowNumber=100)
+        self.store.add(e)
+        self.store.commit()
+        self.assertEqual([e], list(self.store.query(rows=(100, 100))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,28 @@
+import io
+import json
 import unittest
 from copy import deepcopy
 
+import yaml
+
 from odm_validation.input_data import DataKind
-from odm_validation.reports import get_row_num
-from odm_validation.validation import validate_data
+from odm_validation.reports import (
+    ErrorKind,
+    ErrorVerbosity,
+    ReportBuilder,
+    ReportEntry,
+    ValidationCtx,
+    _fmt_ranges,
+    add_row_number,
+    expand_row_ranges,
+    get_row_num,
+    join_reports,
+)
+from odm_validation.rule_errors import ErrorGroups, _get_column_ctx
+from odm_validation.rules import RuleId
+from odm_validation.summarization import SummaryKey, summarize_report
+from odm_validation.tools.reportutils import write_yaml_report
+from odm_validation.validation import _validate_data_ext, validate_data
 
 import common
 
@@ -121,6 +140,224 @@ class TestReports(common.OdmTestCase):
         self.assertFalse('row' in msg)
         self.assertTrue('column addID:' in msg)
 
+    def test_column_ctx(self):
+        vctx = ValidationCtx(verbosity=ErrorVerbosity.MESSAGE)
+        schema_column = {
+            'allowed': ['b', 'a'],
+            'meta': [{'ruleID': 'invalid_category', 'meta': [{'x': 'y'}]}],
+        }
+        args = ('allowed', 'addresses', 'addID', schema_column['meta'],
+                schema_column)
+        ctx = _get_column_ctx(vctx, *args)
+        self.assertIs(ctx, _get_column_ctx(vctx, *args))
+        self.assertEqual(RuleId.invalid_category, ctx.rule.id)
+        self.assertEqual({'a', 'b'}, ctx.allowed_values)
+        self.assertEqual(['invalid_category'], ctx.meta_rule_ids)
+        self.assertEqual([{'x': 'y'}], ctx.rule_fields)
+
+    def test_row_ranges(self):
+        for numbers, expected in [([1], '1'), ([1, 2, 3, 5], '1-3,5'),
+                                  ([2, 4, 5, 7, 8, 9], '2,4-5,7-9')]:
+            ranges = []
+            for n in numbers:
+                add_row_number(ranges, n)
+            self.assertEqual(expected, _fmt_ranges(ranges))
+            self.assertEqual(numbers, expand_row_ranges(ranges))
+
+
+class TestErrorGroups(common.OdmTestCase):
+    def setUp(self):
+        self.schema = deepcopy(base_schema)
+        table_schema = get_table_schema(self.schema)
+        table_schema['addType'] = {'allowed': ['a', 'b']}
+        table_schema['addNum'] = {'type': 'integer', 'coerce': 'integer'}
+        n = ErrorGroups.MAX_ROWS * 2
+        self.rows = ([{'addType': 'x'}] * n + [{'addType': 'a'}] +
+                     [{'addType': 'x'}, {'addType': 'y'}])
+        for i in range(3):
+            self.rows[i] = dict(self.rows[i], addNum='1')
+
+    def validate(self, group_values):
+        return _validate_data_ext(self.schema, {'addresses': self.rows},
+                                  group_values=group_values)
+
+    def test_repeated_values_are_grouped(self):
+        report = self.validate(group_values=True)
+        self.assertEqual(['x', 'y'],
+                         [e['invalidValue'] for e in report.errors])
+        n = ErrorGroups.MAX_ROWS * 2
+        grouped = report.errors[0]
+        self.assertEqual([[1, n], [n + 2, n + 2]], grouped['rowRanges'])
+        self.assertNotIn('rowNumbers', grouped)
+        self.assertEqual(ErrorGroups.MAX_ROWS, len(grouped['rows']))
+        self.assertIn(f'row(s) 1-{n},{n + 2}:', grouped['message'])
+        self.assertEqual([n + 3], [report.errors[1]['rowNumber']])
+
+    def test_coercion_is_grouped(self):
+        report = self.validate(group_values=True)
+        self.assertEqual(1, len(report.warnings))
+        self.assertEqual('_coercion', report.warnings[0]['warningType'])
+        self.assertEqual([[1, 3]], report.warnings[0]['rowRanges'])
+
+    def test_summary_counts_every_row(self):
+        expected = summarize_report(self.validate(group_values=False))
+        summary = summarize_report(self.validate(group_values=True))
+        self.assertEqual(expected.errors, summary.errors)
+
+    def test_disabled_by_default(self):
+        report = _validate_data_ext(self.schema, {'addresses': self.rows})
+        self.assertEqual(len(self.rows) - 1, len(report.errors))
+
+
+class TestErrorSampler(common.OdmTestCase):
+    def setUp(self):
+        self.schema = deepcopy(base_schema)
+        table_schema = get_table_schema(self.schema)
+        table_schema['addType'] = {'allowed': ['a', 'b']}
+        table_schema['addNum'] = {'type': 'integer', 'coerce': 'integer',
+                                  'max': 10}
+        self.rows = [{'addType': t, 'addNum': n}
+                     for t, n in [('x', '1'), ('y', 'z'), ('x', '11')] * 5]
+
+    def get_counts(self, entries, error_kind):
+        result = {}
+        field = error_kind.value + 'Type'
+        for e in entries:
+            n = len(e.get('rowNumbers', [])) or 1
+            key = (e['tableName'], e['columnName'], e[field])
+            result[key] = result.get(key, 0) + n
+        return result
+
+    def flatten(self, counts):
+        return {(table_id, column_id, rule_name): n
+                for table_id, table_counts in counts.items()
+                for column_id, column_counts in table_counts.items()
+                for rule_name, n in column_counts.items()}
+
+    def test_counts_match_full_report(self):
+        data = {'addresses': self.rows}
+        expected = _validate_data_ext(self.schema, data)
+        report = _validate_data_ext(self.schema, data, max_examples=2)
+        self.assertEqual(
+            self.get_counts(expected.errors, ErrorKind.ERROR),
+            self.flatten(report.error_counts))
+        self.assertEqual(
+            self.get_counts(expected.warnings, ErrorKind.WARNING),
+            self.flatten(report.warning_counts))
+        examples = self.get_counts(report.errors, ErrorKind.ERROR)
+        self.assertTrue(all(n <= 2 for n in examples.values()), examples)
+        self.assertEqual(examples.keys(),
+                         self.flatten(report.error_counts).keys())
+        self.assertEqual(expected.errors[:2], report.errors[:2])
+
+    def test_redundant_coercion_errors_are_not_counted(self):
+        report = _validate_data_ext(self.schema, {'addresses': self.rows},
+                                    max_examples=1)
+        rules = self.flatten(report.error_counts)
+        self.assertEqual(5, rules[('addresses', 'addNum', 'invalid_type')])
+        self.assertNotIn(('addresses', 'addNum', '_coercion'), rules)
+
+    def test_summary_uses_counts(self):
+        data = {'addresses': self.rows}
+        by = {SummaryKey.TABLE, SummaryKey.COLUMN}
+        expected = summarize_report(_validate_data_ext(self.schema, data),
+                                    by)
+        report = _validate_data_ext(self.schema, data, max_examples=1)
+        self.assertEqual(expected, summarize_report(report, by))
+
+    def test_join_reports(self):
+        report = _validate_data_ext(self.schema, {'addresses': self.rows},
+                                    max_examples=1)
+        joined = join_reports(report, report)
+        self.assertEqual(
+            {k: n * 2 for k, n in self.flatten(report.error_counts).items()},
+            self.flatten(joined.error_counts))
+
+
+class TestReportBuilder(common.OdmTestCase):
+    def setUp(self):
+        self.schema = deepcopy(base_schema)
+        table_schema = get_table_schema(self.schema)
+        table_schema['addType'] = {'allowed': ['a', 'b']}
+        self.reports = [
+            _validate_data_ext(self.schema, {'addresses': [
+                {'addType': t} for t in types]}, max_examples=max_examples)
+            for types, max_examples in [(['x', 'a'], None), (['y'], 1),
+                                        (['z', 'z'], 1)]
+        ]
+
+    def test_same_as_join_reports(self):
+        expected = None
+        builder = ReportBuilder()
+        for report in self.reports:
+            expected = join_reports(expected, report)
+            builder.add(report)
+        self.assertEqual(expected, builder.build())
+
+    def test_index_order(self):
+        in_order = ReportBuilder()
+        out_of_order = ReportBuilder()
+        for report in self.reports:
+            in_order.add(report)
+        for i in [2, 0, 1]:
+            out_of_order.add(self.reports[i], index=i)
+        self.assertEqual(in_order.build(), out_of_order.build())
+
+
+class TestReportEntry(common.OdmTestCase):
+    def gen_entry(self, rendered):
+        entry = ReportEntry(errorType='x')
+
+        def render():
+            rendered.append('message')
+            return 'msg'
+
+        entry.set_pending('message', render)
+        entry['rowNumber'] = 1
+        return entry
+
+    def test_render_on_access(self):
+        rendered = []
+        entry = self.gen_entry(rendered)
+        self.assertIn('message', entry)
+        self.assertEqual(['errorType', 'message', 'rowNumber'], list(entry))
+        self.assertEqual([], rendered)
+        self.assertEqual('msg', entry['message'])
+        self.assertEqual('msg', entry.get('message'))
+        self.assertEqual(['message'], rendered)
+
+    def test_deleted_fields_are_not_rendered(self):
+        rendered = []
+        entry = self.gen_entry(rendered)
+        del entry['message']
+        self.assertEqual({'errorType': 'x', 'rowNumber': 1}, entry)
+        self.assertEqual([], rendered)
+
+    def test_behaves_like_dict(self):
+        expected = {'errorType': 'x', 'message': 'msg', 'rowNumber': 1}
+        self.assertEqual(expected, self.gen_entry([]))
+        self.assertEqual([expected], [self.gen_entry([])])
+        self.assertEqual(expected, dict(self.gen_entry([])))
+        self.assertEqual(expected, {**self.gen_entry([])})
+        self.assertEqual(expected, deepcopy(self.gen_entry([])))
+        self.assertEqual(json.dumps(expected),
+                         json.dumps(self.gen_entry([])))
+        self.assertEqual('msg', self.gen_entry([]).pop('message'))
+
+    def test_yaml_report(self):
+        report = validate_data(base_schema, {'addresses': [{'a': 1}]})
+        report.errors.append(self.gen_entry([]))
+        output = io.StringIO()
+        write_yaml_report(output, report)
+        self.assertEqual(report.errors,
+                         yaml.safe_load(output.getvalue())['errors'])
+
+    def test_yaml_dump_entry(self):
+        expected = {'errorType': 'x', 'message': 'msg', 'rowNumber': 1}
+        for dump in [yaml.dump, yaml.safe_dump]:
+            self.assertEqual(expected,
+                             yaml.safe_load(dump([self.gen_entry([])]))[0])
+
 
 if __name__ == '__main__':
     unittest.main()
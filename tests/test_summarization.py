@@ -1,15 +1,33 @@
+import copy
+import pickle
+import tempfile
 import unittest
+from os.path import join
 
 import odm_validation.odm as odm
-from odm_validation.reports import ErrorKind, TableInfo, ValidationReport
+from odm_validation.input_data import DataKind
+from odm_validation.reports import (
+    ErrorKind,
+    ReportBuilder,
+    TableInfo,
+    ValidationReport,
+)
 from odm_validation.rules import RuleId
 from odm_validation.summarization import (
     _calc_summary_entry_totals,
     ErrorSummary,
+    iter_summary,
+    OnlineSummarizer,
     SummaryEntry,
     SummaryKey,
     summarize_report,
+    summarize_report_files,
+)
+from odm_validation.tools.reportutils import (
+    write_json_report,
+    write_ndjson_report,
 )
+from odm_validation.validation import validate_data
 from odm_validation.versions import __version__
 
 import common
@@ -227,5 +245,218 @@ class TestSummarizationApi(common.OdmTestCase):
         self.assertEqual(overview, summary.overview)
 
 
+class TestOnlineSummarizer(common.OdmTestCase):
+    all_keys = {SummaryKey.TABLE, SummaryKey.COLUMN, SummaryKey.ROW}
+
+    def setUp(self):
+        self.maxDiff = None
+
+    def test_same_as_summarize_report(self):
+        summarizer = OnlineSummarizer(self.all_keys)
+        # errors are sorted in reports, but not when they are found
+        summarizer.start_report()
+        for e in reversed(errors_in):
+            summarizer.add(e)
+        for w in warnings_in:
+            summarizer.add(w)
+        summary = summarizer.summarize(init_report([], []))
+        self.assertEqual(errors_out, summary.errors)
+        self.assertEqual(warnings_out, summary.warnings)
+        self.assertEqual(overview, summary.overview)
+
+    def test_validation(self):
+        schema = {
+            'schemaVersion': '2.0.0',
+            'schema': {
+                table_id: {
+                    'type': 'list',
+                    'schema': {
+                        'type': 'dict',
+                        'schema': {
+                            'num': {'type': 'integer', 'coerce': 'integer',
+                                    'min': 0},
+                            'kind': {'allowed': ['a']},
+                        }
+                    }
+                }
+                for table_id in ['addresses', 'sites']
+            }
+        }
+        rows = [{'num': n, 'kind': k}
+                for n, k in [('1', 'b'), ('-1', 'a'), ('x', 'b'), ('0', 'a')]]
+        data = {'sites': rows, 'addresses': rows[::-1]}
+        expected = summarize_report(validate_data(schema, data),
+                                    self.all_keys)
+        summarizer = OnlineSummarizer(self.all_keys)
+        report = validate_data(schema, data, max_examples=0,
+                               summarizer=summarizer)
+        self.assertEqual([], report.errors + report.warnings)
+        self.assertEqual(expected, summarizer.summarize(report))
+
+    def test_table_order(self):
+        schema = {
+            'schemaVersion': '2.0.0',
+            'schema': {
+                table_id: {
+                    'type': 'list',
+                    'schema': {
+                        'type': 'dict',
+                        'schema': {
+                            'num': {'type': 'integer', 'coerce': 'integer'},
+                            'kind': {'allowed': ['a']},
+                        }
+                    }
+                }
+                for table_id in ['addresses', 'sites']
+            }
+        }
+        rows = [{'num': n, 'kind': k} for n, k in [('x', 'b'), ('1', 'b')]]
+        # the reports of each table are joined in the order they are
+        # validated, which isn't the order of the table ids
+        summarizer = OnlineSummarizer(self.all_keys)
+        builder = ReportBuilder()
+        for table_id in ['sites', 'addresses']:
+            builder.add(validate_data(schema, {table_id: rows},
+                                      summarizer=summarizer))
+        report = builder.build()
+        expected = summarize_report(report, self.all_keys)
+        self.assertEqual(['sites', 'addresses'], list(expected.errors))
+
+        # a read report is added in order
+        read_summarizer = OnlineSummarizer(self.all_keys)
+        for e in report.errors + report.warnings:
+            read_summarizer.add(e)
+        for s in [summarizer, read_summarizer]:
+            summary = s.summarize(report)
+            self.assertEqual(list(expected.errors), list(summary.errors))
+            self.assertEqual(list(expected.overview['errors']),
+                             list(summary.overview['errors']))
+            self.assertEqual(list(iter_summary(report, self.all_keys)),
+                             list(s.iter_summary()))
+
+    def test_sampled_report(self):
+        schema = {
+            'schemaVersion': '2.0.0',
+            'schema': {
+                'sites': {
+                    'type': 'list',
+                    'schema': {
+                        'type': 'dict',
+                        'schema': {
+                            'num': {'type': 'integer', 'coerce': 'integer'},
+                            'kind': {'allowed': ['a']},
+                        }
+                    }
+                }
+            }
+        }
+        rows = [{'num': n, 'kind': k}
+                for n, k in [('x', 'b'), ('1', 'b'), ('y', 'a')]]
+        report = validate_data(schema, {'sites': rows}, max_examples=1)
+        keys = {SummaryKey.TABLE, SummaryKey.COLUMN}
+        summarizer = OnlineSummarizer(keys)
+        for e in report.errors + report.warnings:
+            summarizer.add(e)
+        summarizer.add_counts(report)
+        self.assertEqual(summarize_report(report, keys),
+                         summarizer.summarize(report))
+
+        # only the rows of the examples are known
+        with self.assertRaises(ValueError):
+            summarize_report(report, self.all_keys)
+        summarizer = OnlineSummarizer(self.all_keys)
+        for e in report.errors + report.warnings:
+            summarizer.add(e)
+        with self.assertRaises(ValueError):
+            summarizer.add_counts(report)
+
+    def test_column_errors_count_once(self):
+        schema = {
+            'schemaVersion': '2.0.0',
+            'schema': {
+                'addresses': {
+                    'type': 'list',
+                    'schema': {
+                        'type': 'dict',
+                        'schema': {'addID': {'required': True}},
+                    }
+                }
+            }
+        }
+        data = {'addresses': [{'x': '1'}, {'x': '2'}]}
+        summarizer = OnlineSummarizer(self.all_keys)
+        report = validate_data(schema, data, DataKind.spreadsheet,
+                               summarizer=summarizer)
+        expected = {RuleId.missing_mandatory_column: 1}
+        self.assertEqual(expected, summarizer.summarize(report).overview[
+            'errors'])
+        self.assertEqual(expected, summarize_report(report).overview[
+            'errors'])
+
+
+class TestCompactSummary(common.OdmTestCase):
+    all_keys = {SummaryKey.TABLE, SummaryKey.COLUMN, SummaryKey.ROW}
+
+    def test_entry_copies(self):
+        entry = SE(rule_id=E0, count=2, key=SummaryKey.ROW, value='1')
+        self.assertFalse(hasattr(entry, '__dict__'))
+        self.assertEqual(entry, pickle.loads(pickle.dumps(entry)))
+        self.assertEqual(entry, copy.deepcopy(entry))
+
+    def test_iter_summary(self):
+        report = init_report(errors_in, warnings_in)
+        summary = summarize_report(report, self.all_keys)
+        expected = [
+            (ErrorKind.WARNING, table_id, e)
+            for table_id, entries in summary.warnings.items()
+            for e in entries
+        ] + [
+            (ErrorKind.ERROR, table_id, e)
+            for table_id, entries in summary.errors.items()
+            for e in entries
+        ]
+        self.assertEqual(expected, list(iter_summary(report, self.all_keys)))
+
+    def test_unordered_rows(self):
+        errors = [
+            {
+                'errorType': 'invalid_type',
+                'tableName': 'addresses',
+                'columnName': column_id,
+                'rowNumber': row_num,
+            }
+            for column_id, row_num in [('a', 10), ('a', 2), ('b', 10)]
+        ]
+        summary = summarize_report(init_report(errors, []), {SummaryKey.ROW})
+        expected = [
+            SE(rule_id=E0, count=2, key=SummaryKey.ROW, value='10'),
+            SE(rule_id=E0, count=1, key=SummaryKey.ROW, value='2'),
+            SE(rule_id=ALL, count=2, key=SummaryKey.ROW, value='10'),
+            SE(rule_id=ALL, count=1, key=SummaryKey.ROW, value='2'),
+        ]
+        self.assertEqual(expected, summary.errors['addresses'])
+
+
+class TestSummarizeReportFiles(common.OdmTestCase):
+    all_keys = {SummaryKey.TABLE, SummaryKey.COLUMN, SummaryKey.ROW}
+
+    def test_same_as_joined_report(self):
+        expected = summarize_report(init_report(errors_in, warnings_in),
+                                    self.all_keys)
+        parts = [
+            (write_json_report, init_report(errors_in[:2], [])),
+            (write_ndjson_report, init_report(errors_in[2:], [])),
+            (write_json_report, init_report([], warnings_in)),
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for i, (write, report) in enumerate(parts):
+                with open(join(tmpdir, f'report-{i}.txt'), 'w') as f:
+                    write(f, report)
+            for workers in [1, 2]:
+                summary = summarize_report_files(
+                    [join(tmpdir, 'report-*')], self.all_keys, workers)
+                self.assertEqual(expected, summary)
+
+
 if __name__ == '__main__':
     unittest.main()
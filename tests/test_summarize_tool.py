@@ -1,9 +1,32 @@
+import json
 import shutil
+import subprocess
+import tempfile
 import unittest
 import os
+from io import StringIO
 from os.path import join, relpath
 
 import common
+from odm_validation.compression import open_file
+from odm_validation.reports import (
+    TableInfo,
+    ValidationReport,
+    get_report_fields,
+)
+from odm_validation.summarization import SummaryKey, summarize_report
+from odm_validation.tools.reportutils import (
+    ReportFormat,
+    ReportStream,
+    _JsonReader,
+    detect_report_format_from_content,
+    detect_report_format_from_path,
+    read_report_from_file,
+    write_json_report,
+    write_ndjson_report,
+    write_yaml_report,
+)
+from odm_validation.tools.summarize import write_csv_summary
 from odm_validation.utils import get_pkg_dir
 
 
@@ -11,6 +34,7 @@ tool_asset_dir = join(common.ASSET_DIR, 'tools')  # from repo
 tools_dir = join(get_pkg_dir(), 'tools')  # from pkg
 
 summarize_tool = relpath(join(tools_dir, 'summarize.py'), os.getcwd())
+merge_tool = relpath(join(tools_dir, 'merge_reports.py'), os.getcwd())
 validate_tool = 'odm-validate'
 
 
@@ -32,6 +56,216 @@ class TestSummarizeTool(common.OdmTestCase):
         d = f'diff {expected_summary} -'
         self.cmd(f'{v} {tool_asset_dir}/*.csv 2> /dev/null | {s} | {d}')
 
+    def test_sampled_report_has_the_same_summary(self):
+        expected_summary = relpath(join(tool_asset_dir, 'summary.csv'))
+        v = f'{validate_tool} --version=1.1.0 --format=json --max-examples=1'
+        s = f'{summarize_tool}'
+        d = f'diff {expected_summary} -'
+        self.cmd(f'{v} {tool_asset_dir}/*.csv 2> /dev/null | {s} | {d}')
+
+    def test_sampled_report_by_row(self):
+        # only the rows of the examples are known
+        v = f'{validate_tool} --version=1.1.0 --format=json --max-examples=1'
+        s = f'{summarize_tool} --by=row'
+        rc = os.system(f'{v} {tool_asset_dir}/*.csv 2> /dev/null | {s} '
+                       '> /dev/null 2>&1')
+        self.assertNotEqual(0, rc)
+
+    def test_ndjson_report_has_the_same_summary(self):
+        expected_summary = relpath(join(tool_asset_dir, 'summary.csv'))
+        s = f'{summarize_tool}'
+        d = f'diff {expected_summary} -'
+        for args in ['', '--max-examples=1']:
+            v = f'{validate_tool} --version=1.1.0 --format=ndjson {args}'
+            self.cmd(f'{v} {tool_asset_dir}/*.csv 2> /dev/null | {s} | {d}')
+
+    def test_multiple_reports(self):
+        expected_summary = relpath(join(tool_asset_dir, 'summary.csv'))
+        v = f'{validate_tool} --version=1.1.0'
+        d = f'diff {expected_summary} -'
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # one report per table
+            for name, fmt in [('3 - Lab', 'json'), ('6 - Sample', 'ndjson')]:
+                in_path = join(tool_asset_dir, f'{name}.csv')
+                out_path = join(tmpdir, f'{name}.{fmt}')
+                self.cmd(f'{v} "{in_path}" --out="{out_path}" 2> /dev/null')
+            reports = f'"{tmpdir}/*.json" "{tmpdir}/*.ndjson"'
+            self.cmd(f'{summarize_tool} {reports} | {d}')
+
+            merged = join(tmpdir, 'merged.ndjson')
+            self.cmd(f'{merge_tool} {reports} --out={merged}')
+            self.cmd(f'{summarize_tool} {merged} | {d}')
+
+    def test_sqlite_report(self):
+        expected_summary = relpath(join(tool_asset_dir, 'summary.csv'))
+        v = f'{validate_tool} --version=1.1.0'
+        d = f'diff {expected_summary} -'
+        with tempfile.TemporaryDirectory() as tmpdir:
+            report = join(tmpdir, 'report.sqlite')
+            self.cmd(f'{v} {tool_asset_dir}/*.csv --out={report} '
+                     '2> /dev/null')
+            self.cmd(f'{summarize_tool} {report} | {d}')
+
+            merged = join(tmpdir, 'merged.ndjson')
+            self.cmd(f'{merge_tool} {report} --out={merged}')
+            self.cmd(f'{summarize_tool} {merged} | {d}')
+
+    def test_compressed_files(self):
+        expected_summary = relpath(join(tool_asset_dir, 'summary.csv'))
+        v = f'{validate_tool} --version=1.1.0'
+        d = f'diff {expected_summary} -'
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name in ['3 - Lab', '6 - Sample']:
+                with open(join(tool_asset_dir, f'{name}.csv'), 'rb') as f:
+                    with open_file(join(tmpdir, f'{name}.csv.gz'), 'wb') as z:
+                        z.write(f.read())
+            for ext in ['json.gz', 'ndjson.gz']:
+                report = join(tmpdir, f'report.{ext}')
+                self.cmd(f'{v} "{tmpdir}/"*.csv.gz --out={report} '
+                         '2> /dev/null')
+                self.cmd(f'{summarize_tool} {report} | {d}')
+
+    def test_validate_with_summary(self):
+        expected_summary = relpath(join(tool_asset_dir, 'summary.csv'))
+        v = f'{validate_tool} --version=1.1.0 --summarize-by=table'
+        d = f'diff {expected_summary} -'
+        self.cmd(f'{v} {tool_asset_dir}/*.csv 2> /dev/null | {d}')
+
+    def test_streamed_summary_order(self):
+        # the errors are sorted within each table, but the tables of the
+        # joined report aren't in alphabetical order
+        errors = [
+            {'errorType': 'invalid_type', 'tableName': table_id,
+             'columnName': column_id, 'rowNumber': row_num}
+            for table_id, column_id, row_num in [
+                ('sites', 'name', 3),
+                ('sites', 'siteID', 2),
+                ('addresses', 'addID', 2),
+                ('samples', 'sampleID', 4),
+            ]
+        ]
+        report = ValidationReport(
+            data_version='2.0.0',
+            schema_version='2.0.0',
+            package_version='1.0.0',
+            table_info={table_id: TableInfo(columns=2, rows=3)
+                        for table_id in ['sites', 'addresses', 'samples']},
+            errors=errors,
+            warnings=[],
+        )
+        keys = {SummaryKey.TABLE, SummaryKey.COLUMN, SummaryKey.ROW}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for ext, write in [('json', write_json_report),
+                               ('ndjson', write_ndjson_report)]:
+                path = join(tmpdir, f'report.{ext}')
+                with open(path, 'w') as f:
+                    write(f, report)
+                with open(path) as f:
+                    expected = StringIO()
+                    write_csv_summary(summarize_report(
+                        read_report_from_file(f), keys), expected)
+                result = subprocess.run(
+                    [summarize_tool, path, '--by=table', '--by=column',
+                     '--by=row'],
+                    capture_output=True, text=True, check=True)
+                self.assertEqual(expected.getvalue().splitlines(),
+                                 result.stdout.splitlines())
+
+
+class TestNdjsonReport(common.OdmTestCase):
+    report = ValidationReport(
+        data_version='2.0.0',
+        schema_version='2.0.0',
+        package_version='1.0.0',
+        table_info={'sites': TableInfo(columns=1, rows=2)},
+        errors=[{'errorType': 'invalid_type', 'tableName': 'sites',
+                 'columnName': 'siteID', 'rowNumber': 2}],
+        warnings=[{'warningType': '_coercion', 'tableName': 'sites',
+                   'columnName': 'siteID', 'rowNumber': 1}],
+    )
+
+    def read(self, write) -> ValidationReport:
+        output = StringIO()
+        write(output, self.report)
+        output.seek(0)
+        return read_report_from_file(output)
+
+    def test_same_as_json(self):
+        output = StringIO()
+        write_ndjson_report(output, self.report)
+        self.assertEqual(3, len(output.getvalue().splitlines()))
+        self.assertEqual(self.read(write_json_report),
+                         self.read(write_ndjson_report))
+
+    def test_counts_only_when_sampled(self):
+        sampled = ValidationReport(**{**vars(self.report),
+                                      'error_counts': {}})
+        for write in [write_json_report, write_ndjson_report,
+                      write_yaml_report]:
+            output = StringIO()
+            write(output, self.report)
+            self.assertNotIn('_counts', output.getvalue())
+            output = StringIO()
+            write(output, sampled)
+            self.assertIn('error_counts', output.getvalue())
+            self.assertNotIn('warning_counts', output.getvalue())
+
+    def test_detect_format(self):
+        self.assertEqual(ReportFormat.JSON,
+                         detect_report_format_from_content('{\n'))
+        output = StringIO()
+        write_ndjson_report(output, self.report)
+        self.assertEqual(ReportFormat.NDJSON,
+                         detect_report_format_from_content(
+                             output.getvalue()))
+        self.assertEqual(ReportFormat.NDJSON,
+                         detect_report_format_from_path('r.ndjson.gz'))
+        self.assertIsNone(detect_report_format_from_path('r.sqlite.gz'))
+
+    def test_compact_json(self):
+        output = StringIO()
+        json.dump(get_report_fields(self.report), output)
+        self.assertEqual(1, len(output.getvalue().splitlines()))
+        self.assertEqual(ReportFormat.JSON,
+                         detect_report_format_from_content(
+                             output.getvalue()))
+        output.seek(0)
+        self.assertEqual(self.report, read_report_from_file(output))
+        output.seek(0)
+        stream = ReportStream(output)
+        self.assertEqual(self.report.errors + self.report.warnings,
+                         list(stream.entries()))
+
+
+class TestReportStream(common.OdmTestCase):
+    report = TestNdjsonReport.report
+
+    def read(self, write) -> tuple[list, ValidationReport]:
+        output = StringIO()
+        write(output, self.report)
+        output.seek(0)
+        stream = ReportStream(output)
+        entries = list(stream.entries())
+        return (entries, stream.get_report())
+
+    def test_entries(self):
+        expected = self.report.errors + self.report.warnings
+        header = ValidationReport(**{**vars(self.report), 'errors': [],
+                                     'warnings': []})
+        for write in [write_json_report, write_ndjson_report]:
+            self.assertEqual((expected, header), self.read(write))
+
+    def test_small_chunks(self):
+        expected = self.read(write_json_report)
+        chunk_size = _JsonReader.CHUNK_SIZE
+        try:
+            # values are split between chunks, like numbers
+            for n in [1, 2, 3, 7]:
+                _JsonReader.CHUNK_SIZE = n
+                self.assertEqual(expected, self.read(write_json_report))
+        finally:
+            _JsonReader.CHUNK_SIZE = chunk_size
+
 
 if __name__ == '__main__':
     unittest.main()
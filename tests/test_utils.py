@@ -0,0 +1,112 @@
+import csv
+import tempfile
+import unittest
+from os.path import join
+
+from parameterized import parameterized
+
+from odm_validation import utils
+from odm_validation.compression import open_file
+from odm_validation.utils import import_csv_file
+
+import common
+
+
+CSV_DATA = (
+    '\ufeffid,name,notes,lastUpdated\r\n'
+    'a,x,"multi\r\nline",2023-01-01\r\n'
+    '\r\n'
+    'b,y\r\n'
+    'c,"z, w",,2023-01-02,extra\r\n'
+)
+
+
+class TestCsvImport(common.OdmTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = join(self.tmpdir.name, 'data.csv')
+        with open(self.path, 'w', newline='', encoding='utf-8') as f:
+            f.write(CSV_DATA)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_same_as_dictreader(self):
+        with open(self.path, newline='', encoding='utf-8-sig') as f:
+            expected = list(csv.DictReader(f))
+        for row in expected:
+            row.pop(None, None)  # fields without a header
+        self.assertEqual(expected, import_csv_file(self.path))
+
+    def test_projection(self):
+        rows = import_csv_file(self.path, ['id', 'lastUpdated', 'missing'])
+        self.assertEqual([
+            {'id': 'a', 'lastUpdated': '2023-01-01'},
+            {'id': 'b', 'lastUpdated': None},
+            {'id': 'c', 'lastUpdated': '2023-01-02'},
+        ], rows)
+
+    def test_empty_file(self):
+        path = join(self.tmpdir.name, 'empty.csv')
+        open(path, 'w').close()
+        self.assertEqual([], import_csv_file(path))
+        self.assertEqual([], utils.import_header(path))
+
+    def test_header(self):
+        self.assertEqual(['id', 'name', 'notes', 'lastUpdated'],
+                         utils.import_header(self.path))
+
+    @parameterized.expand(['gz', 'xz'])
+    def test_compressed_file(self, ext):
+        path = f'{self.path}.{ext}'
+        with open_file(path, 'wb') as f:
+            f.write(CSV_DATA.encode('utf-8'))
+        self.assertEqual(import_csv_file(self.path), import_csv_file(path))
+        self.assertEqual(import_csv_file(self.path),
+                         utils.import_dataset(path, compact=False))
+
+    @parameterized.expand([('cr', '\r'), ('crlf', '\r\n'), ('lf', '\n')])
+    def test_line_endings(self, _, newline):
+        data = CSV_DATA.replace('\r\n', newline)
+        for path in [self.path, f'{self.path}.gz']:
+            with open_file(path, 'wb') as f:
+                f.write(data.encode('utf-8'))
+            with open(self.path, newline='', encoding='utf-8-sig') as f:
+                expected = list(csv.DictReader(f))
+            for row in expected:
+                row.pop(None, None)
+            self.assertEqual(f'multi{newline}line', expected[0]['notes'])
+            self.assertEqual(expected, import_csv_file(path))
+            self.assertEqual(list(expected[0]), utils.import_header(path))
+
+
+class TestCsvInterning(common.OdmTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = join(self.tmpdir.name, 'data.csv')
+        n = utils._INTERN_LIMIT + 10
+        with open(self.path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['id', 'siteID'])
+            for i in range(n):
+                writer.writerow([f'id-{i}', f'site-{i % 2}'])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_intern(self):
+        rows = import_csv_file(self.path, intern=True, compact=True)
+        self.assertEqual(rows, import_csv_file(self.path))
+        self.assertIs(rows[0]['siteID'], rows[2]['siteID'])
+        self.assertIsNot(rows[0]['siteID'], rows[1]['siteID'])
+
+    def test_high_cardinality_columns_are_not_interned(self):
+        rows = import_csv_file(self.path, intern=True)
+        value_dict = utils._ValueDictionary(1)
+        for row in rows:
+            value_dict.intern([row['id']])
+        self.assertIsNone(value_dict.columns[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
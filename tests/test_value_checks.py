@@ -0,0 +1,50 @@
+import unittest
+
+from odm_validation.cerberusext import ValueCheckCache
+
+import common
+
+
+class TestValueCheckCache(common.OdmTestCase):
+    def test_check_once_per_value(self):
+        cache = ValueCheckCache()
+        calls = []
+
+        def check(value):
+            calls.append(value)
+            return value == 'a'
+
+        location = ((), 'siteID')
+        for value in ['a', 'b', 'a', 'b', 1, 1.0, True]:
+            result = cache.check('allowed', location, value,
+                                 lambda: check(value))
+            self.assertEqual(value == 'a', result)
+        self.assertEqual(['a', 'b', 1, 1.0, True], calls)
+
+    def test_high_cardinality_is_not_cached(self):
+        cache = ValueCheckCache()
+        location = ((), 'sampleID')
+        for i in range(ValueCheckCache.MAX_VALUES + 1):
+            cache.check('forbidden', location, str(i), lambda: True)
+        self.assertIsNone(cache.rules['forbidden'][location])
+        self.assertFalse(cache.check('forbidden', location, '0',
+                                     lambda: False))
+
+    def test_constraint_set(self):
+        cache = ValueCheckCache()
+        location = ((), 'siteID')
+        allowed = ['a', 'b']
+        result = cache.constraint_set('allowed', location, allowed)
+        self.assertEqual(frozenset(allowed), result)
+        self.assertIs(result, cache.constraint_set('allowed', location,
+                                                   allowed))
+
+    def test_unhashable_constraint(self):
+        cache = ValueCheckCache()
+        forbidden = [['a'], 'b']
+        result = cache.constraint_set('forbidden', ((), 'x'), forbidden)
+        self.assertIs(forbidden, result)
+
+
+if __name__ == '__main__':
+    unittest.main()
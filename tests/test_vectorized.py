@@ -0,0 +1,167 @@
+import json
+import random
+import unittest
+from datetime import datetime
+from os.path import join
+
+from parameterized import parameterized
+
+from odm_validation.foreign_keys import ForeignKeyIndex, get_foreign_keys
+from odm_validation.rules import RuleId
+from odm_validation.schemas import import_schema
+from odm_validation.validation import (
+    _validate_data_ext,
+    validate_pending_foreign_keys,
+)
+
+import common
+
+try:
+    import numpy as np
+    import pandas as pd
+    from odm_validation.vectorized import to_rows
+    has_pandas = True
+except ImportError:
+    has_pandas = False
+
+
+schema = import_schema(join(common.ASSET_DIR, 'validation-schemas',
+                            'schema-v2.2.3.yml'))
+
+SAMPLE_STRS = ['', ' ', 'NA', 'nan', 'a', 'ab', 'x' * 40, ' y ', 'TRUE',
+               'comp', 'rawWW', '1', '01', '-1', '1.5', '2023-01-01']
+
+
+def gen_column(rng, kind, n):
+    if kind == 'str':
+        return np.array([rng.choice(SAMPLE_STRS) for _ in range(n)])
+    if kind == 'object':
+        values = SAMPLE_STRS + [None, float('nan')]
+        return np.array([rng.choice(values) for _ in range(n)],
+                        dtype=object)
+    if kind == 'int':
+        return np.array([rng.choice([0, 1, -1, 100]) for _ in range(n)])
+    if kind == 'float':
+        values = [0.0, 1.0, -1.5, 24.0, float('nan')]
+        return np.array([rng.choice(values) for _ in range(n)])
+    if kind == 'datetime':
+        values = ['2023-01-01T10:00', 'NaT']
+        return np.array([rng.choice(values) for _ in range(n)],
+                        dtype='datetime64[us]')
+    assert False
+
+
+def gen_table(rng, table_id, n):
+    """Generates a table with random values of varying types, and a primary
+    key column with duplicates."""
+    result = {}
+    for column_id, rules in schema['schema'][table_id]['schema']['schema'
+                                                                 ].items():
+        if rng.random() < 0.1:
+            continue
+        coerce = rules.get('coerce')
+        if 'unique' in rules or 'foreignKey' in rules:
+            kinds = ['key']
+        elif coerce == 'datetime':
+            kinds = ['str', 'object', 'datetime']
+        elif coerce:
+            kinds = ['str', 'object', 'int', 'float']
+        else:
+            kinds = ['str', 'object']
+        kind = rng.choice(kinds)
+        if kind == 'key':
+            result[column_id] = np.array(
+                [rng.choice(['', ' k1', 'k1', 'k2', 'k3', 'k4'])
+                 for _ in range(n)], dtype=object)
+        else:
+            result[column_id] = gen_column(rng, kind, n)
+    return result
+
+
+def to_json(entries):
+    # NaN values are only equal to themselves as JSON
+    return json.dumps(entries, default=str)
+
+
+@unittest.skipUnless(has_pandas, 'requires numpy and pandas')
+class TestVectorized(common.OdmTestCase):
+    def assertSameReport(self, data, **kwargs):
+        rows = {table_id: to_rows(table) for table_id, table in data.items()}
+        expected = _validate_data_ext(schema, rows, check_foreign_keys=True,
+                                      **kwargs)
+        report = _validate_data_ext(schema, data, check_foreign_keys=True,
+                                    **kwargs)
+        self.assertEqual(to_json(expected.errors), to_json(report.errors))
+        self.assertEqual(to_json(expected.warnings), to_json(report.warnings))
+        self.assertEqual(expected.table_info, report.table_info)
+
+    def test_to_rows(self):
+        df = pd.DataFrame({
+            'a': ['x', None, 'y'],
+            'b': [1.5, float('nan'), 2.0],
+            'c': pd.to_datetime(['2023-01-01', None, '2023-01-02']),
+            'd': [1, 2, 3],
+        })
+        expected = [
+            {'a': 'x', 'b': 1.5, 'c': datetime(2023, 1, 1), 'd': 1},
+            {'a': '', 'b': '', 'c': '', 'd': 2},
+            {'a': 'y', 'b': 2.0, 'c': datetime(2023, 1, 2), 'd': 3},
+        ]
+        self.assertEqual(expected, to_rows(df))
+
+    @parameterized.expand(common.param_range(0, 5))
+    def test_random_tables(self, seed):
+        rng = random.Random(seed)
+        table_ids = ['sites', 'samples', 'measures']
+        data = {t: gen_table(rng, t, rng.randint(1, 30)) for t in table_ids}
+        self.assertSameReport(data)
+        self.assertSameReport({table_id: pd.DataFrame(columns)
+                               for table_id, columns in data.items()})
+        self.assertSameReport(data, group_values=True)
+        self.assertSameReport(data, compact_keys=True)
+
+    def test_valid_rows_are_skipped(self):
+        n = 100
+        samples = pd.DataFrame({
+            'sampleID': [f'sample-{i}' for i in range(n)],
+            'siteID': 'site-1',
+            'collDT': np.datetime64('2023-01-01T10:00', 'us'),
+            'collNum': 1,
+            'collPer': 24.0,
+            'collType': 'comp',
+            'saMaterial': 'rawWW',
+        })
+        samples.loc[50, 'collType'] = 'unknown'
+        progress = []
+
+        def on_progress(action, table_id, offset, total):
+            progress.append((action, offset))
+
+        report = _validate_data_ext(schema, {'samples': samples},
+                                    on_progress=on_progress)
+        self.assertEqual([51], [e['rowNumber'] for e in report.errors])
+        # only the invalid row is coerced and validated
+        self.assertEqual([('coercing', 51), ('validating', 51)], progress)
+        self.assertEqual(0, len(report.warnings))
+        self.assertSameReport({'samples': samples})
+
+    def test_foreign_keys_with_shared_index(self):
+        sites = pd.DataFrame({'siteID': ['site-1']})
+        samples = pd.DataFrame({'siteID': ['site-1', 'site-2']})
+        fk_index = ForeignKeyIndex(get_foreign_keys(schema['schema']))
+        errors = []
+        for table_id, table in [('samples', samples), ('sites', sites)]:
+            report = _validate_data_ext(schema, {table_id: table},
+                                        fk_index=fk_index,
+                                        rule_whitelist=[
+                                            RuleId.invalid_foreign_key])
+            errors += report.errors
+        report = validate_pending_foreign_keys(
+            schema, fk_index, 'samples',
+            rule_whitelist=[RuleId.invalid_foreign_key])
+        errors += report.errors
+        self.assertEqual(['site-2'], [e['invalidValue'] for e in errors])
+
+
+if __name__ == '__main__':
+    unittest.main()